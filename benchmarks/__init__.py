@@ -0,0 +1,8 @@
+"""
+Benchmarks for querydict. These are not installed with the package, run them from a checkout, for example:
+
+    python -m benchmarks.bench_compile
+
+`benchmarks.suite` runs synthetic workloads from `benchmarks.generate`, and can compare the results with a
+saved baseline to find regressions.
+"""
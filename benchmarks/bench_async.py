@@ -0,0 +1,54 @@
+"""
+Measure the throughput of `QueryEngine.filter_async` with different batch sizes, compared to calling
+`QueryEngine.match` by hand for each record from the same asynchronous source.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from querydict.aio import from_iterable
+from querydict.parser import QueryEngine
+
+QUERY = "event.action:login AND NOT user.name:root"
+
+
+def make_records(count: int):
+    return [
+        {"event": {"action": ["login", "logout"][i % 2]}, "user": {"name": "user{}".format(i % 50)}}
+        for i in range(count)
+    ]
+
+
+async def by_hand(engine, records):
+    return [record async for record in from_iterable(records) if engine.match(record)]
+
+
+async def filtered(engine, records, **kwargs):
+    return [record async for record in engine.filter_async(from_iterable(records), **kwargs)]
+
+
+def main(count: int = 200000) -> None:
+    engine = QueryEngine(QUERY)
+    records = make_records(count)
+
+    start = time.perf_counter()
+    expected = asyncio.run(by_hand(engine, records))
+    baseline = time.perf_counter() - start
+    print("{:<40} {:>10} {:>10}".format("mode", "time (s)", "rec/s"))
+    print("{:<40} {:>10.3f} {:>10.0f}".format("match() by hand", baseline, count / baseline))
+
+    for batch_size in [1, 100, 1000]:
+        start = time.perf_counter()
+        assert asyncio.run(filtered(engine, records, batch_size=batch_size)) == expected
+        elapsed = time.perf_counter() - start
+        print("{:<40} {:>10.3f} {:>10.0f}".format("batch_size={}".format(batch_size), elapsed, count / elapsed))
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        start = time.perf_counter()
+        found = asyncio.run(filtered(engine, records, batch_size=1000, executor=executor, offload_threshold=500))
+        assert found == expected
+        elapsed = time.perf_counter() - start
+        print("{:<40} {:>10.3f} {:>10.0f}".format("batch_size=1000, thread executor", elapsed, count / elapsed))
+
+
+if __name__ == "__main__":
+    main()
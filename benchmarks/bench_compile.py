@@ -0,0 +1,108 @@
+"""
+Compare the compiled matcher against a reference interpreter which walks the luqum tree for every record,
+as `QueryEngine.match` did before queries were compiled. The reference interpreter needs dotty-dict, which
+is no longer a dependency of querydict itself.
+"""
+import timeit
+from dotty_dict import dotty
+from luqum.tree import AndOperation, OrOperation, Group, SearchField, Word, Phrase, Not
+from querydict.parser import QueryEngine
+
+RECORD = {
+    "host": {"name": "web-01", "os": {"family": "linux"}},
+    "event": {"action": "login", "outcome": "success"},
+    "user": {"name": "bob"},
+    "message": "accepted password for bob from 10.0.0.1 port 22",
+}
+
+QUERIES = [
+    "event.action:login",
+    "event.action:login AND event.outcome:success AND user.name:bob",
+    "user.name:alice OR user.name:carol OR user.name:dave OR user.name:bob",
+    '(host.os.family:linux AND message:"password") OR (host.os.family:windows AND event.action:logon)',
+    "event.action:login AND NOT (user.name:root OR user.name:admin) AND host.name:web-01",
+]
+
+
+class Interpreter:
+    """ Reference implementation of the original tree walking matcher, kept for comparison. """
+
+    def __init__(self, tree, short_circuit=True):
+        self.tree = tree
+        self.short_circuit = short_circuit
+
+    def match(self, data):
+        return self._match(dotty(data), self.tree)
+
+    def _match(self, data, operation):
+        op_map = {
+            SearchField: self._search_field,
+            AndOperation: self._and,
+            OrOperation: self._or,
+            Group: self._single,
+            Not: self._not,
+        }
+        return op_map[type(operation)](data, operation)
+
+    def _single(self, data, operation):
+        if len(operation.children) > 1:
+            raise Exception("Unhandled operation with more than 1 child")
+        return self._match(data, operation.children[0])
+
+    def _not(self, data, operation):
+        return not self._single(data, operation)
+
+    def _and(self, data, operation):
+        result = True
+        for child in operation.children:
+            if not self._match(data, child):
+                if self.short_circuit:
+                    return False
+                result = False
+        return result
+
+    def _or(self, data, operation):
+        result = False
+        for child in operation.children:
+            if self._match(data, child):
+                if self.short_circuit:
+                    return True
+                result = True
+        return result
+
+    def _search_field(self, data, operation):
+        if len(operation.children) > 1:
+            raise Exception("Unhandled operation with more than 1 child")
+        try:
+            field = data[operation.name]
+        except KeyError:
+            return False
+        match = operation.children[0]
+        if isinstance(match, Word):
+            return field == match.value
+        if isinstance(match, Phrase):
+            if match.value[0] != '"' or match.value[-1] != '"':
+                raise Exception("Expected Phrase to start and end with double quotes")
+            return match.value[1:-1] in field
+        raise Exception("Unhandled SearchField child")
+
+
+def main(number: int = 20000) -> None:
+    print("{:<100} {:>12} {:>12} {:>8}".format("query", "interp (us)", "compiled (us)", "speedup"))
+
+    for query in QUERIES:
+        engine = QueryEngine(query, keep_tree=True)
+        interpreter = Interpreter(engine.tree)
+        assert engine.match(RECORD) == interpreter.match(RECORD)
+
+        interp = timeit.timeit(lambda: interpreter.match(RECORD), number=number)
+        compiled = timeit.timeit(lambda: engine.match(RECORD), number=number)
+        print(
+            "{:<100} {:>12.2f} {:>12.2f} {:>7.1f}x".format(
+                query, interp / number * 1e6, compiled / number * 1e6, interp / compiled
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
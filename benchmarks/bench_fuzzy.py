@@ -0,0 +1,84 @@
+"""
+Compare fuzzy matching using the bounded, banded edit distance against filling a full Levenshtein matrix for
+every record, and show the effect of sharing a matcher between many rules with the same fuzzy term.
+"""
+import random
+import string
+import timeit
+from querydict.fuzzy import bounded_distance
+from querydict.percolator import QuerySet
+
+TERMS = ["microsoft", "paypal", "amazon", "accounts-google"]
+
+
+def levenshtein(source: str, target: str) -> int:
+    previous = list(range(len(target) + 1))
+
+    for row, char in enumerate(source, 1):
+        current = [row]
+        for column, other in enumerate(target, 1):
+            current.append(
+                min(previous[column - 1] + (char != other), previous[column] + 1, current[column - 1] + 1)
+            )
+        previous = current
+
+    return previous[-1]
+
+
+def make_domains(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    domains = []
+
+    for _ in range(count):
+        if rng.random() < 0.1:
+            # A near miss of one of the terms
+            chars = list(rng.choice(TERMS))
+            chars[rng.randrange(len(chars))] = rng.choice(string.ascii_lowercase)
+            domains.append("".join(chars))
+        else:
+            domains.append("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randrange(4, 20))))
+
+    return domains
+
+
+def main(number: int = 5) -> None:
+    domains = make_domains(20000)
+    records = [{"domain": domain} for domain in domains]
+    print("{:<30} {:>14} {:>14} {:>8}".format("term (us per record)", "full matrix", "bounded", "speedup"))
+
+    for term in TERMS:
+        for max_edits in (1, 2):
+            expected = [levenshtein(term, domain) <= max_edits for domain in domains]
+            assert [bounded_distance(term, domain, max_edits) <= max_edits for domain in domains] == expected
+
+            full = timeit.timeit(lambda: [levenshtein(term, d) <= max_edits for d in domains], number=1)
+            bounded = timeit.timeit(
+                lambda: [bounded_distance(term, d, max_edits) <= max_edits for d in domains], number=number
+            ) / number
+            print(
+                "{:<30} {:>14.3f} {:>14.3f} {:>7.1f}x".format(
+                    "{}~{}".format(term, max_edits),
+                    full / len(domains) * 1e6,
+                    bounded / len(domains) * 1e6,
+                    full / bounded,
+                )
+            )
+
+    # Many rules with the same fuzzy term, which share one matcher and its recent results
+    rules = QuerySet()
+
+    for rule_id in range(200):
+        rules.add(rule_id, "domain:{}~1 AND NOT user:u{}".format(TERMS[rule_id % len(TERMS)], rule_id))
+
+    sample = records[:1000]
+    shared = timeit.timeit(lambda: [rules.match(r) for r in sample], number=1)
+    unshared = timeit.timeit(
+        lambda: [[bounded_distance(TERMS[i % len(TERMS)], r["domain"], 1) <= 1 for i in range(200)] for r in sample],
+        number=1,
+    )
+    print("\n200 rules with 4 fuzzy terms (us per record)")
+    print("{:<30} {:>14.1f}".format("QuerySet, shared matchers", shared / len(sample) * 1e6))
+    print("{:<30} {:>14.1f}".format("edit distance for each rule", unshared / len(sample) * 1e6))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compare matching raw JSON records with `QueryEngine.match_json`, against decoding each record with `json.loads`
+and calling `QueryEngine.match`, for records with more and more top level members.
+"""
+import json
+import random
+import time
+from querydict.parser import QueryEngine
+
+QUERIES = [
+    "event.action:delete",
+    'event.action:login AND message:"failed password"',
+    "user.name:root OR user.name:admin",
+]
+
+WIDTHS = [10, 50, 200, 1000]
+
+VALUES = ["short", "a longer value of several words", 12345, 1.5, None]
+
+
+def make_records(count: int, width: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    actions = ["login", "logout", "read", "write"] * 25 + ["delete"]
+    records = []
+
+    for _ in range(count):
+        record = {"field{}".format(i): rng.choice(VALUES) for i in range(width)}
+
+        for i in range(0, width, 10):
+            record["nested{}".format(i)] = {"values": [1, 2, 3], "label": "nested value"}
+
+        record["event"] = {"action": rng.choice(actions)}
+        record["user"] = {"name": "user{}".format(rng.randrange(500))}
+        record["message"] = rng.choice(["accepted password", "failed password", "session opened"])
+        records.append(json.dumps(record).encode("utf-8"))
+
+    return records
+
+
+def main(count: int = 5000) -> None:
+    print("{:<55} {:>6} {:>10} {:>10} {:>8}".format("query", "width", "loads (s)", "lazy (s)", "speedup"))
+
+    for width in WIDTHS:
+        records = make_records(count, width)
+
+        for query in QUERIES:
+            engine = QueryEngine(query)
+
+            start = time.perf_counter()
+            expected = [engine.match(json.loads(raw)) for raw in records]
+            naive = time.perf_counter() - start
+
+            start = time.perf_counter()
+            found = [engine.match_json(raw) for raw in records]
+            lazy = time.perf_counter() - start
+
+            assert found == expected
+            print("{:<55} {:>6} {:>10.3f} {:>10.3f} {:>7.1f}x".format(query, width, naive, lazy, naive / lazy))
+
+
+if __name__ == "__main__":
+    main()
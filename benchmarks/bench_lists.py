@@ -0,0 +1,56 @@
+"""
+Compare matching any item of a list with "procs.*.name" against exploding each record into one record per item,
+which was needed before paths could contain "*".
+"""
+import random
+import timeit
+from querydict.parser import QueryEngine
+
+NAMES = ["explorer.exe", "svchost.exe", "chrome.exe", "code.exe", "python.exe", "cmd.exe"]
+
+
+def make_events(count: int, procs: int, seed: int = 1):
+    rng = random.Random(seed)
+    return [
+        {
+            "host": "web-{:02}".format(rng.randrange(10)),
+            "procs": [
+                {"name": rng.choice(NAMES), "pid": rng.randrange(65536), "user": rng.choice(["root", "www"])}
+                for _ in range(procs)
+            ],
+        }
+        for _ in range(count)
+    ]
+
+
+def explode(event: dict):
+    for proc in event["procs"]:
+        yield {"host": event["host"], "procs": proc}
+
+
+def main(number: int = 3) -> None:
+    wildcard = QueryEngine("procs.*.name:cmd.exe AND NOT procs.*.user:root")
+    exploded = QueryEngine("procs.name:cmd.exe")
+    root = QueryEngine("procs.user:root")
+    print("{:>6} {:>18} {:>18} {:>8}".format("procs", "explode (us/rec)", "wildcard (us/rec)", "speedup"))
+
+    for procs in (1, 10, 100):
+        events = make_events(2000, procs)
+
+        def match_exploded(event):
+            items = list(explode(event))
+            return any(exploded.match(item) for item in items) and not any(root.match(item) for item in items)
+
+        assert [match_exploded(e) for e in events] == [wildcard.match(e) for e in events]
+
+        slow = timeit.timeit(lambda: [match_exploded(e) for e in events], number=number) / number
+        fast = timeit.timeit(lambda: [wildcard.match(e) for e in events], number=number) / number
+        print(
+            "{:>6} {:>18.2f} {:>18.2f} {:>7.1f}x".format(
+                procs, slow / len(events) * 1e6, fast / len(events) * 1e6, slow / fast
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Measure the memory kept by compiled rules, in bytes per rule, with and without the luqum tree, and for rules
+added to a QuerySet. Memory is measured with tracemalloc, so includes the compiled closures and every node of the
+intermediate representation.
+"""
+import gc
+import tracemalloc
+from querydict.parser import QueryEngine
+from querydict.percolator import QuerySet
+from .generate import make_queries
+
+RULES = 2000
+
+WORKLOADS = ["wide_or", "deep_and", "phrase_heavy", "missing_field_heavy"]
+
+
+def bytes_per_rule(build, rules: list) -> float:
+    """ Return the memory kept by the result of build(rules), divided by the number of rules. """
+    # Warm up any caches, so they are not counted
+    build(rules[:50])
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build(rules)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return used / len(rules)
+
+
+def add_all(rules: list) -> QuerySet:
+    rule_set = QuerySet(max_depth=100)
+
+    for rule_id, rule in enumerate(rules):
+        rule_set.add(rule_id, rule)
+
+    return rule_set
+
+
+def main(count: int = RULES) -> None:
+    print("{:<22} {:>12} {:>12} {:>12}".format("workload", "tree kept", "compact", "QuerySet"))
+
+    for workload in WORKLOADS:
+        rules = make_queries(workload, count)
+        kept = bytes_per_rule(lambda rules: [QueryEngine(rule, max_depth=100, keep_tree=True) for rule in rules], rules)
+        compact = bytes_per_rule(lambda rules: [QueryEngine(rule, max_depth=100) for rule in rules], rules)
+        rule_set = bytes_per_rule(add_all, rules)
+        print("{:<22} {:>12.0f} {:>12.0f} {:>12.0f}".format(workload, kept, compact, rule_set))
+
+
+if __name__ == "__main__":
+    main()
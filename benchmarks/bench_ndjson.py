@@ -0,0 +1,57 @@
+"""
+Compare filtering newline delimited JSON with `QueryEngine.filter_ndjson`, against decoding every line with
+`json.loads` and calling `QueryEngine.match`.
+"""
+import io
+import json
+import random
+import time
+from querydict.parser import QueryEngine
+
+QUERIES = [
+    "event.action:delete",
+    'event.action:login AND message:"failed password"',
+    "user.name:root OR user.name:admin",
+    "NOT event.outcome:success",
+]
+
+
+def make_lines(count: int, seed: int = 1) -> bytes:
+    rng = random.Random(seed)
+    actions = ["login", "logout", "read", "write"] * 25 + ["delete"]
+    lines = []
+
+    for i in range(count):
+        record = {
+            "id": i,
+            "event": {"action": rng.choice(actions), "outcome": rng.choice(["success"] * 9 + ["failure"])},
+            "user": {"name": "user{}".format(rng.randrange(500))},
+            "message": rng.choice(["accepted password", "failed password", "session opened"]),
+            "padding": ["x" * 20] * 10,
+        }
+        lines.append(json.dumps(record))
+
+    return "\n".join(lines).encode("ascii")
+
+
+def main(count: int = 200000) -> None:
+    data = make_lines(count)
+    print("{:<60} {:>10} {:>10} {:>8}".format("query", "loads (s)", "filter (s)", "speedup"))
+
+    for query in QUERIES:
+        engine = QueryEngine(query)
+
+        start = time.perf_counter()
+        expected = [r for r in map(json.loads, io.BytesIO(data)) if engine.match(r)]
+        naive = time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = list(engine.filter_ndjson(io.BytesIO(data)))
+        filtered = time.perf_counter() - start
+
+        assert found == expected
+        print("{:<60} {:>10.3f} {:>10.3f} {:>7.1f}x".format(query, naive, filtered, naive / filtered))
+
+
+if __name__ == "__main__":
+    main()
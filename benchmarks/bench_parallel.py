@@ -0,0 +1,41 @@
+"""
+Measure how `QueryEngine.filter_parallel` scales with the number of worker processes.
+"""
+import os
+import time
+from querydict.parser import QueryEngine
+
+QUERY = '(event.action:login OR event.action:logout) AND NOT user.name:root AND message:"password"'
+
+
+def make_records(count: int):
+    for i in range(count):
+        yield {
+            "event": {"action": ["login", "logout", "read"][i % 3]},
+            "user": {"name": "user{}".format(i % 100)},
+            "message": "accepted password for user{}".format(i % 100),
+            "tags": ["a", "b", "c"],
+        }
+
+
+def main(count: int = 500000) -> None:
+    engine = QueryEngine(QUERY)
+
+    start = time.perf_counter()
+    expected = sum(1 for record in make_records(count) if engine.match(record))
+    single = time.perf_counter() - start
+    print("{:>8} {:>10} {:>10} {:>8}".format("workers", "time (s)", "rec/s", "speedup"))
+    print("{:>8} {:>10.3f} {:>10.0f} {:>7.2f}x".format("none", single, count / single, 1.0))
+
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        start = time.perf_counter()
+        found = sum(1 for _ in engine.filter_parallel(make_records(count), workers=workers, chunksize=5000))
+        elapsed = time.perf_counter() - start
+        assert found == expected
+        print("{:>8} {:>10.3f} {:>10.0f} {:>7.2f}x".format(workers, elapsed, count / elapsed, single / elapsed))
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measure the cost of each kind of wildcard and regular expression term. Each is compared against emulating the
+pattern outside the library with `re.fullmatch` for each record, which looks the pattern up in the `re`
+module cache every call, and against a regular expression compiled in advance.
+"""
+import fnmatch
+import random
+import re
+import string
+import timeit
+from querydict.parser import QueryEngine
+
+PATTERNS = [
+    "host:web-*",
+    "host:*.example.com",
+    "host:*prod*",
+    "host:web-*.com",
+    "host:*",
+    "host:web-??.*",
+    "host:*-0*.prod*",
+    "host:/web-[0-9]+\\.[a-z]+\\.example\\.com/",
+]
+
+
+def make_hosts(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    hosts = []
+
+    for _ in range(count):
+        name = rng.choice(["web", "db", "cache", "queue"])
+        env = rng.choice(["prod", "staging", "dev"])
+        suffix = "".join(rng.choice(string.ascii_lowercase) for _ in range(4))
+        hosts.append({"host": "{}-{:02}.{}{}.example.com".format(name, rng.randrange(100), env, suffix)})
+
+    return hosts
+
+
+def to_regex(query: str):
+    field, pattern = query.split(":", 1)
+
+    if pattern.startswith("/"):
+        return field, pattern[1:-1]
+
+    return field, fnmatch.translate(pattern)
+
+
+def per_record(records, number):
+    total = timeit.timeit(lambda: [None for _ in records], number=number)
+    return lambda fn: (timeit.timeit(fn, number=number) - total) / number / len(records) * 1e6
+
+
+def main(number: int = 20) -> None:
+    records = make_hosts(5000)
+    timer = per_record(records, number)
+    print(
+        "{:<44} {:>14} {:>14} {:>12} {:>10} {:>12}".format(
+            "pattern (us per record)", "strategy", "re.fullmatch", "compiled re", "test", "engine"
+        )
+    )
+
+    for query in PATTERNS:
+        engine = QueryEngine(query)
+        field, source = to_regex(query)
+        regex = re.compile(source, re.DOTALL)
+        expected = [regex.fullmatch(record[field]) is not None for record in records]
+        assert [engine.match(record) for record in records] == expected
+
+        emulated = timer(lambda: [re.fullmatch(source, record[field], re.DOTALL) for record in records])
+        precompiled = timer(lambda: [regex.fullmatch(record[field]) for record in records])
+        # The test alone, without looking up the field or the overhead of match()
+        test = engine._ir.compile_test()
+        tested = timer(lambda: [test(record[field]) for record in records])
+        matched = timer(lambda: [engine.match(record) for record in records])
+        strategy = getattr(engine._ir, "strategy", "regex")
+        print(
+            "{:<44} {:>14} {:>14.3f} {:>12.3f} {:>10.3f} {:>12.3f}".format(
+                query, strategy, emulated, precompiled, tested, matched
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare matching one record against many rules with `QuerySet`, against looping over `QueryEngine.match`, for
+rules of exact terms and rules of narrow ranges.
+"""
+import random
+import time
+from querydict.parser import QueryEngine
+from querydict.percolator import QuerySet
+
+FIELDS = ["event.action", "user.name", "host.name", "process.name", "source.ip"]
+
+
+def make_rules(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    rules = []
+
+    for i in range(count):
+        terms = ["{}:v{}".format(field, rng.randrange(1000)) for field in rng.sample(FIELDS, 2)]
+        rules.append((i, " AND ".join(terms)))
+
+    return rules
+
+
+def make_range_rules(count: int, seed: int = 3):
+    rng = random.Random(seed)
+    rules = []
+
+    for i in range(count):
+        low = rng.randrange(100000)
+        rules.append((i, "latency_ms:[{} TO {}}}".format(low, low + rng.randrange(1, 100))))
+
+    return rules
+
+
+def make_records(count: int, seed: int = 2):
+    rng = random.Random(seed)
+    records = []
+
+    for _ in range(count):
+        record = {}
+        for field in FIELDS:
+            parent, child = field.split(".")
+            record.setdefault(parent, {})[child] = "v{}".format(rng.randrange(1000))
+        record["latency_ms"] = rng.uniform(0, 100000)
+        records.append(record)
+
+    return records
+
+
+def run(make, records) -> None:
+    print("{:>8} {:>14} {:>14} {:>8}".format("rules", "loop (ms/rec)", "set (ms/rec)", "speedup"))
+
+    for count in [100, 1000, 10000, 20000]:
+        rules = make(count)
+        engines = [(rule_id, QueryEngine(query)) for rule_id, query in rules]
+        query_set = QuerySet()
+        for rule_id, engine in engines:
+            query_set.add(rule_id, engine)
+        # Interval indexes are built when first searched, which is not part of matching
+        query_set.match(records[0])
+
+        start = time.perf_counter()
+        expected = [[rule_id for rule_id, engine in engines if engine.match(r)] for r in records]
+        loop = (time.perf_counter() - start) / len(records)
+
+        start = time.perf_counter()
+        found = [query_set.match(r) for r in records]
+        indexed = (time.perf_counter() - start) / len(records)
+
+        assert found == expected
+        print("{:>8} {:>14.3f} {:>14.3f} {:>7.1f}x".format(count, loop * 1e3, indexed * 1e3, loop / indexed))
+
+
+def main() -> None:
+    records = make_records(200)
+    print("Exact terms")
+    run(make_rules, records)
+    print("\nRanges")
+    run(make_range_rules, records)
+
+
+if __name__ == "__main__":
+    main()
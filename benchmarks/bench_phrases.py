@@ -0,0 +1,69 @@
+"""
+Compare matching log messages against many rules with Phrase terms on the same field, using `QuerySet` which
+scans each message once for every phrase, against looping over `QueryEngine.match` which searches the message
+once for each rule.
+"""
+import random
+import string
+import time
+from querydict.parser import QueryEngine
+from querydict.percolator import QuerySet
+
+
+def make_words(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randrange(3, 9))) for _ in range(count)]
+
+
+def make_rules(words, count: int, seed: int = 2):
+    rng = random.Random(seed)
+    rules = []
+
+    for i in range(count):
+        phrase = " ".join(rng.sample(words, 2))
+
+        # Some rules test a phrase without requiring it, so they cannot be skipped by the index
+        if i % 4 == 0:
+            rules.append((i, 'NOT message:"{}" AND level:error'.format(phrase)))
+        else:
+            rules.append((i, 'message:"{}"'.format(phrase)))
+
+    return rules
+
+
+def make_records(words, count: int, seed: int = 3):
+    rng = random.Random(seed)
+    return [
+        {"message": " ".join(rng.choice(words) for _ in range(40)), "level": rng.choice(["info", "error"])}
+        for _ in range(count)
+    ]
+
+
+def main() -> None:
+    words = make_words(300)
+    records = make_records(words, 200)
+    print("{:>8} {:>14} {:>14} {:>8}".format("rules", "loop (ms/rec)", "set (ms/rec)", "speedup"))
+
+    for count in [10, 100, 1000, 5000]:
+        rules = make_rules(words, count)
+        engines = [(rule_id, QueryEngine(query)) for rule_id, query in rules]
+        query_set = QuerySet()
+        for rule_id, engine in engines:
+            query_set.add(rule_id, engine)
+        # The automaton is built when first used, which is not part of matching
+        query_set.match(records[0])
+
+        start = time.perf_counter()
+        expected = [[rule_id for rule_id, engine in engines if engine.match(r)] for r in records]
+        loop = (time.perf_counter() - start) / len(records)
+
+        start = time.perf_counter()
+        found = [query_set.match(r) for r in records]
+        indexed = (time.perf_counter() - start) / len(records)
+
+        assert found == expected
+        print("{:>8} {:>14.3f} {:>14.3f} {:>7.1f}x".format(count, loop * 1e3, indexed * 1e3, loop / indexed))
+
+
+if __name__ == "__main__":
+    main()
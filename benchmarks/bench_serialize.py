@@ -0,0 +1,77 @@
+"""
+Compare loading rules from their serialized form against parsing them from source, for single queries and for
+a QuerySet, as a worker would when it starts.
+"""
+import pickle
+import random
+import time
+from querydict.parser import QueryEngine
+from querydict.percolator import QuerySet
+from .generate import WORKLOADS, field_paths
+
+RULES = 5000
+
+
+def make_rules(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    words, text = field_paths()
+    rules = []
+
+    for index in range(count):
+        generate = list(WORKLOADS.values())[index % len(WORKLOADS)]
+        rules.append(generate(rng, words, text, 4))
+
+    return rules
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def make_simple_rules(count: int):
+    """ Short rules typical of alerting, with three terms. """
+    return [
+        "event.action:login AND user.name:u{} AND NOT host.name:web-{}".format(index, index % 10)
+        for index in range(count)
+    ]
+
+
+def compare(name: str, rules: list) -> None:
+    per_thousand = 1000 / len(rules) * 1e3
+
+    engines, parse = timed(lambda: [QueryEngine(rule, max_depth=100) for rule in rules])
+    data = [engine.to_bytes() for engine in engines]
+    _, load = timed(lambda: [QueryEngine.from_bytes(item) for item in data])
+    pickled = pickle.dumps(engines)
+    _, unpickle = timed(lambda: pickle.loads(pickled))
+
+    print("{} {} queries, ms per thousand".format(len(rules), name))
+    print("{:<30} {:>10.1f}".format("parse from source", parse * per_thousand))
+    print("{:<30} {:>10.1f} {:>7.1f}x".format("from_bytes", load * per_thousand, parse / load))
+    print("{:<30} {:>10.1f} {:>7.1f}x".format("pickle", unpickle * per_thousand, parse / unpickle))
+    print("{:<30} {:>10.0f}".format("bytes per query", sum(map(len, data)) / len(rules)))
+
+    def build():
+        rule_set = QuerySet(max_depth=100)
+        for rule_id, rule in enumerate(rules):
+            rule_set.add(rule_id, rule)
+        return rule_set
+
+    rule_set, parse = timed(build)
+    data = rule_set.to_bytes()
+    loaded, load = timed(lambda: QuerySet.from_bytes(data))
+    assert len(loaded) == len(rule_set)
+
+    print("{:<30} {:>10.1f}".format("QuerySet, add from source", parse * per_thousand))
+    print("{:<30} {:>10.1f} {:>7.1f}x\n".format("QuerySet, from_bytes", load * per_thousand, parse / load))
+
+
+def main() -> None:
+    compare("simple", make_simple_rules(RULES))
+    compare("generated", make_rules(RULES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Compare matching records against a `QuerySet` whose rules share conditions, with and without sharing them
+between rules (`querydict.subexpressions`), and measure the time to add and remove a rule in a large set while
+it is being used to match records.
+"""
+import random
+import time
+from unittest import mock
+from querydict import percolator
+from querydict.percolator import QuerySet
+
+ACTIONS = ["login", "logout", "read", "write", "delete"]
+
+# Conditions which many rules have in common, such as the environment and service they apply to
+COMMON = [
+    "env:prod AND service:api",
+    "env:prod AND NOT (user.name:root OR user.name:admin OR user.name:service)",
+    '(service:api OR service:web) AND message:"failed password"',
+    "env:staging AND NOT source.ip:10.*",
+    "latency_ms:[500 TO *] AND NOT service:batch",
+]
+
+
+def make_rules(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    return [
+        "{} AND event.action:{} AND NOT host.name:h{}".format(
+            rng.choice(COMMON), rng.choice(ACTIONS), rng.randrange(100)
+        )
+        for _ in range(count)
+    ]
+
+
+def make_records(count: int, seed: int = 2) -> list:
+    rng = random.Random(seed)
+    return [
+        {
+            "env": rng.choice(["prod", "staging"]),
+            "service": rng.choice(["api", "web", "batch"]),
+            "event": {"action": rng.choice(ACTIONS)},
+            "user": {"name": rng.choice(["root", "admin", "alice", "bob"])},
+            "host": {"name": "h{}".format(rng.randrange(100))},
+            "source": {"ip": rng.choice(["10.0.0.1", "192.168.1.1"])},
+            "message": rng.choice(["failed password for bob", "accepted password for alice"]),
+            "latency_ms": rng.uniform(0, 1000),
+        }
+        for _ in range(count)
+    ]
+
+
+def build(rules: list) -> QuerySet:
+    query_set = QuerySet()
+
+    for rule_id, rule in enumerate(rules):
+        query_set.add(rule_id, rule)
+
+    return query_set
+
+
+def main(records: int = 200) -> None:
+    data = make_records(records)
+    print("{:>8} {:>16} {:>16} {:>8} {:>12}".format(
+        "rules", "separate (ms/rec)", "shared (ms/rec)", "speedup", "evaluated"
+    ))
+
+    for count in [100, 1000, 10000]:
+        rules = make_rules(count)
+
+        with mock.patch.object(percolator, "shareable", lambda node: False):
+            separate = build(rules)
+
+        shared = build(rules)
+        expected = [separate.match(record) for record in data]
+
+        start = time.perf_counter()
+        [separate.match(record) for record in data]
+        slow = (time.perf_counter() - start) / records
+
+        start = time.perf_counter()
+        found = []
+        evaluated = 0
+
+        for record in data:
+            found.append(shared.match(record))
+            evaluated += shared.evaluated
+
+        fast = (time.perf_counter() - start) / records
+        assert found == expected
+        print("{:>8} {:>16.3f} {:>16.3f} {:>7.1f}x {:>12.1f}".format(
+            count, slow * 1e3, fast * 1e3, slow / fast, evaluated / records
+        ))
+
+    # Every edit is followed by matching a record, so no index can wait to be rebuilt
+    query_set = build(make_rules(20000))
+    extra = make_rules(200, seed=3)
+
+    start = time.perf_counter()
+
+    for index in range(len(extra)):
+        query_set.match(data[index % records])
+
+    matching = time.perf_counter() - start
+    start = time.perf_counter()
+
+    for index, rule in enumerate(extra):
+        query_set.add("extra", rule)
+        query_set.match(data[index % records])
+        query_set.remove("extra")
+
+    editing = time.perf_counter() - start - matching
+    print("\nAdd and remove a rule in a set of 20000 while matching: {:.3f} ms".format(editing / len(extra) * 1e3))
+
+if __name__ == "__main__":
+    main()
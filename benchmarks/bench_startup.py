@@ -0,0 +1,46 @@
+"""
+Measure the time to import `querydict.parser` in a new process, and compare creating a `QueryEngine` with the
+fast parser from `querydict.fastparse` against creating it with luqum's parser.
+"""
+import subprocess
+import sys
+import timeit
+from unittest import mock
+from querydict import parser
+from querydict.parser import QueryEngine
+
+QUERIES = [
+    "event.action:login",
+    "event.action:login AND event.outcome:success AND user.name:bob",
+    "user.name:alice OR user.name:carol OR user.name:dave OR user.name:bob",
+    '(host.os.family:linux AND message:"password") OR (host.os.family:windows AND event.action:logon)',
+    "event.action:login AND NOT (user.name:root OR user.name:admin) AND host.name:web-01",
+]
+
+IMPORT = "import querydict.parser; querydict.parser.QueryEngine('event.action:login')"
+
+
+def import_time(repeat: int = 10) -> float:
+    """ Return the shortest time to start Python, import querydict.parser and create a simple query. """
+    def run() -> None:
+        subprocess.run([sys.executable, "-c", IMPORT], check=True)
+
+    baseline = min(timeit.repeat(lambda: subprocess.run([sys.executable, "-c", "pass"]), number=1, repeat=repeat))
+    return min(timeit.repeat(run, number=1, repeat=repeat)) - baseline
+
+
+def main(number: int = 2000) -> None:
+    print("Import and create a query: {:.1f} ms\n".format(import_time() * 1e3))
+    print("{:<100} {:>10} {:>10} {:>8}".format("query", "luqum (us)", "fast (us)", "speedup"))
+
+    for query in QUERIES:
+        fast = timeit.timeit(lambda: QueryEngine(query), number=number) / number
+
+        with mock.patch.object(parser, "fast_parse", lambda query: None):
+            slow = timeit.timeit(lambda: QueryEngine(query), number=number) / number
+
+        print("{:<100} {:>10.1f} {:>10.1f} {:>7.1f}x".format(query, slow * 1e6, fast * 1e6, slow / fast))
+
+
+if __name__ == "__main__":
+    main()
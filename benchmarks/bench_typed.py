@@ -0,0 +1,66 @@
+"""
+Compare matching Words against numbers, booleans and dates with `typed=True` or a schema, with the workaround
+needed without them, which converts every value of each record to a string before matching untyped queries.
+"""
+import random
+import timeit
+from datetime import datetime, timedelta
+from querydict.parser import QueryEngine
+
+QUERIES = [
+    "port:53",
+    "port:53 AND enabled:true AND NOT status:500",
+    "(status:404 OR status:500 OR status:503) AND NOT enabled:false",
+    "seen:2020-01-01T10:00:00 OR name:dns",
+]
+
+SCHEMA = {"port": "number", "status": "number", "enabled": "boolean", "seen": "datetime"}
+
+
+def make_records(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1, 10)
+    return [
+        {
+            "port": rng.choice([22, 53, 80, 443]),
+            "status": rng.choice([200, 404, 500, 503]),
+            "enabled": rng.random() < 0.5,
+            "seen": start + timedelta(hours=rng.randrange(3)),
+            "name": rng.choice(["dns", "web", "ssh"]),
+        }
+        for _ in range(count)
+    ]
+
+
+def stringify(record: dict) -> dict:
+    """ The workaround without typed Words, which has to match how each type is written in a query. """
+    return {
+        key: value.isoformat() if isinstance(value, datetime)
+        else str(value).lower() if isinstance(value, bool)
+        else str(value)
+        for key, value in record.items()
+    }
+
+
+def main(records: int = 2000) -> None:
+    data = make_records(records)
+    print("{:<64} {:>12} {:>12} {:>12}".format("query", "str (us)", "typed (us)", "schema (us)"))
+
+    for query in QUERIES:
+        untyped = QueryEngine(query)
+        typed = QueryEngine(query, typed=True)
+        schema = QueryEngine(query, schema=SCHEMA)
+        expected = [untyped.match(stringify(record)) for record in data]
+        assert [typed.match(record) for record in data] == expected
+        assert [schema.match(record) for record in data] == expected
+
+        workaround = min(timeit.repeat(lambda: [untyped.match(stringify(record)) for record in data], number=1))
+        with_typed = min(timeit.repeat(lambda: [typed.match(record) for record in data], number=1))
+        with_schema = min(timeit.repeat(lambda: [schema.match(record) for record in data], number=1))
+        print("{:<64} {:>12.2f} {:>12.2f} {:>12.2f}".format(
+            query, workaround / records * 1e6, with_typed / records * 1e6, with_schema / records * 1e6
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Generate synthetic records and query workloads for benchmarks. Everything is generated from a seed, so the same
+arguments always produce the same records and queries.
+
+Records are nested dictionaries where every level has `width` fields named "f0", "f1" and so on. At each level
+above the last, "f0" is a nested dictionary and "f1" is a list of `list_size` nested dictionaries. Every third
+field is text of several words, and the rest are single words.
+"""
+import random
+from typing import List, Tuple
+
+WORDS = [
+    "alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet", "kilo", "lima",
+    "mike", "november", "oscar", "papa", "quebec", "romeo", "sierra", "tango", "uniform", "victor", "whiskey",
+    "xray", "yankee", "zulu",
+]
+
+# The number of words in a text field
+TEXT_WORDS = 8
+
+
+def _is_text(index: int) -> bool:
+    return index % 3 == 2
+
+
+def make_record(rng: random.Random, depth: int = 3, width: int = 6, list_size: int = 3) -> dict:
+    """ Generate one record.
+
+    Args:
+        rng: The random number generator.
+        depth: The number of levels of nesting, where 1 is a flat record.
+        width: The number of fields at each level, at least 3.
+        list_size: The number of items in each list.
+
+    Returns:
+        The record.
+    """
+    record = {}
+
+    for index in range(width):
+        key = "f{}".format(index)
+
+        if depth > 1 and index == 0:
+            record[key] = make_record(rng, depth - 1, width, list_size)
+        elif depth > 1 and index == 1:
+            record[key] = [make_record(rng, depth - 1, width, list_size) for _ in range(list_size)]
+        elif _is_text(index):
+            record[key] = " ".join(rng.choice(WORDS) for _ in range(TEXT_WORDS))
+        else:
+            record[key] = rng.choice(WORDS)
+
+    return record
+
+
+def make_records(count: int, seed: int = 1, **shape: int) -> List[dict]:
+    """ Generate records, see `make_record()` for the shape arguments. """
+    rng = random.Random(seed)
+    return [make_record(rng, **shape) for _ in range(count)]
+
+
+def field_paths(depth: int = 3, width: int = 6) -> Tuple[List[str], List[str]]:
+    """ Find the fields of records with a shape, as used in queries.
+
+    Args:
+        depth: The number of levels of nesting, as given to `make_record()`.
+        width: The number of fields at each level, as given to `make_record()`.
+
+    Returns:
+        A tuple of (word fields, text fields). Fields inside lists use "*" to match any item.
+    """
+    words: List[str] = []
+    text: List[str] = []
+    prefixes = [""]
+
+    for level in range(depth):
+        last = level == depth - 1
+        nested = []
+
+        for prefix in prefixes:
+            for index in range(width):
+                name = "{}f{}".format(prefix, index)
+
+                if not last and index == 0:
+                    nested.append(name + ".")
+                elif not last and index == 1:
+                    nested.append(name + ".*.")
+                elif _is_text(index):
+                    text.append(name)
+                else:
+                    words.append(name)
+
+        prefixes = nested
+
+    return words, text
+
+
+def _term(rng: random.Random, fields: List[str]) -> str:
+    return "{}:{}".format(rng.choice(fields), rng.choice(WORDS))
+
+
+def _phrase(rng: random.Random, fields: List[str]) -> str:
+    return '{}:"{} {}"'.format(rng.choice(fields), rng.choice(WORDS), rng.choice(WORDS))
+
+
+def wide_or(rng: random.Random, words: List[str], text: List[str], size: int = 50) -> str:
+    """ An OR of many terms on different fields. """
+    return " OR ".join(_term(rng, words) for _ in range(size))
+
+
+def deep_and(rng: random.Random, words: List[str], text: List[str], size: int = 8) -> str:
+    """ Nested conditions which alternate between AND and OR, so they cannot be flattened. """
+    query = _term(rng, words)
+
+    for level in range(size):
+        operator = "AND" if level % 2 == 0 else "OR"
+        query = "{} {} ({})".format(_term(rng, words), operator, query)
+
+    return query
+
+
+def phrase_heavy(rng: random.Random, words: List[str], text: List[str], size: int = 20) -> str:
+    """ Phrases on text fields, with a few words. """
+    phrases = " OR ".join(_phrase(rng, text) for _ in range(size))
+    return "({}) AND NOT {}".format(phrases, _term(rng, words))
+
+
+def missing_field_heavy(rng: random.Random, words: List[str], text: List[str], size: int = 20) -> str:
+    """ Mostly terms on fields which are not in any record. """
+    missing = ["missing{}.{}".format(index, field) for index, field in enumerate(words[:size])]
+    terms = [_term(rng, missing) for _ in range(size)] + [_term(rng, words)]
+    return " OR ".join(terms)
+
+
+WORKLOADS = {
+    "wide_or": wide_or,
+    "deep_and": deep_and,
+    "phrase_heavy": phrase_heavy,
+    "missing_field_heavy": missing_field_heavy,
+}
+
+
+def make_queries(workload: str, count: int, seed: int = 1, depth: int = 3, width: int = 6) -> List[str]:
+    """ Generate queries for one of the `WORKLOADS`.
+
+    Args:
+        workload: The name of the workload.
+        count: The number of queries.
+        seed: The seed for the random number generator.
+        depth: The number of levels of nesting in the records.
+        width: The number of fields at each level of the records.
+
+    Returns:
+        The queries.
+    """
+    rng = random.Random(seed)
+    words, text = field_paths(depth, width)
+    generate = WORKLOADS[workload]
+    return [generate(rng, words, text) for _ in range(count)]
@@ -0,0 +1,173 @@
+"""
+Run every workload from `benchmarks.generate` and report construction time, single record latency, batch
+throughput and memory, optionally saving the results as JSON and comparing them with a saved baseline:
+
+    python -m benchmarks.suite --output baseline.json
+    python -m benchmarks.suite --baseline baseline.json
+
+The comparison exits with status 1 if any result is worse than the baseline by more than the tolerance, so it
+can be used to catch regressions in CI. Results are only comparable on the same machine and Python version.
+"""
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from typing import Dict
+from querydict import VERSION_STRING
+from querydict.parser import QueryEngine
+from .generate import WORKLOADS, make_queries, make_records
+
+# Queries are deeper than the default limit allows
+MAX_DEPTH = 100
+
+# Whether a larger value of each result is better
+HIGHER_IS_BETTER = {
+    "construct_us": False,
+    "latency_us": False,
+    "throughput_rps": True,
+    "memory_kb": False,
+}
+
+
+def run_workload(workload: str, queries: int, records: int, seed: int, shape: Dict[str, int]) -> Dict[str, float]:
+    """ Measure one workload.
+
+    Args:
+        workload: The name of the workload, see `benchmarks.generate.WORKLOADS`.
+        queries: The number of queries to generate.
+        records: The number of records matched against each query.
+        seed: The seed for the random number generator.
+        shape: The depth, width and list_size of the records.
+
+    Returns:
+        A dictionary of results, see `HIGHER_IS_BETTER`.
+    """
+    texts = make_queries(workload, queries, seed, shape["depth"], shape["width"])
+    data = make_records(records, seed, **shape)
+
+    # The best of several runs, as slower runs are usually caused by something else on the machine
+    construct = min(
+        timeit.repeat(lambda: [QueryEngine(text, max_depth=MAX_DEPTH) for text in texts], number=1, repeat=3)
+    )
+    engines = [QueryEngine(text, max_depth=MAX_DEPTH) for text in texts]
+    record = data[0]
+    latency = min(
+        timeit.repeat(lambda: [engine.match(record) for engine in engines], number=10, repeat=3)
+    ) / 10
+    batch = min(
+        timeit.repeat(lambda: [engine.match(item) for engine in engines for item in data], number=1, repeat=3)
+    )
+
+    # Memory retained by the engines, measured separately as tracing slows everything down
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [QueryEngine(text, max_depth=MAX_DEPTH) for text in texts]
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+
+    return {
+        "construct_us": construct / queries * 1e6,
+        "latency_us": latency / queries * 1e6,
+        "throughput_rps": queries * records / batch,
+        "memory_kb": retained / queries / 1024,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """ Find results which are worse than a baseline.
+
+    Args:
+        results: Results from this run, as returned by `run()`.
+        baseline: Results from a previous run.
+        tolerance: The fraction a result may be worse by, for example 0.2 for 20%.
+
+    Returns:
+        A list of (workload, metric, baseline value, new value) for each regression.
+    """
+    regressions = []
+
+    for workload, metrics in results["workloads"].items():
+        previous = baseline["workloads"].get(workload, {})
+
+        for metric, value in metrics.items():
+            old = previous.get(metric)
+
+            if not old:
+                continue
+
+            ratio = value / old if HIGHER_IS_BETTER[metric] else old / value
+
+            if ratio < 1.0 / (1.0 + tolerance):
+                regressions.append((workload, metric, old, value))
+
+    return regressions
+
+
+def run(queries: int, records: int, seed: int, shape: Dict[str, int]) -> dict:
+    """ Measure every workload.
+
+    Returns:
+        A dictionary which can be saved as JSON, with the environment, the parameters and the results.
+    """
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "querydict": VERSION_STRING,
+        },
+        "parameters": {"queries": queries, "records": records, "seed": seed, **shape},
+        "workloads": {
+            workload: run_workload(workload, queries, records, seed, shape) for workload in WORKLOADS
+        },
+    }
+
+
+def main(argv: list = None) -> int:
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument("--queries", type=int, default=100, help="queries in each workload")
+    arguments.add_argument("--records", type=int, default=200, help="records matched against each query")
+    arguments.add_argument("--seed", type=int, default=1)
+    arguments.add_argument("--depth", type=int, default=3, help="levels of nesting in each record")
+    arguments.add_argument("--width", type=int, default=6, help="fields at each level of a record")
+    arguments.add_argument("--list-size", type=int, default=3, help="items in each list")
+    arguments.add_argument("--output", help="save the results as JSON to this path")
+    arguments.add_argument("--baseline", help="compare with results saved by --output")
+    arguments.add_argument("--tolerance", type=float, default=0.2, help="allowed regression (default: 0.2)")
+    options = arguments.parse_args(argv)
+
+    shape = {"depth": options.depth, "width": options.width, "list_size": options.list_size}
+    results = run(options.queries, options.records, options.seed, shape)
+
+    print("{:<22} {:>14} {:>12} {:>16} {:>12}".format("workload", *HIGHER_IS_BETTER))
+
+    for workload, metrics in results["workloads"].items():
+        print("{:<22} {:>14.1f} {:>12.2f} {:>16.0f} {:>12.2f}".format(workload, *metrics.values()))
+
+    if options.output:
+        with open(options.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+    if not options.baseline:
+        return 0
+
+    with open(options.baseline) as fh:
+        baseline = json.load(fh)
+
+    if baseline["parameters"] != results["parameters"]:
+        print("\nWarning: the baseline was run with different parameters, {}".format(baseline["parameters"]))
+
+    regressions = compare(results, baseline, options.tolerance)
+    print("\n{} regressions compared with {}".format(len(regressions), options.baseline))
+
+    for workload, metric, old, new in regressions:
+        print("  {} {}: {:.2f} -> {:.2f}".format(workload, metric, old, new))
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
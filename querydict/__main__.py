@@ -0,0 +1,82 @@
+"""
+Command line interface, which filters newline delimited JSON and prints matching lines. Sample usage:
+
+    $ python -m querydict "event.action:login AND NOT user.name:root" events.jsonl
+
+If no files are given then standard input is read. Like grep, the exit status is 0 if any line matched, 1 if
+no lines matched and 2 if there was an error.
+"""
+
+import argparse
+import sys
+from typing import List, Optional
+from . import VERSION_STRING
+from .parser import QueryEngine, QueryException
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """ Run the command line interface.
+
+    Args:
+        argv: Command line arguments, excluding the program name (default: sys.argv[1:]).
+
+    Returns:
+        The exit status.
+    """
+    arg_parser = argparse.ArgumentParser(
+        prog="python -m querydict",
+        description="Print lines of newline delimited JSON that match a Lucene style query.",
+    )
+    arg_parser.add_argument("query", help="a Lucene style query")
+    arg_parser.add_argument("files", nargs="*", help="files to read (default: standard input)")
+    arg_parser.add_argument(
+        "--ambiguous-action",
+        choices=sorted(QueryEngine.ambiguous_actions),
+        default="AND",
+        help="the action to use for ambiguous queries (default: AND)",
+    )
+    arg_parser.add_argument(
+        "-c", "--count", action="store_true", help="print the number of matching lines instead"
+    )
+    arg_parser.add_argument(
+        "--no-prefilter",
+        action="store_true",
+        help="decode every line, rather than skipping lines that lack required text",
+    )
+    arg_parser.add_argument(
+        "--typed",
+        action="store_true",
+        help="match numbers, booleans and dates by value, so that port:53 matches the number 53",
+    )
+    arg_parser.add_argument("--version", action="version", version=VERSION_STRING)
+    args = arg_parser.parse_args(argv)
+
+    try:
+        query = QueryEngine(args.query, ambiguous_action=args.ambiguous_action, typed=args.typed)
+    except (QueryException, ValueError) as exc:
+        print("querydict: {}".format(exc), file=sys.stderr)
+        return 2
+
+    output = sys.stdout.buffer
+    count = 0
+
+    for source in args.files or [sys.stdin.buffer]:
+        try:
+            for line in query.filter_ndjson(source, raw=True, prefilter=not args.no_prefilter):
+                count += 1
+
+                if not args.count:
+                    output.write(line + b"\n")
+        except (OSError, ValueError) as exc:
+            print("querydict: {}".format(exc), file=sys.stderr)
+            return 2
+
+    if args.count:
+        output.write("{}\n".format(count).encode("ascii"))
+
+    output.flush()
+    return 0 if count else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
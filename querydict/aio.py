@@ -0,0 +1,118 @@
+"""
+This module filters asynchronous iterables of dictionaries, for example messages from a Kafka consumer, see
+`QueryEngine.filter_async`. Sample usage:
+
+    >>> from querydict.parser import QueryEngine
+    >>> query = QueryEngine("name:Bob")
+    >>> async for record in query.filter_async(consumer):
+    ...     await sink.send(record)
+
+Records are read from the source by a separate task into a bounded queue. When the queue is full the task
+stops reading, so a slow consumer of matches applies backpressure to the source rather than buffering
+without limit.
+
+Records are matched in batches of whatever is waiting in the queue. Large batches can be matched in an
+executor so that the event loop remains responsive, otherwise the event loop is yielded to between batches.
+"""
+
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, List, Optional
+
+# Marks the end of the source in the queue
+_END = object()
+
+
+async def from_iterable(iterable: Iterable[Any], delay: Optional[float] = None) -> AsyncIterator[Any]:
+    """ Produce items from an ordinary iterable asynchronously, for example in tests and benchmarks.
+
+    Args:
+        iterable: The items to produce.
+        delay: Seconds to wait before producing each item, or None to produce items without waiting.
+
+    Yields:
+        Each item.
+    """
+    for item in iterable:
+        if delay is not None:
+            await asyncio.sleep(delay)
+
+        yield item
+
+
+def _filter_batch(match: Any, batch: List[Any], default_field: Optional[str]) -> List[Any]:
+    return [data for data in batch if match(data, default_field)]
+
+
+async def afilter(
+    engine: Any,
+    aiterable: AsyncIterable[Any],
+    maxsize: int = 1000,
+    batch_size: int = 100,
+    executor: Optional[Executor] = None,
+    offload_threshold: int = 100,
+    default_field: Optional[str] = None,
+) -> AsyncIterator[Any]:
+    """ Filter an asynchronous iterable of dictionaries, yielding those which match.
+
+    Args:
+        engine: The QueryEngine to match with.
+        aiterable: An asynchronous iterable of dictionaries.
+        maxsize: The maximum number of records read from the source but not yet matched.
+        batch_size: The maximum number of records matched at once.
+        executor: An executor to match large batches in, or None to always match in the event loop.
+        offload_threshold: The smallest batch which is matched in `executor`, which must be no larger than
+            `batch_size` for any batch to be offloaded.
+        default_field: The name of a field to use for unqualified values.
+
+    Yields:
+        Each matching dictionary, in the same order as the source.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+    errors: List[BaseException] = []
+
+    async def produce() -> None:
+        try:
+            async for data in aiterable:
+                # Only wait when the queue is full, which is the backpressure on the source
+                if queue.full():
+                    await queue.put(data)
+                else:
+                    queue.put_nowait(data)
+        except Exception as exc:  # pylint: disable=broad-except
+            errors.append(exc)
+
+        # Not reached if the task is cancelled, when nothing is waiting for the end of the queue
+        await queue.put(_END)
+
+    producer = asyncio.ensure_future(produce())
+    finished = False
+
+    try:
+        while not finished:
+            batch = [await queue.get()]
+
+            while len(batch) < batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            if batch[-1] is _END:
+                batch.pop()
+                finished = True
+
+            if executor is not None and len(batch) >= offload_threshold:
+                matches = await loop.run_in_executor(
+                    executor, _filter_batch, engine.match, batch, default_field
+                )
+            else:
+                matches = _filter_batch(engine.match, batch, default_field)
+                # Let other tasks run between batches, matching may have taken a while
+                await asyncio.sleep(0)
+
+            for data in matches:
+                yield data
+
+        if errors:
+            raise errors[0]
+    finally:
+        producer.cancel()
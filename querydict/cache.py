@@ -0,0 +1,117 @@
+"""
+This module implements a bounded, thread safe cache of parsed queries, used by `QueryEngine.from_cache`.
+Sample usage:
+
+    >>> from querydict.parser import QueryEngine
+    >>> from querydict.cache import query_cache
+    >>> query = QueryEngine.from_cache("name:Bob")
+    >>> query = QueryEngine.from_cache("name:Bob")
+    >>> query_cache.info()  # CacheInfo(hits=1, misses=1, evictions=0, maxsize=1024, currsize=1)
+
+Parsing and checking a query is much slower than matching, so applications that build a
+`QueryEngine` for each request from a small set of recurring queries should use the cache.
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Any, Callable, Hashable
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"])
+
+
+class QueryCache:
+    """
+    A least recently used cache with a maximum size, which records hit, miss and eviction statistics.
+
+    Args:
+        maxsize: The maximum number of entries to keep (default: 1024).
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        if maxsize < 1:
+            raise ValueError("Cache maxsize must be at least 1")
+
+        self._maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """ Return the entry for a key, creating it with `factory` if it is not in the cache.
+
+        The factory is called without holding the lock, so slow parsing does not block other threads. If two
+        threads miss on the same key at once then both call the factory, and the first result is kept.
+        Exceptions raised by the factory are not cached.
+
+        Args:
+            key: The key to look up.
+            factory: A function which creates the entry.
+
+        Returns:
+            The cached entry.
+        """
+        with self._lock:
+            try:
+                entry = self._entries[key]
+            except KeyError:
+                self._misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry
+
+        entry = factory()
+
+        with self._lock:
+            existing = self._entries.get(key)
+
+            if existing is not None:
+                return existing
+
+            self._entries[key] = entry
+            self._evict()
+
+        return entry
+
+    def _evict(self) -> None:
+        """ Remove the least recently used entries until the cache is within its maximum size. """
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    @property
+    def maxsize(self) -> int:
+        """ The maximum number of entries. Reducing this evicts the least recently used entries. """
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize: int) -> None:
+        if maxsize < 1:
+            raise ValueError("Cache maxsize must be at least 1")
+
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    def info(self) -> CacheInfo:
+        """ Return statistics about the cache.
+
+        Returns:
+            A named tuple of hits, misses, evictions, maxsize and currsize.
+        """
+        with self._lock:
+            return CacheInfo(
+                self._hits, self._misses, self._evictions, self._maxsize, len(self._entries)
+            )
+
+    def clear(self) -> None:
+        """ Remove all entries and reset the statistics. """
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = 0
+
+
+# The process wide cache used by QueryEngine.from_cache
+query_cache = QueryCache()
@@ -0,0 +1,358 @@
+"""
+This module matches queries against columnar data, for example a batch of records loaded from Parquet, and
+returns a boolean mask with one entry per row. It requires NumPy, which can be installed with:
+
+    pip install querydict[numpy]
+
+Columns are looked up using the full field name from the query, so "foo.bar:baz" matches against the column
+named "foo.bar". A missing column, or a value of None, is treated in the same way as a missing field. Search
+terms without a field are matched against each default column, or every column for the default field "*".
+
+A field containing "*", such as "procs.*.name", uses the column named by the part before the first "*", so each
+value of the "procs" column is a list which is searched for a matching item.
+"""
+
+from typing import Any, Mapping, Sequence
+from .record import ALL_FIELDS, DefaultFieldTerm
+from .compiler import (
+    Node, Term, WordTerm, TypedWordTerm, PhraseTerm, RangeTerm, WildcardTerm, RegexTerm, FuzzyTerm, BareTerm, And, Or,
+    Not, Const, ANY_SEGMENT, DATETIME_KINDS, compile_any
+)
+from .parser import MatchException
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+Columns = Mapping[str, Sequence[Any]]
+
+
+def _length(columns: Columns) -> int:
+    """ Find the number of rows, ensuring every column has the same length.
+
+    Args:
+        columns: A mapping of field names to columns.
+
+    Returns:
+        The number of rows.
+
+    Raises:
+        MatchException: If the columns have different lengths.
+    """
+    lengths = {len(column) for column in columns.values()}
+
+    if len(lengths) > 1:
+        raise MatchException("Columns must all have the same length")
+
+    return lengths.pop() if lengths else 0
+
+
+# The Python types of the values of a list which keep the same kind of array, as NumPy converts mixed values
+# such as [1, "x"] to strings and [True, 2] to integers, which would then match differently
+_ARRAY_TYPES = {"b": (bool,), "i": (int,), "f": (float,), "U": (str,)}
+
+
+def _to_array(column: Sequence[Any]) -> "np.ndarray":
+    """ Convert a column to a one dimensional NumPy array, without converting nested or mixed values.
+
+    Args:
+        column: A sequence of values, or a NumPy array.
+
+    Returns:
+        A one dimensional NumPy array.
+    """
+    if isinstance(column, np.ndarray) and column.ndim == 1:
+        return column
+
+    try:
+        array = np.asarray(column)
+    except ValueError:
+        array = None
+
+    # Values that are themselves sequences should not become extra dimensions, and values of different types
+    # are kept as they are
+    if array is not None and array.ndim == 1 and array.dtype.kind != "O":
+        types = _ARRAY_TYPES.get(array.dtype.kind)
+
+        if types is None or any(type(value) not in types for value in column):
+            array = None
+
+    if array is None or array.ndim != 1:
+        array = np.empty(len(column), dtype=object)
+        for row, value in enumerate(column):
+            array[row] = value
+
+    return array
+
+
+def _apply(node: Term, column: "np.ndarray", length: int) -> "np.ndarray":
+    """ Match a term against a column one value at a time, exactly as `QueryEngine.match` would.
+
+    Args:
+        node: The term to match.
+        column: Column values, as a NumPy array.
+        length: The number of rows.
+
+    Returns:
+        A boolean mask.
+    """
+    test = node.compile_test()
+    return np.fromiter(
+        (found is not None and bool(test(found)) for found in column.tolist()),
+        dtype=bool,
+        count=length,
+    )
+
+
+def _match_range(node: RangeTerm, column: "np.ndarray", length: int) -> "np.ndarray":
+    """ Match a range against a column of numbers or fixed width strings, without a Python loop.
+
+    Args:
+        node: The range to match.
+        column: Column values, as a NumPy array of numbers or strings.
+        length: The number of rows.
+
+    Returns:
+        A boolean mask.
+    """
+    column_kind = "string" if column.dtype.kind == "U" else "number"
+
+    if node.kind is not None and node.kind != column_kind:
+        return np.zeros(length, dtype=bool)
+
+    # NaN is not equal to itself, and is not in any range
+    mask = column == column
+
+    if node.low is not None:
+        mask &= column >= node.low if node.include_low else column > node.low
+
+    if node.high is not None:
+        mask &= column <= node.high if node.include_high else column < node.high
+
+    return mask
+
+
+def _match_wildcard(node: WildcardTerm, column: "np.ndarray", length: int) -> "np.ndarray":
+    """ Match a wildcard against a column of fixed width strings, without a Python loop where possible.
+
+    Args:
+        node: The wildcard to match.
+        column: Column values, as a NumPy array of strings.
+        length: The number of rows.
+
+    Returns:
+        A boolean mask.
+    """
+    strategy = node.strategy
+
+    if strategy == "any":
+        return np.ones(length, dtype=bool)
+
+    if strategy == "prefix":
+        return np.char.startswith(column, node.prefix)
+
+    if strategy == "suffix":
+        return np.char.endswith(column, node.suffix)
+
+    if strategy == "contains":
+        return np.char.find(column, node.literals[0]) >= 0
+
+    if strategy == "prefix_suffix":
+        return (
+            (np.char.str_len(column) >= len(node.prefix) + len(node.suffix))
+            & np.char.startswith(column, node.prefix)
+            & np.char.endswith(column, node.suffix)
+        )
+
+    return _apply(node, column, length)
+
+
+def _match_any(node: Term, columns: Columns, length: int) -> "np.ndarray":
+    """ Match a term whose field contains "*" against the column named by the part before the first "*".
+
+    Args:
+        node: The term to match.
+        columns: A mapping of field names to columns.
+        length: The number of rows.
+
+    Returns:
+        A boolean mask.
+    """
+    position = node.path.index(ANY_SEGMENT)
+    name = ".".join("\\*" if key == "*" else key.replace(".", "\\.") for key, _ in node.path[:position])
+    column = columns.get(name)
+
+    if column is None:
+        return np.zeros(length, dtype=bool)
+
+    match = compile_any(node.path[position:], node.compile_test())
+    return np.fromiter(
+        (found is not None and match(found) for found in _to_array(column).tolist()),
+        dtype=bool,
+        count=length,
+    )
+
+
+# The type of the form of a typed word which is compared with each kind of column
+_FORM_TYPES = {"i": int, "u": int, "f": float, "b": bool, "U": str}
+
+
+def _match_typed(node: TypedWordTerm, column: "np.ndarray", length: int) -> "np.ndarray":
+    """ Match a typed word against a column, comparing the whole column with one form of the word. """
+    form_type = _FORM_TYPES.get(column.dtype.kind)
+
+    # Columns of one type are compared with the form for that type, or never match if the word has none
+    if node.kind is None and form_type is not None:
+        expected = node.forms.get(form_type)
+        return column == expected if expected is not None else np.zeros(length, dtype=bool)
+
+    return _apply(node, column, length)
+
+
+def _match_term(node: Term, columns: Columns, length: int) -> "np.ndarray":
+    column = columns.get(node.field)
+
+    if column is None:
+        if ANY_SEGMENT in node.path:
+            return _match_any(node, columns, length)
+
+        return np.zeros(length, dtype=bool)
+
+    column = _to_array(column)
+    kind = column.dtype.kind
+
+    if isinstance(node, TypedWordTerm):
+        return _match_typed(node, column, length)
+
+    # Fixed width strings can be compared without a Python loop
+    if kind == "U":
+        if isinstance(node, WordTerm):
+            return column == node.value
+
+        if isinstance(node, PhraseTerm):
+            return np.char.find(column, node.value) >= 0
+
+        if isinstance(node, WildcardTerm):
+            return _match_wildcard(node, column, length)
+
+        if isinstance(node, DefaultFieldTerm) and not node.casefold:
+            return column == node.value if not node.phrase else np.char.find(column, node.value) >= 0
+
+    # Booleans are excluded, as True is not in the range [0 TO 5], and strings in a range of datetimes are
+    # converted one at a time
+    if kind in "iufU" and isinstance(node, RangeTerm) and not (kind == "U" and node.kind in DATETIME_KINDS):
+        return _match_range(node, column, length)
+
+    # Numbers, booleans and dates are never equal to a string literal, or match a pattern
+    if kind in "biufcmM" and isinstance(node, (WordTerm, WildcardTerm, RegexTerm, FuzzyTerm)):
+        return np.zeros(length, dtype=bool)
+
+    return _apply(node, column, length)
+
+
+def expand_bare(node: Node, fields: Sequence[str], casefold: bool, columns: Columns) -> Node:
+    """ Replace every bare term with an OR of the term matched against each default column.
+
+    Args:
+        node: A node of the intermediate representation.
+        fields: The default fields, which may include "*" for every column.
+        casefold: Whether bare terms match regardless of case.
+        columns: The columns which will be matched.
+
+    Returns:
+        The new node, which does not contain any BareTerm.
+    """
+    if isinstance(node, BareTerm):
+        names = list(columns) if ALL_FIELDS in fields else fields
+        return Or([DefaultFieldTerm(name, node.value, node.phrase, casefold) for name in names])
+
+    if isinstance(node, Not):
+        return Not(expand_bare(node.child, fields, casefold, columns))
+
+    if isinstance(node, (And, Or)):
+        return type(node)([expand_bare(child, fields, casefold, columns) for child in node.children])
+
+    return node
+
+
+def _match_and(node: And, columns: Columns, length: int) -> "np.ndarray":
+    mask = np.ones(length, dtype=bool)
+
+    for child in node.children:
+        mask &= _match(child, columns, length)
+
+        # No row can match, so there is no need to evaluate the remaining children
+        if not mask.any():
+            break
+
+    return mask
+
+
+def _match_or(node: Or, columns: Columns, length: int) -> "np.ndarray":
+    mask = np.zeros(length, dtype=bool)
+
+    for child in node.children:
+        mask |= _match(child, columns, length)
+
+        if mask.all():
+            break
+
+    return mask
+
+
+def _match_not(node: Not, columns: Columns, length: int) -> "np.ndarray":
+    return ~_match(node.child, columns, length)
+
+
+def _match_const(node: Const, columns: Columns, length: int) -> "np.ndarray":
+    return np.full(length, node.value, dtype=bool)
+
+
+# This dictionary maps intermediate nodes to functions which match them against columns
+_MATCH_MAP = {
+    And: _match_and,
+    Or: _match_or,
+    Not: _match_not,
+    Const: _match_const,
+}
+
+
+def _match(node: Node, columns: Columns, length: int) -> "np.ndarray":
+    match_fn = _MATCH_MAP.get(type(node), None)
+
+    if match_fn is None:
+        if not isinstance(node, Term):  # pragma: no cover
+            raise Exception("Unhandled node type {}".format(str(type(node))))
+
+        match_fn = _match_term
+
+    return match_fn(node, columns, length)
+
+
+def match_columns(
+    node: Node, columns: Columns, fields: Sequence[str] = (), casefold: bool = False
+) -> "np.ndarray":
+    """ Match columnar data against a node of the intermediate representation.
+
+    Args:
+        node: The node to match, usually `QueryEngine._ir`.
+        columns: A mapping of field names to sequences or NumPy arrays, each with one value per row.
+        fields: The default fields searched by bare terms.
+        casefold: Whether bare terms match regardless of case.
+
+    Returns:
+        A NumPy array of booleans, True for rows that match.
+
+    Raises:
+        ImportError: If NumPy is not installed.
+        MatchException: If the columns have different lengths.
+    """
+    if np is None:  # pragma: no cover
+        raise ImportError("Matching columns requires numpy, install querydict[numpy]")
+
+    if fields:
+        node = expand_bare(node, fields, casefold, columns)
+
+    length = _length(columns)
+    return np.asarray(_match(node, columns, length), dtype=bool)
@@ -0,0 +1,1275 @@
+"""
+This module lowers a validated luqum tree into a small intermediate representation, then compiles that
+representation into a single callable. Matching a record is then one call, rather than a walk of the luqum
+tree with type dispatch at every node.
+
+The intermediate representation is deliberately simple:
+
+* `Term` objects compare a single field against a literal (`WordTerm`, `PhraseTerm`, `RangeTerm`,
+  `FuzzyTerm`) or a pattern (`WildcardTerm`, `RegexTerm`).
+* `And` and `Or` hold a flat tuple of children, nested operations of the same type are merged.
+* `Not` holds a single child.
+* `BareTerm` is a literal without a field name.
+* `TypedWordTerm` is a Word which is also compared with numbers, booleans and datetimes, and is only produced
+  by `type_words()` when a query is compiled with `typed=True` or a schema.
+* `Const` always or never matches, and is only produced by `querydict.normalize`.
+* `Compiled` holds a matcher which has already been compiled, and is only used by `querydict.subexpressions`.
+
+Groups are removed entirely during lowering, as they only affect how the query is parsed. Field names are
+split into their path segments once, so matching walks the input dictionary directly.
+
+A path segment of `*` matches every item of a list, or every value of a dictionary, so "procs.*.name:cmd.exe"
+matches if any process has that name. Each term is tested against the values it finds one at a time, and stops
+at the first match without copying the input data.
+"""
+
+import math
+import re
+import sys
+from collections.abc import Mapping
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple, Union
+from luqum.tree import (
+    Item,
+    AndOperation,
+    OrOperation,
+    Group,
+    SearchField,
+    Word,
+    Phrase,
+    Range,
+    Regex,
+    Fuzzy,
+    Prohibit,
+    Not as NotOperation,
+)
+from .fuzzy import fuzzy_matcher
+
+Matcher = Callable[[Any], bool]
+Accessor = Callable[[Any], Any]
+Segment = Tuple[Optional[str], Optional[int]]
+
+# Returned by accessors when a field does not exist in the input data
+MISSING = object()
+
+# The path segment for "*", which matches every item of a list or value of a dictionary
+ANY_SEGMENT: Segment = (None, None)
+
+
+class Node:
+    """
+    Base class for nodes in the intermediate representation.
+
+    Nodes use `__slots__`, and the field names and literals of terms are interned, as large rule sets keep many
+    thousands of nodes for the life of the process.
+    """
+
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "{}({})".format(type(self).__name__, self._repr_args())
+
+    def _repr_args(self) -> str:  # pragma: no cover
+        return ""
+
+
+class Term(Node):
+    """
+    Base class for a comparison of a single named field against a literal value.
+
+    Args:
+        field: The dotted name of the field, for example "foo.bar".
+        value: The literal to compare against, with any quotes already removed.
+    """
+
+    __slots__ = ("field", "path", "value")
+
+    def __init__(self, field: str, value: str):
+        self.field = sys.intern(field)
+        self.path = split_path(self.field)
+        self.value = sys.intern(value)
+
+    def _repr_args(self) -> str:
+        return "{!r}, {!r}".format(self.field, self.value)
+
+    def compile_test(self) -> Matcher:
+        """ Compile the comparison performed against a field value.
+
+        Returns:
+            A function which accepts a value found in the input data (never MISSING), and returns True if
+            it matches this term.
+        """
+        raise NotImplementedError  # pragma: no cover
+
+
+class WordTerm(Term):
+    """
+    A field which must be exactly equal to a Word.
+    """
+
+    __slots__ = ()
+
+    def compile_test(self) -> Matcher:
+        value = self.value
+        return lambda found: found == value
+
+
+class PhraseTerm(Term):
+    """
+    A field which must contain a Phrase. Values which do not support `in`, such as integers, do not match.
+    """
+
+    __slots__ = ()
+
+    def compile_test(self) -> Matcher:
+        value = self.value
+
+        def test_phrase(found: Any) -> bool:
+            try:
+                return value in found
+            except TypeError:
+                return False
+
+        return test_phrase
+
+
+def value_kind(value: Any) -> Optional[str]:
+    """ Find which kind of range bound a value can be compared with.
+
+    Args:
+        value: A literal from a query, or a value from the input data.
+
+    Returns:
+        "number", "string", "datetime" (for naive datetimes), "datetime-tz" (for timezone aware datetimes), or None
+        if the value cannot be compared with any range.
+    """
+    value_type = type(value)
+
+    # bool is a subclass of int, but True should not be in the range [0 TO 5]
+    if value_type is bool:
+        return None
+
+    if isinstance(value, (int, float)):
+        return "number"
+
+    if isinstance(value, str):
+        return "string"
+
+    if isinstance(value, datetime):
+        return "datetime" if value.tzinfo is None else "datetime-tz"
+
+    return None
+
+
+# Kinds of range which also match ISO 8601 strings, as JSON has no type for datetimes
+DATETIME_KINDS = ("datetime", "datetime-tz")
+
+
+def parse_timestamp(text: str) -> Optional[datetime]:
+    """ Convert an ISO 8601 string, such as a datetime decoded from JSON, to a datetime.
+
+    Args:
+        text: A string from the input data.
+
+    Returns:
+        The datetime, or None if the string is not an ISO 8601 date or datetime.
+    """
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def coerce_bound(text: str) -> Any:
+    """ Convert the text of a range bound to the type it will be compared as.
+
+    Args:
+        text: The bound from the query, for example "10", "1.5", "2020-01-01T00:00:00" or "*".
+
+    Returns:
+        An int, float, datetime or str, or None if the range is unbounded.
+    """
+    if text == "*":
+        return None
+
+    for convert in (int, float, datetime.fromisoformat):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+
+    return text
+
+
+def range_kind(low: Any, high: Any) -> Optional[str]:
+    """ Find the kind of value a range can be compared with.
+
+    Args:
+        low: The lower bound, as returned by `coerce_bound()`.
+        high: The upper bound, as returned by `coerce_bound()`.
+
+    Returns:
+        The kind of both bounds, see `value_kind()`, or None if the range is unbounded.
+
+    Raises:
+        ValueError: If the bounds are of different kinds, for example a number and a datetime.
+    """
+    kinds = {value_kind(bound) for bound in (low, high) if bound is not None}
+
+    if len(kinds) > 1:
+        raise ValueError("Range bounds {} and {} cannot be compared".format(low, high))
+
+    # An unbounded range [* TO *] matches any value which could be compared with a range
+    return kinds.pop() if kinds else None
+
+
+class RangeTerm(Term):
+    """
+    A field which must be within a range. Bounds are converted to numbers or datetimes when possible, and
+    the field only matches values of the same kind, see `value_kind()`. Ranges of datetimes also match ISO 8601
+    strings, which are converted with `parse_timestamp()`, as records decoded from JSON have no datetimes.
+
+    Args:
+        field: The dotted name of the field, for example "foo.bar".
+        low: The text of the lower bound, or "*" if there is no lower bound.
+        high: The text of the upper bound, or "*" if there is no upper bound.
+        include_low: Whether the lower bound is inclusive, as with [..].
+        include_high: Whether the upper bound is inclusive, as with [..].
+
+    Raises:
+        ValueError: If the bounds are of different kinds, for example a number and a datetime.
+    """
+
+    __slots__ = ("bounds", "low", "high", "include_low", "include_high", "kind")
+
+    def __init__(self, field: str, low: str, high: str, include_low: bool = True, include_high: bool = True):
+        value = "{}{} TO {}{}".format("[" if include_low else "{", low, high, "]" if include_high else "}")
+        super().__init__(field, value)
+        # The text of the bounds, kept so the term can be serialized, see querydict.serialize
+        self.bounds = (low, high)
+        self.low = coerce_bound(low)
+        self.high = coerce_bound(high)
+        self.include_low = include_low
+        self.include_high = include_high
+        self.kind = range_kind(self.low, self.high)
+
+    def compile_test(self) -> Matcher:
+        kind, low, high = self.kind, self.low, self.high
+        include_low, include_high = self.include_low, self.include_high
+
+        def test_range(found: Any) -> bool:
+            found_kind = value_kind(found)
+
+            # NaN is not equal to itself, and is not in any range
+            if found_kind is None or (kind is not None and found_kind != kind) or found != found:
+                return False
+
+            if low is not None and (found < low if include_low else found <= low):
+                return False
+
+            if high is not None and (found > high if include_high else found >= high):
+                return False
+
+            return True
+
+        if kind not in DATETIME_KINDS:
+            return test_range
+
+        def test_timestamp(found: Any) -> bool:
+            # A string which is not a timestamp becomes None, which is not in any range
+            return test_range(parse_timestamp(found) if type(found) is str else found)
+
+        return test_timestamp
+
+
+# Kinds of value a field can be declared to hold in a schema, see TypedWordTerm
+FIELD_KINDS = ("string", "casefold", "number", "boolean", "datetime")
+
+# The type of a Word's form which each kind of field is compared with
+_KIND_TYPES = {"number": int, "boolean": bool, "datetime": datetime}
+
+_BOOLEANS = {"true": True, "false": False}
+
+
+def word_forms(text: str) -> Dict[type, Any]:
+    """ Convert a Word to each type of value it can be equal to.
+
+    Args:
+        text: The Word, with any escapes already removed.
+
+    Returns:
+        A map of the type of a value found in a record to the form of the Word it is compared with. The string
+        is always included, numbers are included for both int and float, and booleans and datetimes when the
+        Word is one, for example "TRUE" or "2020-01-01T10:00:00".
+    """
+    forms: Dict[type, Any] = {str: text}
+    number = coerce_bound(text)
+
+    # Booleans are not numbers, as True is a subclass of int but should not match "1"
+    if value_kind(number) == "number":
+        forms[int] = forms[float] = number
+
+    if text.lower() in _BOOLEANS:
+        forms[bool] = _BOOLEANS[text.lower()]
+
+    try:
+        forms[datetime] = datetime.fromisoformat(text)
+    except ValueError:
+        pass
+
+    return forms
+
+
+class TypedWordTerm(WordTerm):
+    """
+    A Word which is compared with values of other types, rather than only strings. The forms of the Word are
+    converted once, when the query is compiled, so matching only looks up the form for the type of the value
+    found, see `word_forms()`. With a kind from a schema, a single comparison is chosen instead.
+
+    Args:
+        field: The dotted name of the field, for example "foo.bar".
+        value: The literal to compare against, with any escapes already removed.
+        kind: The kind of value the field holds, one of `FIELD_KINDS`, or None to compare with any type.
+
+    Raises:
+        ValueError: If the kind is not valid, or the Word cannot be converted to it.
+    """
+
+    __slots__ = ("kind", "forms")
+
+    def __init__(self, field: str, value: str, kind: Optional[str] = None):
+        super().__init__(field, value)
+
+        if kind is not None and kind not in FIELD_KINDS:
+            raise ValueError("Invalid kind {!r} for field {}, expected one of {}".format(
+                kind, field, ", ".join(FIELD_KINDS)
+            ))
+
+        self.kind = kind
+        self.forms = word_forms(self.value)
+
+        if kind in _KIND_TYPES and _KIND_TYPES[kind] not in self.forms:
+            raise ValueError("Field {} is a {}, but {!r} is not".format(field, kind, self.value))
+
+    def keys(self) -> FrozenSet[Any]:
+        """ Return every value this term can be equal to, or an empty set if the values are not known. """
+        if self.kind is None:
+            return frozenset(self.forms.values())
+
+        if self.kind in _KIND_TYPES:
+            return frozenset([self.forms[_KIND_TYPES[self.kind]]])
+
+        # Strings of any case can be equal to a case folded term
+        return frozenset()
+
+    def compile_test(self) -> Matcher:
+        value, kind = self.value, self.kind
+
+        if kind is None:
+            get_form = self.forms.get
+            # Values of other types, such as lists, are compared with the Word as an untyped term would be
+            return lambda found: found == get_form(type(found), value)
+
+        if kind == "casefold":
+            folded = value.casefold()
+            return lambda found: type(found) is str and found.casefold() == folded
+
+        expected = self.forms[_KIND_TYPES[kind]]
+
+        if kind == "boolean":
+            return lambda found: found is expected
+
+        return lambda found: found == expected
+
+
+def type_words(node: Node, typed: bool, schema: Dict[str, str]) -> Node:
+    """ Replace Words with terms which compare them as other types, see `TypedWordTerm`.
+
+    The tree is not modified, a new tree is returned which shares unchanged nodes. Words without any form other
+    than a string, and Words on fields which a schema declares to be strings, are not replaced.
+
+    Args:
+        node: A node of the intermediate representation.
+        typed: Whether Words on fields without a kind in the schema are compared with values of any type.
+        schema: A map of field names, as written in the query, to the kind of value they hold.
+
+    Returns:
+        The new node.
+
+    Raises:
+        ValueError: If a kind in the schema is not valid, or a Word cannot be converted to the kind of its field.
+    """
+    if type(node) is WordTerm:
+        kind = schema.get(node.field)
+
+        if kind is None and typed and len(word_forms(node.value)) > 1:
+            return TypedWordTerm(node.field, node.value)
+
+        if kind is not None and kind != "string":
+            return TypedWordTerm(node.field, node.value, kind)
+
+        return node
+
+    if isinstance(node, Not):
+        return Not(type_words(node.child, typed, schema))
+
+    if isinstance(node, (And, Or)):
+        return type(node)([type_words(child, typed, schema) for child in node.children])
+
+    return node
+
+
+def has_wildcard(text: str) -> bool:
+    """ Check whether a Word contains a wildcard, `*` or `?`, which is not escaped with a backslash.
+
+    Args:
+        text: The text of a Word, as written in the query.
+
+    Returns:
+        True if the Word is a wildcard pattern.
+    """
+    escaped = False
+
+    for char in text:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char in "*?":
+            return True
+
+    return False
+
+
+class Wildcard:
+    """ A wildcard in a pattern split by `split_wildcards()`, which is never equal to literal text. """
+
+    __slots__ = ("char",)
+
+    def __init__(self, char: str):
+        self.char = char
+
+    def __repr__(self) -> str:
+        return "Wildcard({!r})".format(self.char)
+
+
+# Wildcards matching any number of characters and exactly one character
+ANY_CHARS = Wildcard("*")
+ONE_CHAR = Wildcard("?")
+
+
+def split_wildcards(text: str) -> List[Union[str, Wildcard]]:
+    """ Split a wildcard pattern into literal text and wildcards, removing escapes.
+
+    Args:
+        text: The text of a Word, as written in the query.
+
+    Returns:
+        A list where each item is `ANY_CHARS`, `ONE_CHAR` or literal text, so an escaped "\\*" is the literal
+        text "*". Consecutive `ANY_CHARS` are merged.
+    """
+    tokens: List[Union[str, Wildcard]] = []
+    literal: List[str] = []
+    chars = iter(text)
+
+    for char in chars:
+        if char == "\\":
+            literal.append(next(chars, "\\"))
+            continue
+
+        if char not in "*?":
+            literal.append(char)
+            continue
+
+        if literal:
+            tokens.append("".join(literal))
+            literal = []
+
+        if char == "?":
+            tokens.append(ONE_CHAR)
+        elif not (tokens and tokens[-1] is ANY_CHARS):
+            tokens.append(ANY_CHARS)
+
+    if literal:
+        tokens.append("".join(literal))
+
+    return tokens
+
+
+class WildcardTerm(Term):
+    """
+    A field which must be a string matching a pattern, where `*` matches any number of characters and `?`
+    matches exactly one.
+
+    The pattern is compiled once. Patterns which only have `*` at the start or end are tested with string
+    methods, for example "web-*" with `str.startswith`, and only other patterns use a regular expression.
+
+    Args:
+        field: The dotted name of the field, for example "foo.bar".
+        value: The pattern, as written in the query.
+    """
+
+    __slots__ = ("regex", "strategy", "prefix", "suffix", "literals")
+
+    def __init__(self, field: str, value: str):
+        super().__init__(field, value)
+        tokens = split_wildcards(value)
+        literals = [token for token in tokens if isinstance(token, str)]
+        self.regex = None
+
+        # The name of the test used, which shows how expensive the pattern is
+        if (
+            ONE_CHAR in tokens
+            or ANY_CHARS not in tokens
+            or len(literals) > 2
+            or (len(literals) == 2 and len(tokens) != 3)
+        ):
+            self.strategy = "regex"
+            source = "".join(
+                ".*" if token is ANY_CHARS else "." if token is ONE_CHAR else re.escape(token) for token in tokens
+            )
+            self.regex = re.compile(source, re.DOTALL)
+        elif not literals:
+            self.strategy = "any"
+        elif len(literals) == 2:
+            self.strategy = "prefix_suffix"
+        elif tokens[0] is ANY_CHARS and tokens[-1] is ANY_CHARS:
+            self.strategy = "contains"
+        elif tokens[-1] is ANY_CHARS:
+            self.strategy = "prefix"
+        else:
+            self.strategy = "suffix"
+
+        self.prefix = tokens[0] if tokens[0] is not ANY_CHARS else ""
+        self.suffix = tokens[-1] if tokens[-1] is not ANY_CHARS else ""
+        self.literals = literals
+
+    def compile_test(self) -> Matcher:
+        strategy, prefix, suffix = self.strategy, self.prefix, self.suffix
+
+        if strategy == "any":
+            return lambda found: isinstance(found, str)
+
+        if strategy == "prefix":
+            return lambda found: isinstance(found, str) and found.startswith(prefix)
+
+        if strategy == "suffix":
+            return lambda found: isinstance(found, str) and found.endswith(suffix)
+
+        if strategy == "contains":
+            middle = self.literals[0]
+            return lambda found: isinstance(found, str) and middle in found
+
+        if strategy == "prefix_suffix":
+            # The prefix and suffix must not overlap, "ab*ba" does not match "aba"
+            length = len(prefix) + len(suffix)
+            return lambda found: (
+                isinstance(found, str)
+                and len(found) >= length
+                and found.startswith(prefix)
+                and found.endswith(suffix)
+            )
+
+        fullmatch = self.regex.fullmatch
+        return lambda found: isinstance(found, str) and fullmatch(found) is not None
+
+
+class RegexTerm(Term):
+    """
+    A field which must be a string entirely matching a regular expression, like Lucene the expression is
+    anchored at both ends. Expressions use the syntax of Python's `re` module, and are compiled once.
+
+    Args:
+        field: The dotted name of the field, for example "foo.bar".
+        value: The regular expression, without the surrounding slashes.
+
+    Raises:
+        re.error: If the regular expression is invalid.
+    """
+
+    __slots__ = ("regex",)
+
+    def __init__(self, field: str, value: str):
+        super().__init__(field, value)
+        self.regex = re.compile(value)
+
+    def compile_test(self) -> Matcher:
+        fullmatch = self.regex.fullmatch
+        return lambda found: isinstance(found, str) and fullmatch(found) is not None
+
+
+def fuzzy_edits(term: str, degree: Decimal) -> int:
+    """ Find the maximum number of edits for a fuzzy search.
+
+    Args:
+        term: The term being searched for.
+        degree: The number after `~`. A whole number is the maximum number of edits, a fraction between 0 and 1
+            is a minimum similarity as in older versions of Lucene, where "term~0.8" allows one edit for each
+            five characters. `~` alone has a degree of 0.5.
+
+    Returns:
+        The maximum Levenshtein distance which matches.
+
+    Raises:
+        ValueError: If the degree is negative, or above 1 and not a whole number.
+    """
+    if degree < 0 or (degree > 1 and degree != int(degree)):
+        raise ValueError(
+            "Fuzzy degree must be a whole number of edits or a similarity below 1, not {}".format(degree)
+        )
+
+    if degree == int(degree):
+        return int(degree)
+
+    return math.floor((1 - degree) * len(term))
+
+
+class FuzzyTerm(Term):
+    """
+    A field which must be a string within a number of single character insertions, deletions or
+    substitutions of a Word, see `querydict.fuzzy`.
+
+    Args:
+        field: The dotted name of the field, for example "foo.bar".
+        value: The Word, without escapes.
+        max_edits: The maximum Levenshtein distance which matches.
+    """
+
+    __slots__ = ("max_edits",)
+
+    def __init__(self, field: str, value: str, max_edits: int):
+        super().__init__(field, value)
+        self.max_edits = max_edits
+
+    def _repr_args(self) -> str:
+        return "{!r}, {!r}, {!r}".format(self.field, self.value, self.max_edits)
+
+    def compile_test(self) -> Matcher:
+        # Shared by every term with the same value and maximum, so they share recent results
+        return fuzzy_matcher(self.value, self.max_edits)
+
+
+class BareTerm(Node):
+    """
+    A Word or Phrase without a field name, which is matched against the default fields of a record. Records
+    are wrapped in a `querydict.record.RecordView`, which collects the strings of those fields.
+
+    Args:
+        value: The literal to search for, with any quotes already removed.
+        phrase: True if the literal was a Phrase, False if it was a Word.
+    """
+
+    __slots__ = ("value", "phrase")
+
+    def __init__(self, value: str, phrase: bool):
+        self.value = sys.intern(value)
+        self.phrase = phrase
+
+    def _repr_args(self) -> str:
+        return "{!r}, phrase={!r}".format(self.value, self.phrase)
+
+
+class Operation(Node):
+    """
+    Base class for boolean operations over several children.
+
+    Args:
+        children: The child nodes, in the order they should be evaluated.
+    """
+
+    __slots__ = ("children",)
+
+    def __init__(self, children: Tuple[Node, ...]):
+        self.children = tuple(children)
+
+    def _repr_args(self) -> str:
+        return ", ".join(repr(child) for child in self.children)
+
+
+class And(Operation):
+    """
+    Matches if all children match.
+    """
+
+    __slots__ = ()
+
+
+class Or(Operation):
+    """
+    Matches if any child matches.
+    """
+
+    __slots__ = ()
+
+
+class Not(Node):
+    """
+    Inverts the result of a single child.
+
+    Args:
+        child: The node to invert.
+    """
+
+    __slots__ = ("child",)
+
+    def __init__(self, child: Node):
+        self.child = child
+
+    def _repr_args(self) -> str:
+        return repr(self.child)
+
+
+class Const(Node):
+    """
+    A node which always has the same result, for example a contradiction such as "a:x AND a:y".
+
+    Args:
+        value: The result of matching.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: bool):
+        self.value = value
+
+    def _repr_args(self) -> str:
+        return repr(self.value)
+
+
+class Compiled(Node):
+    """
+    A node which has already been compiled, so that AND, OR and NOT can be compiled over shared matchers.
+
+    Args:
+        matcher: The compiled matcher.
+    """
+
+    __slots__ = ("matcher",)
+
+    def __init__(self, matcher: Matcher):
+        self.matcher = matcher
+
+    def _repr_args(self) -> str:
+        return repr(self.matcher)
+
+
+@lru_cache(maxsize=4096)
+def split_path(field: str) -> Tuple[Segment, ...]:
+    """ Split a dotted field name into path segments.
+
+    A dot can be escaped with a backslash to include it in a key, for example "foo\\.bar".  Segments that
+    are entirely digits are also converted to an integer, so they can be used as a list index. A segment of
+    "*" matches any item, and can be escaped as "\\*" to use it as a key.
+
+    Args:
+        field: The dotted name of the field, for example "foo.bar", "list.1.item" or "list.*.item".
+
+    Returns:
+        A tuple of (key, index) pairs, where index is None if the key is not a number, and `ANY_SEGMENT` for
+        each "*".
+    """
+    keys = field.replace("\\.", "\0").split(".")
+    segments = []
+
+    for key in keys:
+        if key == "*":
+            segments.append(ANY_SEGMENT)
+            continue
+
+        key = key.replace("\0", ".")
+
+        if key == "\\*":
+            key = "*"
+
+        # Keys are interned, as the same keys are used by many fields and kept by every path
+        segments.append((sys.intern(key), int(key) if key.isascii() and key.isdigit() else None))
+
+    return tuple(segments)
+
+
+def _fallback(data: Any, key: str, index: Optional[int]) -> Any:
+    """ Look up a path segment which could not be used directly as a key.
+
+    Args:
+        data: The current position in the input data.
+        key: The path segment as a string.
+        index: The path segment as an integer, or None if it is not a number.
+
+    Returns:
+        The value found, or MISSING.
+    """
+    if index is None:
+        return MISSING
+
+    if isinstance(data, list):
+        try:
+            return data[index]
+        except IndexError:
+            return MISSING
+
+    # Dictionaries may also use integer keys, including a record wrapped in a RecordView
+    if isinstance(data, Mapping):
+        return data.get(index, MISSING)
+
+    return MISSING
+
+
+@lru_cache(maxsize=4096)
+def compile_path(path: Tuple[Segment, ...]) -> Accessor:
+    """ Compile a path into a function which retrieves the value from nested dictionaries and lists.
+
+    Accessors do not keep any state, so the same accessor is shared by every term with the same path.
+
+    Args:
+        path: Path segments, as returned by `split_path()`.
+
+    Returns:
+        A function which accepts the data to search and returns the value, or MISSING if it is not found.
+    """
+    if len(path) == 1:
+        ((key, index),) = path
+
+        def get_one(data: Any) -> Any:
+            try:
+                return data[key]
+            except (KeyError, TypeError):
+                return _fallback(data, key, index)
+
+        return get_one
+
+    def get_path(data: Any) -> Any:
+        for key, index in path:
+            try:
+                data = data[key]
+            except (KeyError, TypeError):
+                data = _fallback(data, key, index)
+
+                if data is MISSING:
+                    return MISSING
+
+        return data
+
+    return get_path
+
+
+def _items(value: Any) -> Iterator:
+    """ Iterate over the items matched by a "*" path segment, the values of a dictionary or items of a list. """
+    if isinstance(value, Mapping):
+        return iter(value.values())
+
+    if isinstance(value, (list, tuple)):
+        return iter(value)
+
+    return iter(())
+
+
+@lru_cache(maxsize=4096)
+def _split_any(path: Tuple[Segment, ...]) -> Tuple[Accessor, ...]:
+    """ Compile the plain paths before, between and after each "*" in a path, any of which may be empty. """
+    getters = []
+    start = 0
+
+    for position, segment in enumerate(path):
+        if segment == ANY_SEGMENT:
+            getters.append(compile_path(path[start:position]))
+            start = position + 1
+
+    getters.append(compile_path(path[start:]))
+    return tuple(getters)
+
+
+def compile_walk(path: Tuple[Segment, ...]) -> Callable[[Any], Iterator]:
+    """ Compile a path which may contain "*" into a function which finds every value at the path.
+
+    Nested data is walked iteratively with a stack of iterators, depth first, so values are found in the order
+    they appear and a caller can stop as soon as it has found the value it needs.
+
+    Args:
+        path: Path segments, as returned by `split_path()`.
+
+    Returns:
+        A function which accepts the data to search and returns an iterator of the values found, which never
+        includes MISSING.
+    """
+    getters = _split_any(path)
+    first, last = getters[0], len(getters) - 1
+
+    def walk(data: Any) -> Iterator:
+        data = first(data)
+
+        if data is MISSING:
+            return
+
+        if last == 0:
+            yield data
+            return
+
+        stack = [(_items(data), 1)]
+
+        while stack:
+            items, depth = stack[-1]
+
+            for item in items:
+                found = getters[depth](item)
+
+                if found is MISSING:
+                    continue
+
+                if depth == last:
+                    yield found
+                else:
+                    # Descend into this item, and continue with the rest of the items once it is finished
+                    stack.append((_items(found), depth + 1))
+                    break
+            else:
+                stack.pop()
+
+    return walk
+
+
+def compile_any(path: Tuple[Segment, ...], test: Matcher) -> Matcher:
+    """ Compile a path containing "*" and a test into a function which checks if any value found matches.
+
+    Args:
+        path: Path segments, as returned by `split_path()`.
+        test: A function which accepts a value found in the input data, see `Term.compile_test()`.
+
+    Returns:
+        A function which accepts the data to match, and returns True as soon as a value matches the test.
+    """
+    getters = _split_any(path)
+
+    if len(getters) != 2:
+        walk = compile_walk(path)
+        return lambda data: any(map(test, walk(data)))
+
+    # A single "*", the most common case, is a plain loop rather than a generator
+    before, after = getters
+
+    def match_any(data: Any) -> bool:
+        data = before(data)
+
+        if data is MISSING:
+            return False
+
+        for item in _items(data):
+            found = after(item)
+
+            if found is not MISSING and test(found):
+                return True
+
+        return False
+
+    return match_any
+
+
+def compile_values(path: Tuple[Segment, ...]) -> Callable[[Any], List[Any]]:
+    """ Compile a path into a function which returns every value at the path, for paths with or without "*".
+
+    Args:
+        path: Path segments, as returned by `split_path()`.
+
+    Returns:
+        A function which accepts the data to search and returns a list of the values found, which is empty if
+        there are none.
+    """
+    if ANY_SEGMENT in path:
+        walk = compile_walk(path)
+        return lambda data: list(walk(data))
+
+    get = compile_path(path)
+
+    def get_values(data: Any) -> List[Any]:
+        found = get(data)
+        return [] if found is MISSING else [found]
+
+    return get_values
+
+
+def _only_child(operation: Item) -> Item:
+    """ Return the only child of a luqum.tree object.
+
+    This is an internal sanity check to ensure that assumptions made in this module are correct.
+
+    Args:
+        operation: The luqum.tree object to check.
+
+    Returns:
+        The single child of `operation`.
+    """
+    if len(operation.children) != 1:  # pragma: no cover
+        raise Exception(
+            "Unhandled operation with more than 1 child, please report a bug"
+        )
+
+    return operation.children[0]
+
+
+def _strip_phrase(phrase: Phrase) -> str:
+    """ Remove the surrounding double quotes from a Phrase.
+
+    Args:
+        phrase: Instance of luqum.tree.Phrase.
+
+    Returns:
+        The text of the phrase, without quotes.
+    """
+    if phrase.value[0] != '"' or phrase.value[-1] != '"':  # pragma: no cover
+        raise Exception(
+            "Expected Phrase to start and end with double quotes, please report a bug"
+        )
+
+    return phrase.value[1:-1]
+
+
+def range_bound(bound: Item) -> str:
+    """ Return the text of a range bound.
+
+    Args:
+        bound: The low or high child of a luqum.tree.Range.
+
+    Returns:
+        The text of the bound.
+
+    Raises:
+        ValueError: If the bound is not a Word or Phrase.
+    """
+    if isinstance(bound, Word):
+        return bound.value
+
+    if isinstance(bound, Phrase):
+        return _strip_phrase(bound)
+
+    # Negative numbers are parsed as a prohibited Word, for example [-5 TO 5]
+    if isinstance(bound, Prohibit) and isinstance(_only_child(bound), Word):
+        return "-" + _only_child(bound).value
+
+    raise ValueError("Unsupported range bound {}".format(str(bound)))
+
+
+def _lower_search_field(operation: SearchField) -> Node:
+    match = _only_child(operation)
+
+    if isinstance(match, Word):
+        if has_wildcard(match.value):
+            return WildcardTerm(operation.name, match.value)
+
+        # Escaped wildcards are matched literally, "foo\*" is equal to "foo*"
+        return WordTerm(operation.name, match.unescaped_value)
+
+    if isinstance(match, Regex):
+        return RegexTerm(operation.name, match.value[1:-1])
+
+    if isinstance(match, Fuzzy):
+        value = match.term.unescaped_value
+        return FuzzyTerm(operation.name, value, fuzzy_edits(value, match.degree))
+
+    if isinstance(match, Phrase):
+        return PhraseTerm(operation.name, _strip_phrase(match))
+
+    if isinstance(match, Range):
+        return RangeTerm(
+            operation.name,
+            range_bound(match.low),
+            range_bound(match.high),
+            match.include_low,
+            match.include_high,
+        )
+
+    # This should not be possible due to previous checks, but added to ensure
+    # matching cannot silently fail.
+    raise Exception("Unhandled SearchField child")  # pragma: no cover
+
+
+def _lower_operation(node_type: type) -> Callable[[Item], Node]:
+    def lower_operation(operation: Item) -> Node:
+        children = []
+
+        for child in operation.children:
+            child = lower(child)
+
+            # Merge nested operations of the same type, (a AND (b AND c)) is (a AND b AND c)
+            if type(child) is node_type:
+                children.extend(child.children)
+            else:
+                children.append(child)
+
+        return node_type(children)
+
+    return lower_operation
+
+
+# This dictionary maps supported luqum classes to functions which lower them
+_LOWER_MAP = {
+    SearchField: _lower_search_field,
+    AndOperation: _lower_operation(And),
+    OrOperation: _lower_operation(Or),
+    Group: lambda operation: lower(_only_child(operation)),
+    NotOperation: lambda operation: Not(lower(_only_child(operation))),
+    Word: lambda operation: BareTerm(operation.unescaped_value, False),
+    Phrase: lambda operation: BareTerm(_strip_phrase(operation), True),
+}
+
+
+def lower(tree: Item) -> Node:
+    """ Lower a validated luqum tree into the intermediate representation.
+
+    Args:
+        tree: The root of a luqum tree, which has already been checked by `QueryEngine`.
+
+    Returns:
+        The root node of the intermediate representation.
+    """
+    lower_fn = _LOWER_MAP.get(type(tree), None)
+
+    if lower_fn is None:  # pragma: no cover
+        raise Exception("Unhandled operation type {}".format(str(type(tree))))
+
+    return lower_fn(tree)
+
+
+def _compile_word(node: WordTerm, short_circuit: bool) -> Matcher:
+    if ANY_SEGMENT in node.path:
+        return compile_any(node.path, node.compile_test())
+
+    get, value = compile_path(node.path), node.value
+
+    # MISSING never compares equal to a value, so there is no need to check for it
+    return lambda data: get(data) == value
+
+
+def _compile_term(node: Term, short_circuit: bool) -> Matcher:
+    if ANY_SEGMENT in node.path:
+        return compile_any(node.path, node.compile_test())
+
+    get, test = compile_path(node.path), node.compile_test()
+
+    def match_term(data: Any) -> bool:
+        found = get(data)
+
+        if found is MISSING:
+            return False
+
+        return test(found)
+
+    return match_term
+
+
+def _compile_pattern(node: Term, short_circuit: bool) -> Matcher:
+    if ANY_SEGMENT in node.path:
+        return compile_any(node.path, node.compile_test())
+
+    get, test = compile_path(node.path), node.compile_test()
+
+    # MISSING is not a string, so never matches a pattern
+    return lambda data: test(get(data))
+
+
+def _compile_bare(node: BareTerm, short_circuit: bool) -> Matcher:
+    # Bare terms are matched against a querydict.record.RecordView, which collects the default fields once
+    value, folded = node.value, node.value.casefold()
+
+    if node.phrase:
+        return lambda data: (folded if data.casefold else value) in data.text()
+
+    return lambda data: (folded if data.casefold else value) in data.words()
+
+
+def _compile_const(node: Const, short_circuit: bool) -> Matcher:
+    value = node.value
+    return lambda data: value
+
+
+def _compile_compiled(node: Compiled, short_circuit: bool) -> Matcher:
+    return node.matcher
+
+
+def _compile_and(node: And, short_circuit: bool) -> Matcher:
+    matchers = tuple(compile_node(child, short_circuit) for child in node.children)
+
+    if not short_circuit:
+        return lambda data: all([match(data) for match in matchers])
+
+    if len(matchers) == 2:
+        first, second = matchers
+        return lambda data: first(data) and second(data)
+
+    def match_and(data: Any) -> bool:
+        for match in matchers:
+            if not match(data):
+                # Failure of one AND component means none can match, return immediately
+                return False
+
+        return True
+
+    return match_and
+
+
+def _compile_or(node: Or, short_circuit: bool) -> Matcher:
+    matchers = tuple(compile_node(child, short_circuit) for child in node.children)
+
+    if not short_circuit:
+        return lambda data: any([match(data) for match in matchers])
+
+    if len(matchers) == 2:
+        first, second = matchers
+        return lambda data: bool(first(data) or second(data))
+
+    def match_or(data: Any) -> bool:
+        for match in matchers:
+            if match(data):
+                # Success of one OR component means it's a match
+                return True
+
+        return False
+
+    return match_or
+
+
+def _compile_not(node: Not, short_circuit: bool) -> Matcher:
+    match = compile_node(node.child, short_circuit)
+    return lambda data: not match(data)
+
+
+# This dictionary maps intermediate nodes to functions which compile them
+_COMPILE_MAP = {
+    WordTerm: _compile_word,
+    TypedWordTerm: _compile_pattern,
+    PhraseTerm: _compile_term,
+    RangeTerm: _compile_term,
+    WildcardTerm: _compile_pattern,
+    RegexTerm: _compile_pattern,
+    FuzzyTerm: _compile_pattern,
+    BareTerm: _compile_bare,
+    And: _compile_and,
+    Or: _compile_or,
+    Not: _compile_not,
+    Const: _compile_const,
+    Compiled: _compile_compiled,
+}
+
+
+def compile_node(node: Node, short_circuit: bool = True) -> Matcher:
+    """ Compile a node of the intermediate representation into a callable.
+
+    Args:
+        node: The node to compile, usually the root returned by `lower()`.
+        short_circuit: Whether to terminate matching early inside AND or OR conditions.
+
+    Returns:
+        A function which accepts the data to match and returns True if there is a match, False otherwise.
+    """
+    compile_fn = _COMPILE_MAP.get(type(node), None)
+
+    if compile_fn is None:
+        # Subclasses of terms, such as those used by QuerySet, compile in the same way as the term
+        compile_fn = next(
+            (_COMPILE_MAP[base] for base in type(node).__mro__ if base in _COMPILE_MAP), None
+        )
+
+    if compile_fn is None:  # pragma: no cover
+        raise Exception("Unhandled node type {}".format(str(type(node))))
+
+    return compile_fn(node, short_circuit)
@@ -0,0 +1,269 @@
+"""
+This module explains why a query matched or did not match a record, and profiles how each part of a query
+performs over many records. Sample usage:
+
+    >>> from querydict.parser import QueryEngine
+    >>> query = QueryEngine("name:Bob AND (eye_colour:Blue OR eye_colour:Green)")
+    >>> print(query.match({"name": "Bob", "eye_colour": "Brown"}, explain=True))
+    [ ] AND
+      [x] name:Bob
+      [ ] OR  <- decided
+        [ ] eye_colour:Blue  <- decided
+        [ ] eye_colour:Green  <- decided
+
+    >>> query = QueryEngine("name:Bob AND eye_colour:Blue", profile=True)
+    >>> query.match({"name": "Bob", "eye_colour": "Blue"})
+    >>> print(query.stats)
+
+Both work on the intermediate representation in the order it is evaluated, so after AND and OR conditions
+have been reordered. Profiling compiles a separate, instrumented matcher which is only used when a
+`QueryEngine` is created with `profile=True`, so the usual matcher has no hooks and no overhead.
+"""
+
+from time import perf_counter
+from typing import Any, Iterator, List, Sequence
+from .compiler import Node, And, Or, Not, Matcher, compile_node
+from .normalize import canonical
+
+
+def describe(node: Node) -> str:
+    """ Describe a single node, without its children.
+
+    Args:
+        node: A node of the intermediate representation.
+
+    Returns:
+        The operator for AND, OR and NOT, or the canonical string for anything else.
+    """
+    if isinstance(node, And):
+        return "AND"
+
+    if isinstance(node, Or):
+        return "OR"
+
+    if isinstance(node, Not):
+        return "NOT"
+
+    return canonical(node)
+
+
+class Explanation:
+    """
+    The result of matching one node against a record, with the results of the children that were evaluated.
+
+    Children which were not evaluated, because short circuiting had already decided the result, are not
+    included. An explanation is true if the node matched, so it can be used in place of the result of `match()`.
+
+    Args:
+        node: The node that was matched.
+        matched: Whether the node matched.
+        children: Explanations for the children that were evaluated, in the order they were evaluated.
+    """
+
+    def __init__(self, node: Node, matched: bool, children: Sequence["Explanation"] = ()):
+        self.node = node
+        self.matched = matched
+        self.children = list(children)
+        # Whether this node decided the result of its parent, the root always decides the result
+        self.decisive = True
+        self._mark_decisive()
+
+    def _mark_decisive(self) -> None:
+        """ Mark which children decided the result of this node. """
+        if not isinstance(self.node, (And, Or)):
+            return
+
+        # An AND is decided by children that do not match, unless every child matches (and the reverse for OR)
+        decision = isinstance(self.node, Or)
+
+        for child in self.children:
+            child.decisive = child.matched is decision or self.matched is not decision
+
+    def __bool__(self) -> bool:
+        return self.matched
+
+    def __repr__(self) -> str:
+        return "Explanation({!r}, {!r})".format(describe(self.node), self.matched)
+
+    def __str__(self) -> str:
+        return "\n".join(self._lines(0, False))
+
+    def _lines(self, depth: int, mark: bool) -> Iterator[str]:
+        yield "{}[{}] {}{}".format(
+            "  " * depth,
+            "x" if self.matched else " ",
+            describe(self.node),
+            "  <- decided" if mark and self.decisive else "",
+        )
+
+        # Every child of a NOT decides its result, so only the children of AND and OR are marked
+        for child in self.children:
+            yield from child._lines(depth + 1, isinstance(self.node, (And, Or)))
+
+    def decided_by(self) -> List["Explanation"]:
+        """ Find the terms which decided the result, following decisive children down the tree.
+
+        Returns:
+            Explanations for the terms, in the order they were evaluated.
+        """
+        if not self.children:
+            return [self]
+
+        return [term for child in self.children if child.decisive for term in child.decided_by()]
+
+    def to_dict(self) -> dict:
+        """ Convert the explanation into dictionaries and lists, for example to log as JSON.
+
+        Returns:
+            A dictionary with the description of the node, whether it matched and decided the result of its
+            parent, and a list of its children in the same format.
+        """
+        return {
+            "node": describe(self.node),
+            "matched": self.matched,
+            "decisive": self.decisive,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+def explain(node: Node, data: Any, short_circuit: bool = True) -> Explanation:
+    """ Match a record against a node, recording the result of every node that is evaluated.
+
+    This is much slower than a compiled matcher, as terms are compiled again for each call.
+
+    Args:
+        node: A node of the intermediate representation, in the order it is evaluated.
+        data: The data to match, which has already been wrapped for bare terms if needed.
+        short_circuit: Whether to stop evaluating AND and OR conditions once the result is known.
+
+    Returns:
+        The explanation for the node.
+    """
+    if isinstance(node, (And, Or)):
+        decision = isinstance(node, Or)
+        children = []
+
+        for child in node.children:
+            children.append(explain(child, data, short_circuit))
+
+            if short_circuit and children[-1].matched is decision:
+                break
+
+        matched = any(children) if decision else all(children)
+        return Explanation(node, matched, children)
+
+    if isinstance(node, Not):
+        child = explain(node.child, data, short_circuit)
+        return Explanation(node, not child.matched, [child])
+
+    return Explanation(node, bool(compile_node(node, short_circuit)(data)))
+
+
+class NodeStats:
+    """
+    Counters for one node of a profiled query.
+
+    Args:
+        node: The node being profiled.
+        depth: The depth of the node in the tree, where the root has a depth of zero.
+    """
+
+    def __init__(self, node: Node, depth: int):
+        self.node = node
+        self.depth = depth
+        self.evaluations = 0
+        self.matches = 0
+        # Cumulative seconds spent evaluating the node, including its children
+        self.time = 0.0
+
+    @property
+    def failures(self) -> int:
+        """ The number of evaluations which did not match. """
+        return self.evaluations - self.matches
+
+    def __repr__(self) -> str:
+        return "NodeStats({!r}, evaluations={}, matches={}, time={:.6f})".format(
+            describe(self.node), self.evaluations, self.matches, self.time
+        )
+
+
+class Profile:
+    """
+    Counters for every node of a profiled query, in the order the nodes are evaluated with their parents first.
+    """
+
+    def __init__(self) -> None:
+        self.nodes: List[NodeStats] = []
+
+    def __iter__(self) -> Iterator[NodeStats]:
+        return iter(self.nodes)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def reset(self) -> None:
+        """ Set every counter back to zero. """
+        for stats in self.nodes:
+            stats.evaluations = stats.matches = 0
+            stats.time = 0.0
+
+    def __str__(self) -> str:
+        lines = ["{:>10} {:>10} {:>10} {:>10}  {}".format("evals", "matches", "fails", "time (ms)", "node")]
+
+        for stats in self.nodes:
+            lines.append(
+                "{:>10} {:>10} {:>10} {:>10.3f}  {}{}".format(
+                    stats.evaluations,
+                    stats.matches,
+                    stats.failures,
+                    stats.time * 1e3,
+                    "  " * stats.depth,
+                    describe(stats.node),
+                )
+            )
+
+        return "\n".join(lines)
+
+
+def compile_profiled(node: Node, profile: Profile, short_circuit: bool = True, depth: int = 0) -> Matcher:
+    """ Compile a node into a callable which updates a counter for every node as it is evaluated.
+
+    Args:
+        node: A node of the intermediate representation, in the order it is evaluated.
+        profile: The profile which a `NodeStats` for each node is added to.
+        short_circuit: Whether to terminate matching early inside AND or OR conditions.
+        depth: The depth of the node in the tree.
+
+    Returns:
+        A function which accepts the data to match and returns True if there is a match, False otherwise.
+    """
+    stats = NodeStats(node, depth)
+    profile.nodes.append(stats)
+
+    if isinstance(node, (And, Or)):
+        matchers = [compile_profiled(child, profile, short_circuit, depth + 1) for child in node.children]
+        combine = any if isinstance(node, Or) else all
+
+        def match(data: Any) -> bool:
+            results = (child(data) for child in matchers)
+            # Without short circuiting every child is evaluated, so the counters of every child are updated
+            return combine(results if short_circuit else list(results))
+
+    elif isinstance(node, Not):
+        child = compile_profiled(node.child, profile, short_circuit, depth + 1)
+
+        def match(data: Any) -> bool:
+            return not child(data)
+
+    else:
+        match = compile_node(node, short_circuit)
+
+    def profiled(data: Any) -> bool:
+        start = perf_counter()
+        result = bool(match(data))
+        stats.time += perf_counter() - start
+        stats.evaluations += 1
+        stats.matches += result
+        return result
+
+    return profiled
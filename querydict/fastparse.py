@@ -0,0 +1,185 @@
+"""
+This module parses the most common queries without luqum's parser, which is generated with PLY when it is
+first imported and is slow to both import and run. Sample usage:
+
+    >>> from querydict.fastparse import parse
+    >>> parse("name:Bob AND NOT eye_colour:Blue")
+    AndOperation(SearchField('name', Word('Bob')), Not(SearchField('eye_colour', Word('Blue'))))
+
+Queries made only of fields, Words, Phrases, AND, OR, NOT and parentheses are parsed here, into the same
+luqum tree that luqum's parser produces, so they are checked and lowered in exactly the same way. Words and
+fields are found with luqum's own regular expression, and AND binds more tightly than OR as it does in luqum.
+
+Anything else, including implicit operators such as "a:1 b:2", ranges, regular expressions, fuzzy searches,
+boosts, `+` and `-`, and invalid queries, returns None so that the caller falls back to luqum. Errors are
+always reported by luqum, so their messages do not depend on which parser was tried first.
+"""
+
+import re
+from typing import List, Optional, Tuple
+from luqum.tree import Item, AndOperation, OrOperation, Group, SearchField, Word, Phrase, Not
+
+# The same as luqum's TERM_RE and PHRASE_RE, with groups which do not capture
+_TOKEN = re.compile(
+    r"""
+    \s*
+    (?:
+      (?P<term>
+        (?:[^\s:^~(){}[\]/"'+\-\\<>]|\\.)
+        (?:[^\s:^\\~(){}[\]]|\\.|(?<=T\d{2}):\d{2}(?::\d{2})?)*
+      )
+      |(?P<column>:)
+      |(?P<lparen>\()
+      |(?P<rparen>\))
+      |(?P<phrase>"(?:[^\\"]|\\.)*")
+    )
+    """,
+    re.VERBOSE,
+)
+
+_SPACE = re.compile(r"\s*")
+
+# Words which luqum treats as operators, "TO" is only used in ranges
+_RESERVED = {"AND", "OR", "NOT", "TO"}
+
+# Deeper nesting of parentheses and NOT is left to luqum, which does not recurse
+MAX_NESTING = 50
+
+Token = Tuple[str, str]
+
+
+class _Unsupported(Exception):
+    """ Raised when a query is outside the subset parsed here. """
+
+
+def tokenize(query: str) -> Optional[List[Token]]:
+    """ Split a query into tokens.
+
+    Args:
+        query: A Lucene style query.
+
+    Returns:
+        A list of (kind, text), where kind is "term", "column", "lparen", "rparen", "phrase", or the text of an
+        operator. None if the query contains any other token.
+    """
+    tokens = []
+    position = _SPACE.match(query).end()
+
+    while position < len(query):
+        match = _TOKEN.match(query, position)
+
+        if match is None:
+            return None
+
+        kind, text = match.lastgroup, match.group(match.lastgroup)
+
+        if kind == "term" and text in _RESERVED:
+            kind = text
+
+        tokens.append((kind, text))
+        position = _SPACE.match(query, match.end()).end()
+
+    return tokens
+
+
+class _Parser:
+    """ A recursive descent parser for the supported subset of queries. """
+
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.index = 0
+        self.nesting = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.index][0] if self.index < len(self.tokens) else None
+
+    def take(self, kind: str) -> str:
+        if self.peek() != kind:
+            raise _Unsupported
+
+        self.index += 1
+        return self.tokens[self.index - 1][1]
+
+    def parse(self) -> Item:
+        tree = self.parse_or()
+
+        # Anything left over is an implicit operator or an error, both of which luqum handles
+        if self.index != len(self.tokens):
+            raise _Unsupported
+
+        return tree
+
+    def parse_or(self) -> Item:
+        operands = [self.parse_and()]
+
+        while self.peek() == "OR":
+            self.index += 1
+            operands.append(self.parse_and())
+
+        return operands[0] if len(operands) == 1 else OrOperation(*operands)
+
+    def parse_and(self) -> Item:
+        operands = [self.parse_unary()]
+
+        while self.peek() == "AND":
+            self.index += 1
+            operands.append(self.parse_unary())
+
+        return operands[0] if len(operands) == 1 else AndOperation(*operands)
+
+    def parse_unary(self) -> Item:
+        kind = self.peek()
+
+        if kind in ("NOT", "lparen"):
+            self.nesting += 1
+
+            if self.nesting > MAX_NESTING:
+                raise _Unsupported
+
+            self.index += 1
+
+            if kind == "NOT":
+                item = Not(self.parse_unary())
+            else:
+                item = Group(self.parse_or())
+                self.take("rparen")
+
+            self.nesting -= 1
+            return item
+
+        if kind == "phrase":
+            return Phrase(self.take("phrase"))
+
+        name = self.take("term")
+
+        if self.peek() != "column":
+            return Word(name)
+
+        self.index += 1
+
+        # Only a single Word or Phrase, as a group after a field is a different luqum type
+        if self.peek() == "phrase":
+            return SearchField(name, Phrase(self.take("phrase")))
+
+        return SearchField(name, Word(self.take("term")))
+
+
+def parse(query: str) -> Optional[Item]:
+    """ Parse a query in the supported subset into a luqum tree.
+
+    Args:
+        query: A Lucene style query.
+
+    Returns:
+        The luqum tree, equal to the tree from luqum's parser, or None if the query is not in the subset or is
+        not valid.
+    """
+    tokens = tokenize(query)
+
+    if not tokens:
+        return None
+
+    try:
+        return _Parser(tokens).parse()
+    except _Unsupported:
+        return None
@@ -0,0 +1,146 @@
+"""
+This module implements the bounded edit distance used by fuzzy searches, such as "name:Jon~1".
+
+Only whether a value is within a maximum number of edits of the term is needed, not the exact distance, so
+most comparisons finish long before a full Levenshtein matrix would be filled:
+
+* Values whose length differs from the term by more than the maximum are rejected without any other work.
+* Common prefixes and suffixes are removed, as they never add to the distance.
+* Only a band of the matrix within the maximum distance of the diagonal is computed, as any cell outside it
+  must already exceed the maximum.
+* Computation stops as soon as every cell in a row exceeds the maximum.
+
+Each distinct term and maximum share one `FuzzyMatcher`, see `fuzzy_matcher()`, so rules in a `QuerySet`
+that use the same fuzzy term share its recent results.
+"""
+
+from functools import lru_cache
+from typing import Any, Dict
+
+# The number of recent results each matcher remembers, before they are discarded
+MEMO_SIZE = 256
+
+
+def bounded_distance(source: str, target: str, limit: int) -> int:
+    """ Calculate the Levenshtein distance between two strings, up to a limit.
+
+    Args:
+        source: The first string.
+        target: The second string.
+        limit: The largest distance of interest.
+
+    Returns:
+        The number of single character insertions, deletions and substitutions needed to change `source` into
+        `target`, or `limit + 1` if more than `limit` are needed.
+    """
+    over = limit + 1
+
+    if abs(len(source) - len(target)) > limit:
+        return over
+
+    # Matching characters at either end never add to the distance
+    shortest = min(len(source), len(target))
+    start = 0
+
+    while start < shortest and source[start] == target[start]:
+        start += 1
+
+    end = 0
+
+    while end < shortest - start and source[-1 - end] == target[-1 - end]:
+        end += 1
+
+    source = source[start:len(source) - end]
+    target = target[start:len(target) - end]
+
+    if not source or not target:
+        # Only insertions or deletions remain, and the length check means there are few enough
+        return max(len(source), len(target))
+
+    columns = len(target)
+    # Row zero, the distance from an empty string to each prefix of target, limited to the band
+    previous = [column if column <= limit else over for column in range(columns + 1)]
+
+    for row, char in enumerate(source, 1):
+        low = max(1, row - limit)
+        high = min(columns, row + limit)
+        current = [over] * (columns + 1)
+        current[0] = row if row <= limit else over
+        best = current[0] if low == 1 else over
+
+        for column in range(low, high + 1):
+            value = previous[column - 1] + (char != target[column - 1])
+            inserted = current[column - 1] + 1
+            deleted = previous[column] + 1
+
+            if inserted < value:
+                value = inserted
+            if deleted < value:
+                value = deleted
+            if value > over:
+                value = over
+
+            current[column] = value
+
+            if value < best:
+                best = value
+
+        # Every path through this row already needs too many edits
+        if best > limit:
+            return over
+
+        previous = current
+
+    return previous[columns]
+
+
+class FuzzyMatcher:
+    """
+    Test whether strings are within a maximum edit distance of a term, remembering recent results.
+
+    Args:
+        term: The term to compare against.
+        max_edits: The maximum Levenshtein distance which matches.
+    """
+
+    def __init__(self, term: str, max_edits: int):
+        self.term = term
+        self.max_edits = max_edits
+        self._min_length = len(term) - max_edits
+        self._max_length = len(term) + max_edits
+        self._memo: Dict[str, bool] = {}
+
+    def __call__(self, found: Any) -> bool:
+        if not isinstance(found, str):
+            return False
+
+        # Checked before the memo, as it is cheaper than hashing the value
+        if not self._min_length <= len(found) <= self._max_length:
+            return False
+
+        memo = self._memo
+        result = memo.get(found)
+
+        if result is None:
+            result = bounded_distance(self.term, found, self.max_edits) <= self.max_edits
+
+            if len(memo) >= MEMO_SIZE:
+                memo.clear()
+
+            memo[found] = result
+
+        return result
+
+
+@lru_cache(maxsize=4096)
+def fuzzy_matcher(term: str, max_edits: int) -> FuzzyMatcher:
+    """ Return the shared matcher for a fuzzy term.
+
+    Args:
+        term: The term to compare against.
+        max_edits: The maximum Levenshtein distance which matches.
+
+    Returns:
+        A `FuzzyMatcher`, which is the same object for every call with the same arguments while it is cached.
+    """
+    return FuzzyMatcher(term, max_edits)
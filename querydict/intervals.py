@@ -0,0 +1,218 @@
+"""
+This module implements `IntervalIndex`, which finds the intervals containing a value, used by `QuerySet` to
+find range queries that could match a record. Sample usage:
+
+    >>> from querydict.intervals import IntervalIndex
+    >>> index = IntervalIndex()
+    >>> index.add("slow", 500, None)
+    >>> index.add("normal", 100, 500, include_high=False)
+    >>> index.search(250)  # {"normal"}
+
+The index is a centred interval tree. Each node has a centre point, the intervals which contain it, and
+subtrees for the intervals entirely to its left and right. Searching visits one node per level, and at each
+node only looks at intervals which contain the value, so it takes O(log n + k) time for k results.
+
+Adding or removing an interval does not rebuild the tree, which is rebuilt lazily when searched, see
+`querydict.rebuild`.
+"""
+
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from .rebuild import LazyRebuild
+
+# (low, high, include_low, include_high, key), where a bound of None is unbounded
+Interval = Tuple[Any, Any, bool, bool, Hashable]
+
+
+def _above_low(interval: Interval, value: Any) -> bool:
+    low, _, include_low, _, _ = interval
+    return low is None or (value >= low if include_low else value > low)
+
+
+def _below_high(interval: Interval, value: Any) -> bool:
+    _, high, _, include_high, _ = interval
+    return high is None or (value <= high if include_high else value < high)
+
+
+class _Node:
+    """
+    A node of the interval tree.
+
+    Args:
+        intervals: The intervals in this subtree, none of which are unbounded at both ends.
+    """
+
+    def __init__(self, intervals: List[Interval]):
+        endpoints = sorted(
+            bound for low, high, _, _, _ in intervals for bound in (low, high) if bound is not None
+        )
+        self.center = center = endpoints[len(endpoints) // 2]
+        left: List[Interval] = []
+        right: List[Interval] = []
+        overlapping: List[Interval] = []
+
+        for interval in intervals:
+            if not _below_high(interval, center) and interval[1] is not None:
+                left.append(interval)
+            elif not _above_low(interval, center) and interval[0] is not None:
+                right.append(interval)
+            else:
+                overlapping.append(interval)
+
+        # Intervals which all lie on one side of every endpoint, for example many copies of {1 TO 2}, would
+        # never be split, so are kept in a list which is checked in full
+        self.flat: Optional[List[Interval]] = None
+
+        if not overlapping and (not left or not right):
+            self.flat = intervals
+            self.left = self.right = None
+            self.by_low = self.by_high = []
+            return
+
+        # Unbounded ends first, then the loosest bound, so scanning can stop at the first interval that fails
+        self.by_low = sorted(
+            overlapping, key=lambda interval: (interval[0] is not None, interval[0], not interval[2])
+        )
+        self.by_high = sorted(
+            overlapping, key=lambda interval: (interval[1] is None, interval[1], interval[3]), reverse=True
+        )
+        self.left = _Node(left) if left else None
+        self.right = _Node(right) if right else None
+
+    def search(self, value: Any, found: set) -> None:
+        node: Optional[_Node] = self
+
+        while node is not None:
+            if node.flat is not None:
+                found.update(
+                    interval[4] for interval in node.flat
+                    if _above_low(interval, value) and _below_high(interval, value)
+                )
+                return
+
+            if value < node.center:
+                # Every interval here contains the centre, so only the low bound needs checking
+                for interval in node.by_low:
+                    if not _above_low(interval, value):
+                        break
+                    found.add(interval[4])
+
+                node = node.left
+            elif value > node.center:
+                for interval in node.by_high:
+                    if not _below_high(interval, value):
+                        break
+                    found.add(interval[4])
+
+                node = node.right
+            else:
+                found.update(interval[4] for interval in node.by_low)
+                return
+
+
+class IntervalIndex(LazyRebuild):
+    """
+    An index of intervals, each with a key, which finds the keys of intervals containing a value.
+
+    All bounds and searched values must be comparable with each other, for example all numbers or all
+    datetimes. Pending changes are intervals by key, and stale changes are keys.
+    """
+
+    pending_type = dict
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._intervals: Dict[Hashable, List[Interval]] = {}
+        # The number of intervals, which is kept so that finding it does not visit every key
+        self._count = 0
+        self._root: Optional[_Node] = None
+        # Keys of intervals which are unbounded at both ends, and so contain every value
+        self._always: set = set()
+        # Keys in the tree
+        self._built: set = set()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._intervals
+
+    def add(
+        self,
+        key: Hashable,
+        low: Any,
+        high: Any,
+        include_low: bool = True,
+        include_high: bool = True,
+    ) -> None:
+        """ Add an interval to the index. A key can have more than one interval.
+
+        Args:
+            key: An identifier, which is returned by search().
+            low: The lower bound, or None if there is no lower bound.
+            high: The upper bound, or None if there is no upper bound.
+            include_low: Whether the lower bound is in the interval.
+            include_high: Whether the upper bound is in the interval.
+        """
+        interval = (low, high, include_low, include_high, key)
+        self._intervals.setdefault(key, []).append(interval)
+        self._pending.setdefault(key, []).append(interval)
+        self._count += 1
+
+    def remove(self, key: Hashable) -> None:
+        """ Remove every interval with a key.
+
+        Args:
+            key: The identifier used when the intervals were added.
+
+        Raises:
+            KeyError: If there is no interval with this key.
+        """
+        self._count -= len(self._intervals.pop(key))
+        self._pending.pop(key, None)
+
+        if key in self._built:
+            self._stale.add(key)
+
+    def _build(self) -> None:
+        bounded = []
+        always = set()
+
+        for intervals in self._intervals.values():
+            for interval in intervals:
+                if interval[0] is None and interval[1] is None:
+                    always.add(interval[4])
+                else:
+                    bounded.append(interval)
+
+        self._always = always
+        self._root = _Node(bounded) if bounded else None
+        self._built = set(self._intervals)
+
+    def search(self, value: Any) -> set:
+        """ Find the intervals which contain a value.
+
+        Args:
+            value: The value to search for.
+
+        Returns:
+            The set of keys with an interval containing the value.
+        """
+        return self._read(self._search, value)
+
+    def _search(self, value: Any) -> set:
+        pending, stale = self._pending, self._stale
+        found = set(self._always)
+
+        if self._root is not None:
+            self._root.search(value, found)
+
+        if stale:
+            found -= stale
+
+        for intervals in pending.values():
+            found.update(
+                interval[4] for interval in intervals
+                if _above_low(interval, value) and _below_high(interval, value)
+            )
+
+        return found
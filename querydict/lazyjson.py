@@ -0,0 +1,232 @@
+"""
+This module extracts the fields a query uses from a raw JSON object, without decoding the rest of it. Sample
+usage:
+
+    >>> from querydict.parser import QueryEngine
+    >>> query = QueryEngine("user.name:Bob AND event:login")
+    >>> query.match_json(b'{"event": "login", "user": {"name": "Bob"}, "payload": {"...": "..."}}')
+    True
+
+Only the top level members named by the first part of each field are decoded, here "event" and "user", and
+each is decoded in full. The members are found by searching the text for each quoted name followed by a colon,
+rather than by walking every member of the object, and then counting brackets to find which of those are
+directly inside the outer object. If a name appears more than once, the last member wins, as it does for
+`json.loads`.
+
+Counting brackets needs strings which are easy to find, so escape sequences are masked first. The whole record
+is decoded instead if a string contains a bracket, a member name contains an escape sequence, or the record is
+not an object. Records shorter than `MIN_SEARCH_LENGTH` are also decoded in full, as that is faster. The result
+is always the same as matching the decoded record, but the record is not fully validated, so malformed JSON
+outside the members which are decoded may not raise an error.
+"""
+
+import json
+import re
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+from .compiler import Node, Term, Operation, Not, split_path
+
+# Escape sequences are replaced by characters which cannot otherwise appear in valid JSON, keeping positions
+_ESCAPE = re.compile(r"\\.", re.DOTALL)
+_MASK = "\x00\x00"
+
+# Marks positions in the text whose depth is needed, which also cannot otherwise appear in valid JSON
+_MARKER = "\x01"
+
+# Everything except quotes, brackets and markers is deleted to find the structure of the text, and square
+# brackets are replaced by curly brackets so that there are fewer to count
+_NOT_STRUCTURE = bytes(char for char in range(256) if char not in b'"{}[]\x01')
+_BRACKETS = bytes.maketrans(b"[]", b"{}")
+
+# Once everything except quotes, colons and masked escape sequences is deleted, a member name containing an
+# escape sequence, which the quoted name would not be found in. Strings contain no quotes, and only names are
+# followed by colons.
+_NOT_NAME_STRUCTURE = bytes(char for char in range(256) if char not in b'":\x00')
+_ESCAPED_NAME = re.compile(b'\x00[\x00:]*":')
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_COLON = re.compile(r"[ \t\n\r]*:[ \t\n\r]*")
+
+# Characters which a JSON encoder escapes, and those which separate values so a quoted name containing them
+# could start with the end of one string and end with the start of the next
+_UNSAFE_NAME = re.compile(r'["\\:,\x00-\x1f]')
+
+# Shorter text is decoded in full, as searching it takes longer than decoding it
+MIN_SEARCH_LENGTH = 2048
+
+_decoder = json.JSONDecoder()
+
+
+def member_names(node: Node) -> Optional[FrozenSet[str]]:
+    """ Find the top level members of a record which a node uses.
+
+    Bare terms are not included, see `field_names()` for their default fields.
+
+    Args:
+        node: A node of the intermediate representation.
+
+    Returns:
+        A set of member names, or None if the whole record is needed, because a field starts with "*" or a name
+        could not be searched for.
+    """
+    names = set()
+    stack = [node]
+
+    while stack:
+        node = stack.pop()
+
+        if isinstance(node, Term):
+            names.add(node.path[0][0])
+        elif isinstance(node, Operation):
+            stack.extend(node.children)
+        elif isinstance(node, Not):
+            stack.append(node.child)
+
+    return _searchable(names)
+
+
+def field_names(fields: Iterable[str]) -> Optional[FrozenSet[str]]:
+    """ Find the top level members of a record used by default fields.
+
+    Args:
+        fields: The default fields searched by bare terms, which may include "*" for every string.
+
+    Returns:
+        A set of member names, or None if the whole record is needed.
+    """
+    return _searchable(split_path(field)[0][0] for field in fields)
+
+
+def _searchable(names: Iterable[Optional[str]]) -> Optional[FrozenSet[str]]:
+    names = frozenset(names)
+
+    # The key of "*" is None, so a path starting with "*" needs every member
+    if None in names or any(_UNSAFE_NAME.search(name) for name in names):
+        return None
+
+    return names
+
+
+def _occurrences(masked: str, quoted: str, start: int) -> List[Tuple[int, int]]:
+    """ Find every occurrence of a quoted name followed by a colon, which may or may not be a top level member.
+
+    Returns:
+        A list of (position of the name, position of the value).
+    """
+    found = []
+    position = masked.find(quoted, start)
+
+    while position >= 0:
+        colon = _COLON.match(masked, position + len(quoted))
+
+        if colon is not None:
+            found.append((position, colon.end()))
+
+        position = masked.find(quoted, position + 1)
+
+    return found
+
+
+def _depths(masked: str, positions: List[int]) -> Optional[List[int]]:
+    """ Find how deeply nested each position is, where the inside of the outer object has a depth of 1.
+
+    A marker is inserted at each position, then everything except quotes, brackets and the markers is deleted.
+    Brackets can then be counted between the markers, unless a string contains a bracket. Strings without
+    brackets are left as pairs of quotes, so if any string contains a bracket not every quote is in a pair.
+
+    Args:
+        masked: The text, with escape sequences masked.
+        positions: Positions outside any string, in ascending order.
+
+    Returns:
+        The depth of each position, or None if a string contains a bracket.
+    """
+    bounds = [0, *positions, len(masked)]
+    marked = _MARKER.join(masked[low:high] for low, high in zip(bounds, bounds[1:]))
+    structure = marked.encode("utf-8", "surrogatepass").translate(_BRACKETS, _NOT_STRUCTURE)
+
+    if structure.count(b'"') != 2 * structure.count(b'""'):
+        return None
+
+    depths = []
+    depth = 0
+
+    for part in structure.split(_MARKER.encode("ascii"))[:-1]:
+        depth += part.count(b"{") - part.count(b"}")
+        depths.append(depth)
+
+    return depths
+
+
+def extract(text: str, names: FrozenSet[str]) -> Optional[Dict[str, Any]]:
+    """ Decode some of the top level members of a JSON object.
+
+    Names must not contain quotes, backslashes, colons, commas or control characters, see `member_names()`.
+
+    Args:
+        text: The JSON text.
+        names: The names of the members to decode.
+
+    Returns:
+        A dictionary of the members found, or None if the text cannot be searched and has to be decoded in full.
+
+    Raises:
+        json.JSONDecodeError: If a member which is decoded is not valid JSON.
+    """
+    start = _WHITESPACE.match(text).end()
+
+    if not text.startswith("{", start) or _MASK[0] in text or _MARKER in text:
+        return None
+
+    masked = text
+
+    if "\\" in text:
+        masked = _ESCAPE.sub(_MASK, text)
+
+        names_structure = masked.encode("utf-8", "surrogatepass").translate(None, _NOT_NAME_STRUCTURE)
+
+        if _ESCAPED_NAME.search(names_structure):
+            return None
+
+    candidates = sorted(
+        (position, value, name)
+        for name in names
+        for position, value in _occurrences(masked, '"{}"'.format(name), start)
+    )
+    depths = _depths(masked, [position for position, _, _ in candidates])
+
+    if depths is None:
+        return None
+
+    found = {}
+
+    # Later members replace earlier ones with the same name, as they do for json.loads
+    for (_, value, name), depth in zip(candidates, depths):
+        if depth == 1:
+            found[name] = value
+
+    return {name: _decoder.raw_decode(text, value)[0] for name, value in found.items()}
+
+
+def loads_members(raw: Union[bytes, bytearray, str], names: Optional[FrozenSet[str]]) -> Any:
+    """ Decode the members of a JSON object which a query uses, or the whole of it if they cannot be found.
+
+    Args:
+        raw: The JSON text, as bytes in any encoding `json.loads` accepts, or a string.
+        names: The names of the members to decode, or None to decode everything.
+
+    Returns:
+        A dictionary of the members, or the decoded JSON.
+
+    Raises:
+        json.JSONDecodeError: If the JSON which is decoded is not valid.
+    """
+    if isinstance(raw, (bytes, bytearray)):
+        raw = raw.decode(json.detect_encoding(raw), "surrogatepass")
+
+    if names is not None and len(raw) >= MIN_SEARCH_LENGTH:
+        found = extract(raw, names)
+
+        if found is not None:
+            return found
+
+    return json.loads(raw)
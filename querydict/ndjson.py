@@ -0,0 +1,213 @@
+"""
+This module filters newline delimited JSON (also known as JSON lines), yielding the records that match a query.
+Sample usage:
+
+    >>> from querydict.parser import QueryEngine
+    >>> query = QueryEngine("name:Bob")
+    >>> for record in query.filter_ndjson("people.jsonl"):
+    ...     print(record)
+
+Most lines in a large file usually do not match, so before decoding a line it is checked for literal text
+that any matching record must contain. For example "name:Bob" can only match a line that contains the bytes
+`"Bob"`, so other lines are skipped without calling `json.loads`.
+
+Literals are only used when a JSON encoder would never escape them, so they contain only printable ASCII
+and no quotes, backslashes or forward slashes.
+"""
+
+import io
+import json
+import os
+from typing import Any, BinaryIO, FrozenSet, Iterator, List, Tuple, Union
+from .compiler import Node, Term, WordTerm, TypedWordTerm, PhraseTerm, WildcardTerm, And, Or, Const, ANY_SEGMENT
+
+Clauses = List[FrozenSet[bytes]]
+Source = Union[str, os.PathLike, BinaryIO]
+
+# Read files in chunks of this size, rather than line by line
+CHUNK_SIZE = 1 << 20
+
+
+def _literal(text: str) -> bytes:
+    """ Encode text that appears verbatim in a JSON document.
+
+    Args:
+        text: The text to encode.
+
+    Returns:
+        The encoded text, or an empty string if an encoder might escape it.
+    """
+    if not text.isascii() or not text.isprintable() or any(c in text for c in '"\\/'):
+        return b""
+
+    return text.encode("ascii")
+
+
+def _term_literals(node: Term) -> List[bytes]:
+    """ Find literals which must be present in the raw JSON for a term to match.
+
+    Args:
+        node: The term to check.
+
+    Returns:
+        A list of literals, all of which must be present.
+    """
+    literals = []
+    # The last named segment, as the items matched by "*" do not have a key in the JSON
+    key, index = next((segment for segment in reversed(node.path) if segment != ANY_SEGMENT), ANY_SEGMENT)
+
+    # Values are usually more selective than keys, so are checked first. Typed Words can match a number or a
+    # string of a different case, which are written differently in the JSON
+    if isinstance(node, WordTerm) and not isinstance(node, TypedWordTerm) and _literal(node.value):
+        literals.append(b'"' + _literal(node.value) + b'"')
+
+    elif isinstance(node, PhraseTerm) and _literal(node.value):
+        literals.append(_literal(node.value))
+
+    elif isinstance(node, WildcardTerm):
+        # Every literal part of the pattern is in the value, a prefix directly after the opening quote
+        if node.prefix and _literal(node.prefix):
+            literals.append(b'"' + _literal(node.prefix))
+        else:
+            parts = [_literal(part) for part in node.literals]
+            longest = max(parts, key=len, default=b"")
+
+            if longest:
+                literals.append(longest)
+
+    # Numeric segments may be a list index, which does not appear in the JSON
+    if key is not None and index is None and _literal(key):
+        literals.append(b'"' + _literal(key) + b'"')
+
+    return literals
+
+
+def required_literals(node: Node) -> Clauses:
+    """ Find literal text that the raw JSON must contain for a node to match.
+
+    Args:
+        node: A node of the intermediate representation.
+
+    Returns:
+        A list of clauses, where each clause is a set of literals and at least one literal in each clause must
+        be present in a matching line.
+    """
+    if isinstance(node, Term):
+        return [frozenset([literal]) for literal in _term_literals(node)]
+
+    # An empty clause can never be satisfied
+    if isinstance(node, Const) and not node.value:
+        return [frozenset()]
+
+    if isinstance(node, And):
+        return [clause for child in node.children for clause in required_literals(child)]
+
+    if isinstance(node, Or):
+        # Any one branch can match, so one clause from every branch is combined into a single clause
+        combined = set()
+
+        for child in node.children:
+            clauses = required_literals(child)
+
+            if not clauses:
+                return []
+
+            combined |= clauses[0]
+
+        return [frozenset(combined)]
+
+    return []
+
+
+def prefilter(clauses: Clauses, line: bytes) -> bool:
+    """ Check whether a line contains the required literals.
+
+    Args:
+        clauses: Clauses returned by `required_literals()`.
+        line: A raw line from the input.
+
+    Returns:
+        False if the line cannot match, True if it needs to be decoded and matched.
+    """
+    for clause in clauses:
+        for literal in clause:
+            if literal in line:
+                break
+        else:
+            return False
+
+    return True
+
+
+def iter_lines(fileobj: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """ Read lines from a file in large chunks.
+
+    Args:
+        fileobj: A file object open in binary mode.
+        chunk_size: The number of bytes to read at once.
+
+    Yields:
+        Each line, without the trailing newline.
+    """
+    remainder = b""
+
+    while True:
+        chunk = fileobj.read(chunk_size)
+
+        if not chunk:
+            break
+
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        yield from lines
+
+    if remainder:
+        yield remainder
+
+
+def filter_lines(
+    lines: Iterator[bytes], node: Node, matcher: Any, prefilter_lines: bool = True
+) -> Iterator[Tuple[bytes, Any]]:
+    """ Decode and match lines of JSON.
+
+    Args:
+        lines: Raw lines of JSON.
+        node: The intermediate representation of the query, used to find required literals.
+        matcher: A function which accepts a decoded record and returns True if it matches.
+        prefilter_lines: Whether to skip lines that do not contain the required literals before decoding.
+
+    Yields:
+        Tuples of (line, record) for each matching line.
+    """
+    clauses = required_literals(node) if prefilter_lines else []
+    loads = json.loads
+
+    for line in lines:
+        if not line or line.isspace():
+            continue
+
+        if clauses and not prefilter(clauses, line):
+            continue
+
+        record = loads(line)
+
+        if matcher(record):
+            yield line, record
+
+
+def open_source(source: Source) -> Tuple[BinaryIO, bool]:
+    """ Open a path, or use an existing file object.
+
+    Args:
+        source: A path, or a file object.
+
+    Returns:
+        A tuple of (file object, whether the caller should close it).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return io.open(source, "rb"), True
+
+    return source, False
@@ -0,0 +1,206 @@
+"""
+This module normalises the intermediate representation of a query, removing redundancy that users commonly
+write. Normalisation:
+
+* Flattens nested AND and OR operations, (a AND (b AND c)) becomes (a AND b AND c).
+* Removes duplicate children, (a OR a OR b) becomes (a OR b).
+* Folds double negation, NOT NOT a becomes a.
+* Replaces "*:*", which is Lucene's query for every record, with a condition that always matches.
+* Detects conjunctions that can never match, such as (a:x AND a:y) or (a AND NOT a), and disjunctions that
+  always match, such as (a OR NOT a).
+
+Groups have already been removed when the query was lowered. The order of remaining children is kept, so
+that queries are still evaluated in the order written unless they are optimised.
+
+Normalised trees also have a canonical form, see `canonical()`, which is the same for queries that only differ
+in the order of AND and OR conditions or in redundancy. This can be used as a key to find duplicate queries.
+"""
+
+import re
+from typing import Dict, List
+from .compiler import (
+    Node, Term, WordTerm, WildcardTerm, RegexTerm, FuzzyTerm, PhraseTerm, BareTerm, And, Or, Not, Const, ANY_SEGMENT,
+    word_forms
+)
+
+
+def _quote(value: str) -> str:
+    return '"{}"'.format(value)
+
+
+# Characters with a meaning in Lucene syntax, including whitespace
+_SPECIAL = re.compile(r'([\\*?+\-!&|(){}\[\]^"~:/\s])')
+
+
+def _escape(value: str) -> str:
+    """ Escape the characters which have a meaning in Lucene syntax.
+
+    A Word is then never written in the same way as a pattern, range or fuzzy search, so different terms never
+    have the same canonical string.
+    """
+    return _SPECIAL.sub(r"\\\1", value)
+
+
+def canonical(node: Node) -> str:
+    """ Return a canonical string for a node, which is the same for equivalent normalised trees.
+
+    The string uses Lucene syntax, with the children of AND and OR sorted.  A node which always matches is
+    written as "*:*", and one which never matches as "NOT *:*", which are also the queries they are parsed from.
+
+    Args:
+        node: A node of the intermediate representation.
+
+    Returns:
+        The canonical string.
+    """
+    if isinstance(node, WordTerm):
+        return "{}:{}".format(node.field, _escape(node.value))
+
+    if isinstance(node, PhraseTerm):
+        return "{}:{}".format(node.field, _quote(node.value))
+
+    if isinstance(node, FuzzyTerm):
+        return "{}:{}~{}".format(node.field, _escape(node.value), node.max_edits)
+
+    if isinstance(node, RegexTerm):
+        return "{}:/{}/".format(node.field, node.value)
+
+    if isinstance(node, Term):
+        # Other terms, such as ranges, keep the syntax they were written in
+        return "{}:{}".format(node.field, node.value)
+
+    if isinstance(node, BareTerm):
+        return _quote(node.value) if node.phrase else _escape(node.value)
+
+    if isinstance(node, Not):
+        return "NOT {}".format(_group(node.child))
+
+    if isinstance(node, (And, Or)):
+        operator = " AND " if isinstance(node, And) else " OR "
+        return operator.join(sorted(_group(child) for child in node.children))
+
+    if isinstance(node, Const):
+        return "*:*" if node.value else "NOT *:*"
+
+    raise Exception("Unhandled node type {}".format(str(type(node))))  # pragma: no cover
+
+
+def _group(node: Node) -> str:
+    """ Return the canonical string for a child, in brackets if it is an AND or OR. """
+    if isinstance(node, (And, Or)):
+        return "({})".format(canonical(node))
+
+    return canonical(node)
+
+
+def _normalize_not(node: Not) -> Node:
+    child = normalize(node.child)
+
+    if isinstance(child, Not):
+        return child.child
+
+    if isinstance(child, Const):
+        return Const(not child.value)
+
+    return Not(child)
+
+
+def _can_be_equal(first: str, second: str) -> bool:
+    """ Check whether a value can be equal to two different Words, when they are typed or case folded.
+
+    The intermediate representation is shared by queries with different options, so two Words only contradict
+    each other if no option could make both match, for example "1" and "1.0" both match the number 1.
+    """
+    if first.casefold() == second.casefold():
+        return True
+
+    first_forms, second_forms = word_forms(first), word_forms(second)
+    return any(first_forms[kind] == second_forms[kind] for kind in first_forms.keys() & second_forms.keys())
+
+
+def _contradicts(children: List[Node]) -> bool:
+    """ Check whether the children of an AND can never all match.
+
+    Args:
+        children: Normalised children, without duplicates.
+
+    Returns:
+        True if the AND can never match.
+    """
+    words: Dict[str, str] = {}
+
+    for child in children:
+        # A field cannot be exactly equal to two different values, but a path with "*" finds several
+        if isinstance(child, WordTerm) and ANY_SEGMENT not in child.path:
+            first = words.setdefault(child.field, child.value)
+
+            if first != child.value and not _can_be_equal(first, child.value):
+                return True
+
+    return False
+
+
+def _normalize_operation(node: Node) -> Node:
+    node_type = type(node)
+    is_and = node_type is And
+    children: List[Node] = []
+    keys = set()
+
+    for child in node.children:
+        child = normalize(child)
+
+        # Normalising a child can produce an operation of the same type, which is merged
+        grandchildren = child.children if type(child) is node_type else [child]
+
+        for grandchild in grandchildren:
+            if isinstance(grandchild, Const):
+                # True cannot change the result of AND, but False decides it (and the reverse for OR)
+                if grandchild.value is is_and:
+                    continue
+
+                return Const(not is_and)
+
+            key = canonical(grandchild)
+
+            if key not in keys:
+                keys.add(key)
+                children.append(grandchild)
+
+    # A condition and its negation, one of which always matches
+    for child in children:
+        if isinstance(child, Not) and canonical(child.child) in keys:
+            return Const(not is_and)
+
+    if is_and and _contradicts(children):
+        return Const(False)
+
+    if not children:
+        return Const(is_and)
+
+    if len(children) == 1:
+        return children[0]
+
+    return node_type(children)
+
+
+def normalize(node: Node) -> Node:
+    """ Normalise a node of the intermediate representation.
+
+    The tree is not modified, a new tree is returned which shares unchanged nodes.
+
+    Args:
+        node: A node of the intermediate representation.
+
+    Returns:
+        The normalised node.
+    """
+    if isinstance(node, Not):
+        return _normalize_not(node)
+
+    if isinstance(node, (And, Or)):
+        return _normalize_operation(node)
+
+    if isinstance(node, WildcardTerm) and node.field == "*" and node.value == "*":
+        return Const(True)
+
+    return node
@@ -0,0 +1,232 @@
+"""
+This module reorders the children of AND and OR operations, so that short circuiting happens as early and as
+cheaply as possible.
+
+Each node is given an estimated cost and an estimated probability that it matches. An AND stops at the first
+child which does not match, so children are ordered by cost divided by the probability of not matching. An OR
+stops at the first child which matches, so children are ordered by cost divided by the probability of
+matching. Matching never has side effects, so the result is the same in any order.
+
+The estimates are static, based on the query alone. For queries where they are wrong, `compile_adaptive()`
+counts how often each child decides the result during matching and periodically reorders children using
+those counts.
+"""
+
+from typing import Any, List, Sequence, Tuple
+from .compiler import (
+    Node, Term, WordTerm, PhraseTerm, RangeTerm, WildcardTerm, FuzzyTerm, And, Or, Not, Const, Matcher, compile_node,
+    ANY_SEGMENT
+)
+
+# Prior probabilities that a node matches, used before any statistics are available
+WORD_PROBABILITY = 0.1
+TERM_PROBABILITY = 0.3
+
+# Statistics are weighted as if the prior was observed this many times
+PRIOR_WEIGHT = 10
+
+# The default number of calls between each adaptive reordering
+ADAPTIVE_INTERVAL = 1000
+
+# The assumed number of items in a list or dictionary matched by "*", which each need a lookup
+ANY_ITEMS = 4
+
+
+def estimate(node: Node) -> Tuple[float, float]:
+    """ Estimate the cost of evaluating a node, and the probability that it matches.
+
+    Costs are relative, an exact comparison of a top level field costs 1.
+
+    Args:
+        node: A node of the intermediate representation.
+
+    Returns:
+        A tuple of (cost, probability).
+    """
+    if isinstance(node, Term):
+        # Every extra level of nesting is another lookup, and each "*" repeats the rest for several items
+        depth = len(node.path) - 1 + ANY_ITEMS * node.path.count(ANY_SEGMENT)
+
+        if isinstance(node, WordTerm):
+            return 1.0 + 0.5 * depth, WORD_PROBABILITY
+
+        if isinstance(node, PhraseTerm):
+            return 2.0 + 0.5 * depth + len(node.value) / 32, TERM_PROBABILITY
+
+        if isinstance(node, RangeTerm):
+            # The bounds were converted when compiling, so only a type check and two comparisons remain
+            return 1.5 + 0.5 * depth, TERM_PROBABILITY
+
+        if isinstance(node, FuzzyTerm):
+            # Most values are rejected by length, the rest need edit distance in a band around the diagonal
+            return 4.0 + 0.5 * depth + len(node.value) * (2 * node.max_edits + 1) / 32, TERM_PROBABILITY
+
+        if isinstance(node, WildcardTerm) and node.regex is None:
+            # Patterns tested with string methods are about as cheap as a phrase
+            return 2.0 + 0.5 * depth, TERM_PROBABILITY
+
+        return 4.0 + 0.5 * depth, TERM_PROBABILITY
+
+    if isinstance(node, Not):
+        cost, probability = estimate(node.child)
+        return cost + 0.5, 1.0 - probability
+
+    if isinstance(node, (And, Or)):
+        return _estimate_operation(node, [estimate(child) for child in node.children])
+
+    if isinstance(node, Const):
+        return 0.0, float(node.value)
+
+    # Terms without a field need to search the whole record
+    return 10.0, TERM_PROBABILITY
+
+
+def _estimate_operation(node: Node, estimates: Sequence[Tuple[float, float]]) -> Tuple[float, float]:
+    """ Estimate the cost and probability of an AND or OR, given estimates for its children in order.
+
+    Args:
+        node: Instance of And or Or.
+        estimates: A (cost, probability) tuple for each child, in the order they are evaluated.
+
+    Returns:
+        A tuple of (cost, probability).
+    """
+    is_and = isinstance(node, And)
+    cost = 0.0
+    # The probability that evaluation reaches the next child
+    reached = 1.0
+
+    for child_cost, probability in estimates:
+        cost += reached * child_cost
+        reached *= probability if is_and else 1.0 - probability
+
+    return cost, reached if is_and else 1.0 - reached
+
+
+def _rank(is_and: bool, cost: float, probability: float) -> float:
+    """ Rank a child of an AND or OR, lower ranks should be evaluated first.
+
+    Args:
+        is_and: True for an AND, False for an OR.
+        cost: The estimated cost of the child.
+        probability: The estimated probability that the child matches.
+
+    Returns:
+        The rank of the child.
+    """
+    decides = 1.0 - probability if is_and else probability
+    return cost / max(decides, 1e-6)
+
+
+def reorder(node: Node) -> Node:
+    """ Reorder the children of every AND and OR in a tree, using static estimates.
+
+    The tree is not modified, a new tree is returned which shares unchanged nodes.
+
+    Args:
+        node: A node of the intermediate representation.
+
+    Returns:
+        The reordered node.
+    """
+    if isinstance(node, Not):
+        return Not(reorder(node.child))
+
+    if isinstance(node, (And, Or)):
+        is_and = isinstance(node, And)
+        children = [reorder(child) for child in node.children]
+        # sorted() is stable, so children with the same rank stay in the order they were written
+        children = sorted(children, key=lambda child: _rank(is_and, *estimate(child)))
+        return type(node)(children)
+
+    return node
+
+
+class AdaptiveOperation:
+    """
+    A compiled AND or OR which counts how often each child decides the result, and periodically reorders
+    the children so those most likely to decide the result cheaply are evaluated first.
+
+    Args:
+        node: Instance of And or Or.
+        matchers: A compiled matcher for each child of `node`.
+        interval: The number of calls between each reordering.
+    """
+
+    def __init__(self, node: Node, matchers: Sequence[Matcher], interval: int):
+        self.is_and = isinstance(node, And)
+        self.children = node.children
+        self.interval = interval
+        self._calls = 0
+
+        estimates = [estimate(child) for child in node.children]
+        self._costs = [cost for cost, _ in estimates]
+        self._priors = [1.0 - p if self.is_and else p for _, p in estimates]
+        self._evaluated = [0] * len(matchers)
+        self._decided = [0] * len(matchers)
+        self._ordered: Tuple[Tuple[int, Matcher], ...] = tuple(enumerate(matchers))
+        self._reorder()
+
+    @property
+    def order(self) -> List[Node]:
+        """ The children of the operation, in the order they are currently evaluated. """
+        return [self.children[index] for index, _ in self._ordered]
+
+    def _reorder(self) -> None:
+        """ Sort the children by cost divided by the observed probability of deciding the result. """
+        ranks = []
+
+        for index, _ in self._ordered:
+            decides = (self._decided[index] + PRIOR_WEIGHT * self._priors[index]) / (
+                self._evaluated[index] + PRIOR_WEIGHT
+            )
+            ranks.append(self._costs[index] / max(decides, 1e-6))
+
+        self._ordered = tuple(
+            item for _, item in sorted(zip(ranks, self._ordered), key=lambda pair: pair[0])
+        )
+
+        # Halve the counts so that the order can follow changes in the data
+        self._evaluated = [count // 2 for count in self._evaluated]
+        self._decided = [count // 2 for count in self._decided]
+
+    def __call__(self, data: Any) -> bool:
+        self._calls += 1
+
+        if self._calls >= self.interval:
+            self._calls = 0
+            self._reorder()
+
+        evaluated, decided = self._evaluated, self._decided
+        # An AND is decided by a child that does not match, an OR by a child that does
+        decision = not self.is_and
+
+        for index, match in self._ordered:
+            evaluated[index] += 1
+
+            if bool(match(data)) is decision:
+                decided[index] += 1
+                return decision
+
+        return not decision
+
+
+def compile_adaptive(node: Node, interval: int = ADAPTIVE_INTERVAL) -> Matcher:
+    """ Compile a node into a callable, where every AND and OR adapts its order to the data.
+
+    Args:
+        node: A node of the intermediate representation.
+        interval: The number of calls to each operation between reorderings.
+
+    Returns:
+        A function which accepts the data to match and returns True if there is a match, False otherwise.
+    """
+    if isinstance(node, Not):
+        match = compile_adaptive(node.child, interval)
+        return lambda data: not match(data)
+
+    if isinstance(node, (And, Or)):
+        matchers = [compile_adaptive(child, interval) for child in node.children]
+        return AdaptiveOperation(node, matchers, interval)
+
+    return compile_node(node, short_circuit=True)
@@ -0,0 +1,139 @@
+"""
+This module matches large iterables of dictionaries using a pool of worker processes, see
+`QueryEngine.filter_parallel`. Sample usage:
+
+    >>> from querydict.parser import QueryEngine
+    >>> query = QueryEngine("name:Bob")
+    >>> for record in query.filter_parallel(records, workers=8):
+    ...     print(record)
+
+The query is sent to each worker once, when it starts, as its intermediate representation. Workers compile it
+without parsing the query again. Records are sent to workers in chunks, and workers return the positions of
+matching records within each chunk, so matching records are not sent back.
+
+The number of chunks waiting to be matched is limited, so very large or infinite iterables can be filtered
+without reading them into memory.
+"""
+
+import itertools
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, as_completed, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Set in each worker process by _init_worker()
+_worker_engine = None
+_worker_default_field = None
+
+
+def _init_worker(state: Tuple[Any, bool, dict], default_field: Optional[str]) -> None:
+    """ Compile the query once in a worker process.
+
+    Args:
+        state: A tuple of (intermediate representation, whether it contains bare fields, options).
+        default_field: The name of a field to use for unqualified values.
+    """
+    global _worker_engine, _worker_default_field
+    from .parser import QueryEngine
+
+    ir, contains_bare_field, options = state
+    _worker_engine = QueryEngine._from_ir(ir, contains_bare_field, **options)
+    _worker_default_field = default_field
+
+
+def _match_chunk(chunk: List[Any]) -> List[int]:
+    """ Match a chunk of records in a worker process.
+
+    Args:
+        chunk: A list of dictionaries.
+
+    Returns:
+        The positions of matching dictionaries in the chunk.
+    """
+    match, default_field = _worker_engine.match, _worker_default_field
+    return [index for index, data in enumerate(chunk) if match(data, default_field)]
+
+
+def _chunks(iterable: Iterable[Any], chunksize: int) -> Iterator[List[Any]]:
+    iterator = iter(iterable)
+
+    while True:
+        chunk = list(itertools.islice(iterator, chunksize))
+
+        if not chunk:
+            return
+
+        yield chunk
+
+
+def filter_parallel(
+    engine: Any,
+    iterable: Iterable[Any],
+    workers: Optional[int] = None,
+    chunksize: int = 1000,
+    ordered: bool = True,
+    default_field: Optional[str] = None,
+) -> Iterator[Any]:
+    """ Filter an iterable of dictionaries in parallel, yielding those which match.
+
+    Args:
+        engine: The QueryEngine to match with.
+        iterable: An iterable of dictionaries.
+        workers: The number of worker processes (default: the number of CPUs).
+        chunksize: The number of dictionaries sent to a worker at once.
+        ordered: Whether to yield matches in the same order as the input. If False, matches are yielded as soon
+            as any chunk is finished, which keeps workers busier when chunks take different times.
+        default_field: The name of a field to use for unqualified values.
+
+    Yields:
+        Each matching dictionary.
+    """
+    workers = workers or os.cpu_count() or 1
+    state = (engine._ir, engine._contains_bare_field, engine._options())
+    # Enough chunks to keep every worker busy while results are consumed
+    max_pending = workers * 2
+
+    executor = ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(state, default_field)
+    )
+
+    try:
+        if ordered:
+            yield from _ordered(executor, _chunks(iterable, chunksize), max_pending)
+        else:
+            yield from _unordered(executor, _chunks(iterable, chunksize), max_pending)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _ordered(executor: ProcessPoolExecutor, chunks: Iterator[List[Any]], max_pending: int) -> Iterator[Any]:
+    pending: deque = deque()
+
+    for chunk in chunks:
+        pending.append((chunk, executor.submit(_match_chunk, chunk)))
+
+        if len(pending) >= max_pending:
+            done, future = pending.popleft()
+            yield from (done[index] for index in future.result())
+
+    while pending:
+        done, future = pending.popleft()
+        yield from (done[index] for index in future.result())
+
+
+def _unordered(executor: ProcessPoolExecutor, chunks: Iterator[List[Any]], max_pending: int) -> Iterator[Any]:
+    pending: Dict[Future, List[Any]] = {}
+
+    for chunk in chunks:
+        pending[executor.submit(_match_chunk, chunk)] = chunk
+
+        if len(pending) >= max_pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in finished:
+                done = pending.pop(future)
+                yield from (done[index] for index in future.result())
+
+    for future in as_completed(list(pending)):
+        done = pending.pop(future)
+        yield from (done[index] for index in future.result())
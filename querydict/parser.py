@@ -7,9 +7,12 @@ This module implements the core of querydict, in the `QueryEngine` class. Sample
     >>> query.match("data")  # True
 """
 
-from typing import Union, NoReturn
-from dotty_dict import dotty
-from luqum.parser import parser
+import functools
+import re
+from concurrent.futures import Executor
+from typing import (
+    AsyncIterable, AsyncIterator, FrozenSet, Iterable, Iterator, Mapping, Optional, Sequence, Tuple, Union
+)
 from luqum.exceptions import ParseError
 from luqum.tree import (
     Item,
@@ -22,9 +25,23 @@ from luqum.tree import (
     Fuzzy,
     UnknownOperation,
     Range,
+    Regex,
     Not,
 )
 from luqum.utils import UnknownOperationResolver
+from .compiler import (
+    Node, FIELD_KINDS, lower, compile_node, coerce_bound, range_bound, range_kind, fuzzy_edits, type_words
+)
+from .ndjson import filter_lines, iter_lines, open_source
+from .cache import query_cache
+from .optimizer import reorder, compile_adaptive
+from .normalize import normalize, canonical
+from .record import RecordView
+from .explain import Explanation, Profile, compile_profiled, explain as explain_node
+from .precheck import requirements, compile_precheck
+from .lazyjson import member_names, field_names, loads_members
+from .fastparse import parse as fast_parse
+from .serialize import dump_engine, load_engine, encode, decode
 
 
 class QueryException(Exception):
@@ -45,6 +62,22 @@ class MatchException(Exception):
     pass
 
 
+def _luqum_parse(query: str) -> Item:
+    """ Parse a query with luqum. Its parser is slow to import, so it is only imported when it is needed. """
+    from luqum.parser import parser
+
+    return parser.parse(query)
+
+
+@functools.lru_cache(maxsize=None)
+def _default_options(cls: type) -> dict:
+    """ Find the default value of each option of a QueryEngine class. The result must not be modified. """
+    import inspect
+
+    parameters = inspect.signature(cls.__init__).parameters
+    return {name: parameters[name].default for name in cls.option_names}
+
+
 class QueryEngine:
     """
     Match a Lucene style query against dict data, using an abstract tree parser.
@@ -55,12 +88,29 @@ class QueryEngine:
         ambiguous_action: The action to use for ambiguous queries, for example "field1:value1 field2:value2" (default: "AND")
         allow_bare_field: Whether to allow a search term without a specified field, for example "value1" (default: False).
         max_depth: The maximum recursion depth when parsing a query (default: 10).
+        optimize: Whether to reorder AND and OR conditions so cheap and selective terms are checked first (default: True).
+        adaptive: Whether to keep reordering AND and OR conditions based on how often they match (default: False).
+        default_fields: Fields searched by search terms without a field, when match() is not given a default_field.
+            "*" searches every string in the record (default: None).
+        casefold_bare: Whether search terms without a field match regardless of case (default: False).
+        profile: Whether to count evaluations, matches and time for every condition, see `stats` (default: False).
+        typed: Whether Words also match numbers, booleans and datetimes equal to them, so "status:200" matches
+            the integer 200 (default: False).
+        schema: A map of field names to the kind of value each holds, one of "string", "casefold", "number",
+            "boolean" or "datetime", so Words on the field are compared in a single way. "casefold" matches
+            strings regardless of case (default: None).
+        keep_tree: Whether to keep the luqum tree after the query is compiled, see `tree` (default: False).
 
     Raises:
         QueryException: If the input `query` is too complex, or uses unsupported features.
     """
 
-    supported_ops = [AndOperation, OrOperation, Group, SearchField, Word, Phrase, Not]
+    supported_ops = [AndOperation, OrOperation, Group, SearchField, Word, Phrase, Not, Range, Regex, Fuzzy]
+    # Options which affect matching, which are kept when a query is cached or serialized
+    option_names = (
+        "short_circuit", "allow_bare_field", "max_depth", "optimize", "adaptive", "default_fields", "casefold_bare",
+        "profile", "typed", "schema",
+    )
     ambiguous_actions = {"Exception": None, "AND": AndOperation, "OR": OrOperation}
 
     def __init__(
@@ -70,6 +120,14 @@ class QueryEngine:
         ambiguous_action: str = "AND",
         allow_bare_field: bool = False,
         max_depth: int = 10,
+        optimize: bool = True,
+        adaptive: bool = False,
+        default_fields: Sequence[str] = None,
+        casefold_bare: bool = False,
+        profile: bool = False,
+        typed: bool = False,
+        schema: Mapping[str, str] = None,
+        keep_tree: bool = False,
     ):
         """
 
@@ -83,8 +141,166 @@ class QueryEngine:
         self.short_circuit = short_circuit
         self.allow_bare_field = allow_bare_field
         self.max_depth = max_depth
+        self.optimize = optimize
+        self.adaptive = adaptive
+        self.default_fields = tuple(default_fields) if default_fields else None
+        self.casefold_bare = casefold_bare
+        self.profile = profile
+        self.typed = typed
+        self.schema = dict(schema) if schema else None
         self._contains_bare_field = False
         self._parse_query(query, ambiguous_action)
+        self._ir = normalize(lower(self._tree))
+
+        # The tree is much larger than the intermediate representation, and is not needed to match
+        if not keep_tree:
+            self._tree = None
+
+        self._compile()
+
+    @classmethod
+    def from_cache(
+        cls,
+        query: str,
+        short_circuit: bool = True,
+        ambiguous_action: str = "AND",
+        allow_bare_field: bool = False,
+        max_depth: int = 10,
+        optimize: bool = True,
+        adaptive: bool = False,
+        default_fields: Sequence[str] = None,
+        casefold_bare: bool = False,
+        profile: bool = False,
+        typed: bool = False,
+        schema: Mapping[str, str] = None,
+    ) -> "QueryEngine":
+        """ Create a QueryEngine, using a process wide cache of parsed and checked queries.
+
+        Queries are cached by the query string and the options which affect parsing, so the same query
+        with a different `short_circuit` setting shares a cache entry. See `querydict.cache` for statistics
+        and to change the size of the cache. The luqum tree is not cached, so `tree` is always None.
+
+        Args:
+            query: A Lucene style query
+            short_circuit: Whether to terminate matching early inside AND or OR conditions (default: True)
+            ambiguous_action: The action to use for ambiguous queries (default: "AND")
+            allow_bare_field: Whether to allow a search term without a specified field (default: False).
+            max_depth: The maximum recursion depth when parsing a query (default: 10).
+            optimize: Whether to reorder AND and OR conditions using static estimates (default: True).
+            adaptive: Whether to reorder AND and OR conditions based on how often they match (default: False).
+            default_fields: Fields searched by search terms without a field (default: None).
+            casefold_bare: Whether search terms without a field match regardless of case (default: False).
+            profile: Whether to count evaluations, matches and time for every condition (default: False).
+            typed: Whether Words also match numbers, booleans and datetimes equal to them (default: False).
+            schema: A map of field names to the kind of value each holds (default: None).
+
+        Returns:
+            A new QueryEngine.
+
+        Raises:
+            QueryException: If the input `query` is too complex, or uses unsupported features.
+        """
+        key = (query, ambiguous_action, allow_bare_field, max_depth)
+
+        def parse() -> tuple:
+            engine = cls(query, False, ambiguous_action, allow_bare_field, max_depth, False)
+            return engine._ir, engine._contains_bare_field
+
+        ir, contains_bare_field = query_cache.get(key, parse)
+
+        # The intermediate representation is never modified, so can be shared
+        return cls._from_ir(
+            ir,
+            contains_bare_field,
+            short_circuit=short_circuit,
+            allow_bare_field=allow_bare_field,
+            max_depth=max_depth,
+            optimize=optimize,
+            adaptive=adaptive,
+            default_fields=tuple(default_fields) if default_fields else None,
+            casefold_bare=casefold_bare,
+            profile=profile,
+            typed=typed,
+            schema=dict(schema) if schema else None,
+        )
+
+    @classmethod
+    def _from_ir(cls, ir: Node, contains_bare_field: bool, tree: Item = None, **options) -> "QueryEngine":
+        """ Create a QueryEngine from an intermediate representation which has already been checked.
+
+        Args:
+            ir: The root of the intermediate representation.
+            contains_bare_field: Whether the query contains a search term without a named field.
+            tree: The luqum tree the intermediate representation was lowered from, if available.
+            **options: Options, as returned by _options().
+
+        Returns:
+            A new QueryEngine.
+        """
+        engine = cls.__new__(cls)
+        engine._restore(ir, contains_bare_field, tree, options)
+        return engine
+
+    def _restore(self, ir: Node, contains_bare_field: bool, tree: Optional[Item], options: dict) -> None:
+        """ Set the state of a QueryEngine created without calling __init__, and compile it. """
+        for name, value in options.items():
+            setattr(self, name, value)
+
+        self._contains_bare_field = contains_bare_field
+        self._tree = tree
+        self._ir = ir
+        self._compile()
+
+    def _options(self) -> dict:
+        """ Return the options which affect matching, which can be passed to _from_ir(). """
+        return {name: getattr(self, name) for name in self.option_names}
+
+    def __getstate__(self) -> dict:
+        """ Return the state of the query for pickle, see `querydict.serialize`. """
+        # Only options which differ from the default are kept, which makes large sets of rules much smaller
+        defaults = _default_options(type(self))
+        options = {name: value for name, value in self._options().items() if value != defaults[name]}
+        return dump_engine(self._ir, self._contains_bare_field, options)
+
+    def __setstate__(self, state: dict) -> None:
+        """ Restore the state of the query from pickle, without parsing it again.
+
+        Raises:
+            ValueError: If the state is not valid.
+        """
+        ir, contains_bare_field, saved = load_engine(state)
+        unknown = set(saved) - set(self.option_names)
+
+        if unknown:
+            raise ValueError("Unknown options in serialized query: {}".format(", ".join(sorted(unknown))))
+
+        # Options added since the query was serialized take their default value
+        self._restore(ir, contains_bare_field, None, {**_default_options(type(self)), **saved})
+
+    def to_bytes(self) -> bytes:
+        """ Serialize the checked query, so it can be loaded without parsing it again, see `querydict.serialize`.
+
+        Returns:
+            The serialized query.
+        """
+        return encode("query", self.__getstate__())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "QueryEngine":
+        """ Load a query serialized by to_bytes(), without parsing or checking it again.
+
+        Args:
+            data: The serialized query.
+
+        Returns:
+            A new QueryEngine.
+
+        Raises:
+            ValueError: If the data is not a serialized query, or is in an unsupported format.
+        """
+        engine = cls.__new__(cls)
+        engine.__setstate__(decode("query", data))
+        return engine
 
     def _parse_query(self, query: str, ambiguous_action: bool) -> None:
         """
@@ -98,15 +314,20 @@ class QueryEngine:
         if query is None or query.strip() == "":
             raise ValueError("Need a valid query")
 
-        try:
-            self._tree = parser.parse(query)
-        except ParseError as exc:
-            raise QueryException(
-                "Could not parse the query, error: {}".format(str(exc))
-            )
+        # Common queries are parsed without luqum's parser, see `querydict.fastparse`
+        self._tree = fast_parse(query)
+        parsed_fast = self._tree is not None
+
+        if not parsed_fast:
+            try:
+                self._tree = _luqum_parse(query)
+            except ParseError as exc:
+                raise QueryException(
+                    "Could not parse the query, error: {}".format(str(exc))
+                )
 
-        # Replace any UnknownOperation with the chosen action
-        if ambiguous_action != "Exception":
+        # Replace any UnknownOperation with the chosen action, the fast parser never produces one
+        if ambiguous_action != "Exception" and not parsed_fast:
             operation = self.ambiguous_actions[ambiguous_action]
             resolver = UnknownOperationResolver(resolve_to=operation)
             self._tree = resolver(self._tree)
@@ -142,20 +363,52 @@ class QueryEngine:
 
             self._contains_bare_field = True
 
+        elif isinstance(root, SearchField) and not isinstance(root.expr, (Word, Phrase, Range, Regex, Fuzzy)):
+            raise QueryException(
+                "Field {} must be followed by a single term, such as a Word or Phrase".format(root.name)
+            )
+
         elif isinstance(root, UnknownOperation):
             raise QueryException(
                 "Query contains an ambiguous (unknown) operation, use AND or OR"
             )
 
         elif isinstance(root, Fuzzy):
-            # TODO: Implement with levenshtein matching
-            raise QueryException("Fuzzy matching with ~ is not currently supported")
+            if not isinstance(parent, SearchField) or not isinstance(root.term, Word):
+                raise QueryException("Fuzzy matching with ~ needs a named field and a single word")
+
+            try:
+                fuzzy_edits(root.term.unescaped_value, root.degree)
+            except ValueError as exc:
+                raise QueryException("Invalid fuzzy search, error: {}".format(str(exc)))
+
+            # The term is not a search term by itself, so is not checked as a child
+            return
 
         elif isinstance(root, Range):
-            # TODO: Implement, noting difference between [] (inclusive) and {} (exclusive)
-            raise QueryException(
-                "Range matching with [..] or {..} is not currently supported"
-            )
+            if not isinstance(parent, SearchField):
+                raise QueryException("Query contains a range without a named field")
+
+            # Bounds are converted once here, rather than when matching
+            try:
+                range_kind(
+                    coerce_bound(range_bound(root.low)), coerce_bound(range_bound(root.high))
+                )
+            except ValueError as exc:
+                raise QueryException("Invalid range, error: {}".format(str(exc)))
+
+            # The bounds are not search terms, so are not checked as children
+            return
+
+        elif isinstance(root, Regex):
+            if not isinstance(parent, SearchField):
+                raise QueryException("Query contains a regular expression without a named field")
+
+            # Compiled here to report errors early, re caches the result so lowering does not compile it again
+            try:
+                re.compile(root.value[1:-1])
+            except re.error as exc:
+                raise QueryException("Invalid regular expression, error: {}".format(str(exc)))
 
         elif not any(
             isinstance(root, t) for t in self.supported_ops
@@ -167,197 +420,322 @@ class QueryEngine:
         for child in root.children:
             self._check_tree(child, root, depth)
 
-    def match(self, data: dict, default_field: str = None) -> bool:
-        """ Match a dictionary against the configured query.
+    @property
+    def tree(self) -> Optional[Item]:
+        """
+        The luqum tree the query was parsed into, or None unless the QueryEngine was created with `keep_tree`.
+        Queries loaded from the cache or deserialized never have a tree.
+        """
+        return self._tree
+
+    @property
+    def canonical(self) -> str:
+        """
+        A canonical form of the query, which is the same for queries that only differ in the order of AND and
+        OR conditions, grouping or redundant terms. This can be used to find duplicate queries.
+        """
+        return canonical(self._ir)
+
+    @property
+    def required_fields(self) -> FrozenSet[str]:
+        """
+        The fields which every matching record has, so records without any of them can be skipped without
+        calling match(). See `querydict.precheck`.
+        """
+        return self._requirements[0]
+
+    @property
+    def required_terms(self) -> FrozenSet[Tuple[str, str]]:
+        """
+        The (field, value) pairs which every matching record has, where the field is a string equal to the value.
+        """
+        return self._requirements[1]
+
+    def _evaluation_order(self) -> Node:
+        """ Return the intermediate representation with AND and OR conditions in the order they are evaluated.
+
+        Adaptive queries change their order as they match, so the static order is used as an approximation.
+        """
+        if self.short_circuit and (self.optimize or self.adaptive):
+            return reorder(self._typed_ir)
+
+        return self._typed_ir
+
+    def _compile(self) -> None:
+        """
+        Compile the intermediate representation into a single callable which is used by match().
+
+        The order of AND and OR conditions only matters when short circuiting, otherwise every condition
+        is evaluated anyway. A profiled query uses a separate matcher, so other queries have no overhead.
+        """
+        self.stats: Optional[Profile] = None
+        self._typed_ir = self._apply_types()
+        self._requirements = requirements(self._typed_ir)
+        self._precheck = compile_precheck(*self._requirements) if self._contains_bare_field else None
+        self._member_names = member_names(self._ir)
+
+        if self.profile:
+            self.stats = Profile()
+            self._matcher = compile_profiled(self._evaluation_order(), self.stats, self.short_circuit)
+        elif self.short_circuit and self.adaptive:
+            self._matcher = compile_adaptive(self._typed_ir)
+        elif self.short_circuit and self.optimize:
+            self._matcher = compile_node(reorder(self._typed_ir), self.short_circuit)
+        else:
+            self._matcher = compile_node(self._typed_ir, self.short_circuit)
+
+    def _apply_types(self) -> Node:
+        """ Return the intermediate representation with Words replaced for typed matching, see `type_words()`.
+
+        Raises:
+            ValueError: If the schema contains a kind which is not valid.
+            QueryException: If a Word cannot be converted to the kind of its field.
+        """
+        if not (self.typed or self.schema):
+            return self._ir
+
+        schema = self.schema or {}
+        invalid = sorted(set(schema.values()) - set(FIELD_KINDS))
+
+        if invalid:
+            raise ValueError(
+                "Invalid schema kind {!r}, expected one of {}".format(invalid[0], ", ".join(FIELD_KINDS))
+            )
+
+        try:
+            return type_words(self._ir, self.typed, schema)
+        except ValueError as error:
+            raise QueryException(str(error)) from None
+
+    def _bare_fields(self, default_field: Optional[str]) -> Sequence[str]:
+        """ Find the fields searched by bare terms, see `querydict.record`.
 
         Args:
-            data: A dictionary containing fields and values to match against.
-            default_field: The name of a field to use for unqualified values.
+            default_field: The name of a field to use for unqualified values, which overrides `default_fields`.
 
         Returns:
-            True if there is a match, False otherwise
+            The names of the fields, which may include "*" for every string in the record.
 
         Raises:
-            MatchException: If there is a problem with the input data dictionary.
+            MatchException: If there is no default field.
         """
+        if default_field is not None:
+            return (default_field,)
+
+        if self.default_fields:
+            return self.default_fields
+
         # The user can't pass a query like "field:foo and bar" without specifying which
         # field to search for "bar".
-        if self._contains_bare_field and default_field is None:
-            raise MatchException(
-                "Need a default_field to use for matching unqualified field"
-            )
+        raise MatchException("Need a default_field to use for matching unqualified field")
 
-        data = dotty(data)
-        return self._match(data, self._tree)
-
-    def _match(self, data: dict, operation: Item) -> bool:
-        """ Internal method that recurses through the query AST to conduct matching.
+    def match(self, data: dict, default_field: str = None, explain: bool = False) -> Union[bool, Explanation]:
+        """ Match a dictionary against the configured query.
 
         Args:
             data: A dictionary containing fields and values to match against.
-            operation: The current luqum.tree object which is being matched.
+            default_field: The name of a field to use for unqualified values.
+            explain: Whether to return an explanation of which conditions decided the result, which is much
+                slower, see `querydict.explain`.
 
         Returns:
-            True if the match succeeeds, False otherwise.
+            True if there is a match, False otherwise. If `explain` is True, an `Explanation` which is true if
+            there is a match.
+
+        Raises:
+            MatchException: If there is a problem with the input data dictionary.
         """
+        if self._contains_bare_field:
+            fields = self._bare_fields(default_field)
 
-        # This dictionary maps supported luqum classes to methods on this class
-        op_map = {
-            SearchField: self._search_field,
-            AndOperation: self._and,
-            OrOperation: self._or,
-            Group: self._group,
-            Word: self._bare_field,
-            Phrase: self._bare_field,
-            Not: self._not,
-        }
+            # Records without a required field or term cannot match, so their strings are not collected
+            if self._precheck is not None and not explain and not self._precheck(data):
+                return False
 
-        handler_fn = op_map.get(type(operation), None)
+            data = RecordView(data, fields, self.casefold_bare)
 
-        if handler_fn is None:  # pragma: no cover
-            raise Exception("Unhandled operation type {}".format(str(type(operation))))
+        if explain:
+            return explain_node(self._evaluation_order(), data, self.short_circuit)
 
-        result = handler_fn(data, operation)
-        return result
+        return self._matcher(data)
 
-    @staticmethod
-    def _check_children(operation: Item) -> None:
-        """ Check that a given luqum.tree object only has one child.
+    def match_json(self, raw: Union[bytes, str], default_field: str = None) -> bool:
+        """ Match a JSON object against the configured query, decoding only the members the query uses.
 
-        This is an internal sanity check to ensure that assumptions made in this module are correct.
+        This gives the same result as `match(json.loads(raw))`, but is faster for records with many members
+        that the query does not use, see `querydict.lazyjson`.
 
         Args:
-            operation: The luqum.tree object to check.
+            raw: A JSON object, as bytes or a string.
+            default_field: The name of a field to use for unqualified values.
+
+        Returns:
+            True if there is a match, False otherwise.
+
+        Raises:
+            MatchException: If there is a problem with the input data.
+            json.JSONDecodeError: If the members which are decoded are not valid JSON.
         """
-        if len(operation.children) > 1:  # pragma: no cover
-            raise Exception(
-                "Unhandled operation with more than 1 child, please report a bug"
-            )
+        names = self._member_names
 
-    def _group(self, data: dict, operation: Group) -> bool:
-        """ Match a Group object, by stripping it and calling _match() with the contents of the group.
+        if self._contains_bare_field and names is not None:
+            fields = field_names(self._bare_fields(default_field))
+            names = names | fields if fields is not None else None
 
-        Args:
-            data: A dictionary containing fields and values to match against.
-            operation: Instance of luqum.tree.Group describing the grouped operations.
+        return self.match(loads_members(raw, names), default_field)
 
-        Returns:
-            True if the group matches, False otherwise.
-        """
-        self._check_children(operation)
-        return self._match(data, operation.children[0])
+    def filter_ndjson(
+        self, source, default_field: str = None, raw: bool = False, prefilter: bool = True
+    ) -> Iterator:
+        """ Filter newline delimited JSON (JSON lines), yielding records that match the configured query.
 
-    def _not(self, data: dict, operation: Not) -> bool:
-        """ Invert a match to support the "NOT" query syntax.
+        The input is read in large chunks. Lines which cannot match because they lack literal text required
+        by the query are skipped before being decoded, see `querydict.ndjson`.
 
         Args:
-            data: A dictionary containing fields and values to match against.
-            operation: Instance of luqum.tree.Not describing the operation to invert.
+            source: A path, or a file object open in binary mode.
+            default_field: The name of a field to use for unqualified values.
+            raw: Whether to yield the raw line as bytes, instead of the decoded record.
+            prefilter: Whether to skip lines that lack required literals before decoding them.
 
         Returns:
-            The inverted result of _match().
+            An iterator over each matching record, or the raw line if `raw` is True.
+
+        Raises:
+            MatchException: If there is a problem with the input data.
         """
-        self._check_children(operation)
-        return not self._match(data, operation.children[0])
+        if self._contains_bare_field:
+            self._bare_fields(default_field)
 
-    def _and(self, data: dict, operation: AndOperation) -> bool:
-        """ Implement the AND operator.
+        return self._filter_ndjson(source, raw, prefilter, default_field)
 
-        This method will short circuit and return False instantly if any component fails to match.
+    def _filter_ndjson(self, source, raw: bool, prefilter: bool, default_field: Optional[str]) -> Iterator:
+        """ Internal generator for filter_ndjson(), so that arguments are checked when it is called.
 
         Args:
-            data: A dictionary containing fields and values to match against.
-            operation: Instance of luqum.tree.AndOperation describing the operations to AND together.
+            source: A path, or a file object open in binary mode.
+            raw: Whether to yield the raw line as bytes, instead of the decoded record.
+            prefilter: Whether to skip lines that lack required literals before decoding them.
+            default_field: The name of a field to use for unqualified values.
 
-        Returns:
-            True if the query matches, False otherwise.
+        Yields:
+            Each matching record, or the raw line if `raw` is True.
         """
-        result = True
-
-        for child in operation.children:
-            if not self._match(data, child):
-                # Failure of one AND component means none can match, return immediately
-                if self.short_circuit:
-                    return False
+        fileobj, close = open_source(source)
+        matcher = self._matcher
 
-                result = False
+        if self._contains_bare_field:
+            matcher = functools.partial(self.match, default_field=default_field)
 
-        return result
+        try:
+            for line, record in filter_lines(iter_lines(fileobj), self._typed_ir, matcher, prefilter):
+                yield line if raw else record
+        finally:
+            if close:
+                fileobj.close()
 
-    def _or(self, data: dict, operation: OrOperation) -> bool:
-        """ Implement the OR operator.
+    def filter_parallel(
+        self,
+        iterable: Iterable,
+        workers: int = None,
+        chunksize: int = 1000,
+        ordered: bool = True,
+        default_field: str = None,
+    ) -> Iterator:
+        """ Filter a large iterable of dictionaries using a pool of worker processes.
 
-        This method will short circuit and return True instantly if any component matches.
+        The query is sent to each worker once without being parsed again, and dictionaries are sent in
+        chunks. See `querydict.parallel` for details.
 
         Args:
-            data: A dictionary containing fields and values to match against.
-            operation: Instance of luqum.tree.OrOperation describing the operations to OR together.
+            iterable: An iterable of dictionaries, which must be picklable.
+            workers: The number of worker processes (default: the number of CPUs).
+            chunksize: The number of dictionaries sent to a worker at once (default: 1000).
+            ordered: Whether to yield matches in the same order as the input (default: True).
+            default_field: The name of a field to use for unqualified values.
 
         Returns:
-            True if the query matches, False otherwise.
+            An iterator over each matching dictionary.
+
+        Raises:
+            MatchException: If there is a problem with the input data.
         """
-        result = False
+        if workers is not None and workers < 1:
+            raise ValueError("Need at least one worker")
+
+        if chunksize < 1:
+            raise ValueError("Need a chunksize of at least one")
 
-        for child in operation.children:
-            if self._match(data, child):
-                # Success of one OR component means it's a match
-                if self.short_circuit:
-                    return True
+        if self._contains_bare_field:
+            self._bare_fields(default_field)
 
-                result = True
+        from .parallel import filter_parallel
 
-        return result
+        return filter_parallel(self, iterable, workers, chunksize, ordered, default_field)
 
-    def _bare_field(self, data: dict, operation: Union[Word, Phrase]) -> NoReturn:
-        """ Match a Word or Phrase against the default field.
+    def filter_async(
+        self,
+        aiterable: AsyncIterable,
+        maxsize: int = 1000,
+        batch_size: int = 100,
+        executor: Executor = None,
+        offload_threshold: int = 100,
+        default_field: str = None,
+    ) -> AsyncIterator:
+        """ Filter an asynchronous iterable of dictionaries, for example messages from a Kafka consumer.
+
+        The source is read into a bounded queue, so it is not read faster than matches are consumed. See
+        `querydict.aio` for details.
 
         Args:
-            data: A dictionary containing fields and values to match against.
-            operation: Instance of luqum.tree.Word or luqum.tree.Phrase.
+            aiterable: An asynchronous iterable of dictionaries.
+            maxsize: The maximum number of dictionaries read from the source but not yet matched (default: 1000).
+            batch_size: The maximum number of dictionaries matched at once (default: 100).
+            executor: An executor used to match large batches without blocking the event loop (default: None).
+            offload_threshold: The smallest batch which is matched in `executor`, at most `batch_size`
+                (default: 100).
+            default_field: The name of a field to use for unqualified values.
 
-        Raises:
-            NotImplementedError: This method needs to be implemented.
-        """
-        raise NotImplementedError("Unimplemented")
+        Returns:
+            An asynchronous iterator over each matching dictionary.
 
-    def _search_field(self, data: dict, operation: SearchField) -> bool:
+        Raises:
+            MatchException: If there is a problem with the input data.
+            ValueError: If maxsize or batch_size is less than one, or an executor is given and offload_threshold
+                is larger than batch_size, so no batch would be matched in it.
         """
-        Process a single SearchField object, which should have either a Word() or Phrase()
-        as a child.  Fuzzy() and Range() are not currently supported.
+        if maxsize < 1 or batch_size < 1:
+            raise ValueError("Need a maxsize and batch_size of at least one")
 
-        Args:
-            data: A dictionary containing fields and values to match against.
-            operation: Instance of luqum.tree.SearchField which contains a child object to match.
+        if executor is not None and offload_threshold > batch_size:
+            raise ValueError("offload_threshold must not be larger than batch_size, or no batch is offloaded")
 
-        Returns:
-            True if the query matches, False otherwise.
-        """
+        if self._contains_bare_field:
+            self._bare_fields(default_field)
 
-        self._check_children(operation)
-        # logging.debug("Checking field %s against condition %s", op.name, op.expr)
+        from .aio import afilter
 
-        try:
-            field = data[operation.name]
-        except KeyError:
-            # logging.debug("Field %s was not found in the input data", op.name)
-            return False
+        return afilter(
+            self, aiterable, maxsize, batch_size, executor, offload_threshold, default_field
+        )
 
-        match = operation.children[0]
+    def match_columns(self, columns: dict, default_field: str = None) -> "numpy.ndarray":
+        """ Match columnar data against the configured query, for example a batch of records from Parquet.
 
-        # TODO: Check data type, e.g. for an int field we expect integer in the search query
+        Columns are named using the full field name, for example "foo.bar". Each is a list or NumPy array
+        with one value per row, where None represents a missing field. This requires NumPy to be installed.
 
-        if isinstance(match, Word):
-            return field == match.value
+        Args:
+            columns: A dictionary mapping field names to columns of equal length.
+            default_field: The name of a field to use for unqualified values.
 
-        if isinstance(match, Phrase):
-            # Strip the quotes, first check these are always here
-            if match.value[0] != '"' or match.value[-1] != '"':  # pragma: no cover
-                raise Exception(
-                    "Expected Phrase to start and end with double quotes, please report a bug"
-                )
+        Returns:
+            A NumPy array of booleans, containing the same result as match() for each row.
 
-            return match.value[1:-1] in field
+        Raises:
+            MatchException: If there is a problem with the input columns.
+        """
+        from .columnar import match_columns
 
-        # This should not be possible due to previous checks, but added to ensure
-        # matching cannot silently fail.
-        raise Exception("Unhandled SearchField child")  # pragma: no cover
+        fields = self._bare_fields(default_field) if self._contains_bare_field else ()
+        return match_columns(self._typed_ir, columns, fields, self.casefold_bare)
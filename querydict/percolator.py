@@ -0,0 +1,449 @@
+"""
+This module implements `QuerySet`, which matches a single dictionary against many queries at once. Sample usage:
+
+    >>> from querydict.percolator import QuerySet
+    >>> rules = QuerySet()
+    >>> rules.add("bob", "name:Bob")
+    >>> rules.add("blue", "eye_colour:Blue AND NOT name:Bob")
+    >>> rules.match({ "name": "Bob", "eye_colour": "Blue" })  # ["bob"]
+
+Rather than evaluating every query for every record, each query is indexed by terms it requires. For example
+"name:Bob AND eye_colour:Blue" can only match if the "name" field is equal to "Bob", so it is only evaluated
+for records where that is true. This is the same idea as the Elasticsearch percolator.
+
+Range queries such as "latency_ms:[100 TO 500]" are indexed in an interval tree for each field, see
+`querydict.intervals`, so the queries containing a value are found without checking every range.
+
+Phrases on each field are collected into one automaton, see `querydict.phrases`, which finds every phrase in
+a value with a single scan. Queries requiring a phrase are indexed by it, and every query that tests a phrase
+uses the result of that scan rather than searching the value again.
+
+Identical conditions in different queries are shared, see `querydict.subexpressions`, so a condition such as
+"env:prod" which is part of thousands of rules is evaluated at most once for each record. Adding and removing a
+query takes time proportional to its size, as the indexes keep recent changes aside rather than rebuilding.
+
+`match()` can be called from several threads at once, but `add()` and `remove()` must not be called while
+another thread is matching.
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple, Union
+from .compiler import (
+    Node, Term, WordTerm, TypedWordTerm, PhraseTerm, RangeTerm, And, Or, Not, Const, DATETIME_KINDS, compile_values,
+    parse_timestamp, split_path, value_kind
+)
+from .intervals import IntervalIndex
+from .parser import QueryEngine
+from .phrases import PhraseAutomaton, SharedPhraseTerm
+from .serialize import encode, decode
+from .subexpressions import SubexpressionTable, shareable
+
+# (field, value) for a word, or (field, node) for a typed word, range or phrase
+IndexKey = Tuple[str, Union[str, Term]]
+
+# Types of value which are looked up in the index of words, as typed words can be equal to all of them
+_INDEXED_TYPES = (str, int, float, datetime)
+
+
+def required_terms(node: Node) -> Optional[FrozenSet[IndexKey]]:
+    """ Find a set of terms, at least one of which must be present for the node to match.
+
+    Args:
+        node: A node of the intermediate representation.
+
+    Returns:
+        A set of (field, value) pairs for words, and (field, node) pairs for typed words, ranges and phrases, or
+        None if there is no such set (for example, if the node is a NOT). An empty set means the node can never
+        match.
+    """
+    if isinstance(node, TypedWordTerm):
+        # Case folded words can be equal to strings of any case, which cannot be looked up
+        return frozenset([(node.field, node)]) if node.keys() else None
+
+    if isinstance(node, WordTerm):
+        return frozenset([(node.field, node.value)])
+
+    if isinstance(node, (RangeTerm, PhraseTerm)):
+        return frozenset([(node.field, node)])
+
+    if isinstance(node, Const):
+        return None if node.value else frozenset()
+
+    if isinstance(node, And):
+        # Any child of an AND is required, so pick the smallest set to avoid unnecessary evaluation, preferring
+        # words as an exact value is usually more selective than a phrase or range
+        found = [terms for terms in map(required_terms, node.children) if terms is not None]
+        return min(found, key=lambda terms: (len(terms), _inexact_count(terms))) if found else None
+
+    if isinstance(node, Or):
+        # Every child of an OR needs required terms, or the OR could match without any of them
+        terms = frozenset()
+
+        for child in node.children:
+            child_terms = required_terms(child)
+
+            if child_terms is None:
+                return None
+
+            terms |= child_terms
+
+        return terms
+
+    return None
+
+
+def _inexact_count(terms: FrozenSet[IndexKey]) -> int:
+    return sum(1 for _, value in terms if isinstance(value, Term))
+
+
+def share_phrases(node: Node, automatons: Dict[str, PhraseAutomaton]) -> Node:
+    """ Replace every Phrase term with one that uses the shared automaton for its field.
+
+    The tree is not modified, a new tree is returned which shares unchanged nodes. Each phrase is added to
+    the automaton for its field, which is created if needed.
+
+    Args:
+        node: A node of the intermediate representation.
+        automatons: A map of field names to automatons.
+
+    Returns:
+        The new node.
+    """
+    if isinstance(node, PhraseTerm):
+        automaton = automatons.setdefault(node.field, PhraseAutomaton())
+        automaton.add(node.value)
+        return SharedPhraseTerm(node.field, node.value, automaton)
+
+    if isinstance(node, Not):
+        return Not(share_phrases(node.child, automatons))
+
+    if isinstance(node, (And, Or)):
+        return type(node)([share_phrases(child, automatons) for child in node.children])
+
+    return node
+
+
+def _phrases(node: Node) -> List[Tuple[str, str]]:
+    """ Find the (field, phrase) pairs of every Phrase term in a tree. """
+    if isinstance(node, PhraseTerm):
+        return [(node.field, node.value)]
+
+    if isinstance(node, Not):
+        return _phrases(node.child)
+
+    if isinstance(node, (And, Or)):
+        return [phrase for child in node.children for phrase in _phrases(child)]
+
+    return []
+
+
+class QuerySet:
+    """
+    Match a dictionary against many Lucene style queries, returning the identifiers of those that match.
+
+    Queries are indexed by the field:value terms, phrases and ranges they require, so only queries that can
+    possibly match a record are evaluated. Queries without any required terms, for example "NOT name:Bob", are
+    evaluated for every record. Queries that can never match, for example "name:Bob AND name:Alice", are never
+    evaluated.
+
+    Conditions which are the same in several queries are evaluated at most once for each record, and
+    `evaluated` is the number of distinct conditions evaluated by the last call to match(). Queries with search
+    terms without a field, and queries which are profiled or adaptive, are evaluated separately.
+
+    Args:
+        **options: Options passed to `QueryEngine` when a query is added as a string.
+    """
+
+    def __init__(self, **options: Any):
+        self._options = options
+        # Map of rule ID -> (sequence, engine, required terms, shared condition ID and matcher)
+        self._rules: Dict[Hashable, Tuple[int, QueryEngine, FrozenSet[IndexKey], Optional[Tuple[int, Callable]]]] = {}
+        self._sequence = 0
+        self._shared = SubexpressionTable()
+        self.evaluated = 0
+
+        # Map of field -> value -> set of rule IDs, along with an accessor for each indexed field
+        self._index: Dict[str, Dict[str, set]] = {}
+        self._accessors: Dict[str, Callable[[Any], List[Any]]] = {}
+        # Map of field -> kind of bound -> intervals of rule IDs, see value_kind()
+        self._ranges: Dict[str, Dict[Optional[str], IntervalIndex]] = {}
+        # Map of field -> automaton of every phrase on the field, and field -> required phrase -> rule IDs
+        self._automatons: Dict[str, PhraseAutomaton] = {}
+        self._phrase_index: Dict[str, Dict[str, set]] = {}
+
+        # Rules which have no required terms and must always be evaluated
+        self._unindexed: set = set()
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def __contains__(self, rule_id: Hashable) -> bool:
+        return rule_id in self._rules
+
+    def add(self, rule_id: Hashable, query: Union[str, QueryEngine]) -> None:
+        """ Add a query to the set, replacing any existing query with the same identifier.
+
+        Args:
+            rule_id: An identifier for the query, which is returned by match().
+            query: A Lucene style query, or an existing `QueryEngine`.
+
+        Raises:
+            QueryException: If the query is invalid, see `QueryEngine`.
+        """
+        engine = query if isinstance(query, QueryEngine) else QueryEngine(query, **self._options)
+
+        if rule_id in self._rules:
+            self.remove(rule_id)
+
+        # Compiled again so that phrases use the shared automatons, which the given engine does not
+        if _phrases(engine._ir):
+            engine = QueryEngine._from_ir(
+                share_phrases(engine._ir, self._automatons),
+                engine._contains_bare_field,
+                engine._tree,
+                **engine._options(),
+            )
+
+        terms = required_terms(engine._typed_ir)
+
+        if terms is None:
+            self._unindexed.add(rule_id)
+            terms = frozenset()
+
+        shared = None
+
+        if not (engine.profile or engine.adaptive) and shareable(engine._ir):
+            condition_id = self._shared.add(engine._evaluation_order(), engine.short_circuit)
+            shared = (condition_id, self._shared.matcher(condition_id))
+
+        self._rules[rule_id] = (self._sequence, engine, terms, shared)
+        self._sequence += 1
+
+        for field, value in terms:
+            if field not in self._accessors:
+                self._accessors[field] = compile_values(split_path(field))
+
+            if isinstance(value, RangeTerm):
+                index = self._ranges.setdefault(field, {}).setdefault(value.kind, IntervalIndex())
+                index.add(rule_id, value.low, value.high, value.include_low, value.include_high)
+            elif isinstance(value, PhraseTerm):
+                self._phrase_index.setdefault(field, {}).setdefault(value.value, set()).add(rule_id)
+            else:
+                values = self._index.setdefault(field, {})
+
+                for key in value.keys() if isinstance(value, TypedWordTerm) else [value]:
+                    values.setdefault(key, set()).add(rule_id)
+
+    def remove(self, rule_id: Hashable) -> None:
+        """ Remove a query from the set.
+
+        Args:
+            rule_id: The identifier used when the query was added.
+
+        Raises:
+            KeyError: If there is no query with this identifier.
+        """
+        _, engine, terms, shared = self._rules.pop(rule_id)
+        self._unindexed.discard(rule_id)
+
+        if shared is not None:
+            self._shared.remove(shared[0])
+
+        for field, phrase in _phrases(engine._ir):
+            automaton = self._automatons[field]
+            automaton.remove(phrase)
+
+            if not len(automaton):
+                del self._automatons[field]
+
+        for field, value in terms:
+            if isinstance(value, RangeTerm):
+                kinds = self._ranges.get(field, {})
+                index = kinds.get(value.kind)
+
+                # A rule may have more than one range in the same index, which are all removed at once
+                if index is not None and rule_id in index:
+                    index.remove(rule_id)
+
+                    if not len(index):
+                        del kinds[value.kind]
+
+                    if not kinds:
+                        del self._ranges[field]
+            elif isinstance(value, PhraseTerm):
+                phrases = self._phrase_index[field]
+                phrases[value.value].discard(rule_id)
+
+                if not phrases[value.value]:
+                    del phrases[value.value]
+
+                if not phrases:
+                    del self._phrase_index[field]
+            else:
+                self._unindex(field, value.keys() if isinstance(value, TypedWordTerm) else [value], rule_id)
+
+            if field not in self._index and field not in self._ranges and field not in self._phrase_index:
+                self._accessors.pop(field, None)
+
+    def _unindex(self, field: str, keys: Iterable[Any], rule_id: Hashable) -> None:
+        """ Remove a rule from the index of words on a field. """
+        values = self._index[field]
+
+        for key in keys:
+            # Typed words in the same rule can share a key, for example "1" and "1.0"
+            rule_ids = values.get(key)
+
+            if rule_ids is not None:
+                rule_ids.discard(rule_id)
+
+                if not rule_ids:
+                    del values[key]
+
+        if not values:
+            del self._index[field]
+
+    def candidates(self, data: dict) -> set:
+        """ Find the queries which could match a dictionary, without evaluating them.
+
+        Args:
+            data: A dictionary containing fields and values to match against.
+
+        Returns:
+            The set of rule identifiers which need to be evaluated.
+        """
+        found = set(self._unindexed)
+
+        # Accessors return every value of a field, which is more than one for fields containing "*"
+        for field, values in self._index.items():
+            for value in self._accessors[field](data):
+                # Word terms only match strings, or numbers, booleans and datetimes when they are typed. True is
+                # equal to 1, so finds typed words for both, which are then evaluated
+                if isinstance(value, _INDEXED_TYPES):
+                    rule_ids = values.get(value)
+
+                    if rule_ids:
+                        found |= rule_ids
+
+        for field, kinds in self._ranges.items():
+            for value in self._accessors[field](data):
+                kind = value_kind(value)
+
+                # Values are only compared with ranges of the same kind, and [* TO *] with any of them. NaN is not
+                # equal to itself, and is not in any range
+                if kind is not None and value == value:
+                    if kind in kinds:
+                        found |= kinds[kind].search(value)
+
+                    if None in kinds:
+                        found |= kinds[None].search(value)
+
+                # Timestamps decoded from JSON are strings, which are also in ranges of datetimes
+                if kind == "string" and any(timestamp_kind in kinds for timestamp_kind in DATETIME_KINDS):
+                    timestamp = parse_timestamp(value)
+                    timestamp_kind = value_kind(timestamp)
+
+                    if timestamp_kind in kinds:
+                        found |= kinds[timestamp_kind].search(timestamp)
+
+        for field, phrases in self._phrase_index.items():
+            for value in self._accessors[field](data):
+                if isinstance(value, str):
+                    # The same scan is used by the phrase terms when the candidates are matched
+                    for phrase in self._automatons[field].scan(value):
+                        rule_ids = phrases.get(phrase)
+
+                        if rule_ids:
+                            found |= rule_ids
+                else:
+                    # Phrases can also be found in other values, such as lists, which are not scanned
+                    for rule_ids in phrases.values():
+                        found |= rule_ids
+
+        return found
+
+    def match(self, data: dict, default_field: str = None) -> List[Hashable]:
+        """ Match a dictionary against every query in the set.
+
+        Args:
+            data: A dictionary containing fields and values to match against.
+            default_field: The name of a field to use for unqualified values, see `QueryEngine.match`.
+
+        Returns:
+            The identifiers of matching queries, in the order they were added.
+
+        Raises:
+            MatchException: If there is a problem with the input data dictionary.
+        """
+        rules = self._rules
+        matched = []
+        self._shared.start()
+
+        for rule_id in self.candidates(data):
+            sequence, engine, _, shared = rules[rule_id]
+
+            if shared[1](data) if shared is not None else engine.match(data, default_field):
+                matched.append((sequence, rule_id))
+
+        self.evaluated = self._shared.evaluated
+        matched.sort()
+        return [rule_id for _, rule_id in matched]
+
+    def __getstate__(self) -> dict:
+        """ Return the options and queries of the set for pickle, see `querydict.serialize`. """
+        rules = sorted(self._rules.items(), key=lambda item: item[1][0])
+        return {
+            "options": self._options,
+            "rules": [[rule_id, engine.__getstate__()] for rule_id, (_, engine, _, _) in rules],
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        """ Restore the set from pickle, without parsing its queries again.
+
+        Raises:
+            ValueError: If the state is not valid.
+        """
+        try:
+            options, rules = dict(state["options"]), state["rules"]
+        except (TypeError, ValueError, KeyError):
+            raise ValueError("Invalid serialized rule set") from None
+
+        self.__init__(**options)
+
+        for rule_id, engine_state in rules:
+            engine = QueryEngine.__new__(QueryEngine)
+            engine.__setstate__(engine_state)
+            self.add(rule_id, engine)
+
+    def to_bytes(self) -> bytes:
+        """ Serialize the set, so it can be loaded without parsing its queries again.
+
+        Rule identifiers must be strings, numbers, booleans or None. Use pickle for other identifiers.
+
+        Returns:
+            The serialized set.
+
+        Raises:
+            ValueError: If a rule identifier cannot be serialized.
+        """
+        for rule_id in self._rules:
+            if rule_id is not None and not isinstance(rule_id, (str, int, float)):
+                raise ValueError("Cannot serialize rule identifier {!r}, use pickle instead".format(rule_id))
+
+        return encode("rules", self.__getstate__())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "QuerySet":
+        """ Load a set serialized by to_bytes(), without parsing its queries again.
+
+        Args:
+            data: The serialized set.
+
+        Returns:
+            A new QuerySet.
+
+        Raises:
+            ValueError: If the data is not a serialized set, or is in an unsupported format.
+        """
+        rules = cls.__new__(cls)
+        rules.__setstate__(decode("rules", data))
+        return rules
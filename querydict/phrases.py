@@ -0,0 +1,234 @@
+"""
+This module finds which of many phrases occur in a string with a single scan, used by `QuerySet` so that
+thousands of rules with Phrase terms on the same field do not each search the field. Sample usage:
+
+    >>> from querydict.phrases import PhraseAutomaton
+    >>> automaton = PhraseAutomaton()
+    >>> automaton.add("disk full")
+    >>> automaton.add("timed out")
+    >>> automaton.scan("write failed: disk full")  # frozenset({"disk full"})
+
+Large sets of phrases use an Aho-Corasick automaton, which visits each character of the string once however
+many phrases there are. Small sets test each phrase with `in` instead, which is faster until there are
+enough phrases to outweigh looping over characters in Python.
+
+The result of the last scan is kept, so when many rules test the same string for a match it is only
+scanned once. `SharedPhraseTerm` is a Phrase term which tests the result of the scan.
+
+Adding or removing a phrase does not rebuild the automaton, which is rebuilt lazily when scanning, see
+`querydict.rebuild`.
+"""
+
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+from .compiler import Matcher, PhraseTerm
+from .rebuild import LazyRebuild
+
+# Sets of phrases up to this size are tested with `in`, rather than an automaton
+SMALL_SET = 128
+
+_EMPTY: FrozenSet[str] = frozenset()
+
+
+class PhraseAutomaton(LazyRebuild):
+    """
+    A set of phrases which can all be searched for in a string at once.
+
+    Phrases can be added more than once, and are only removed when they have been removed as many times.
+    Pending phrases are tested with `in`, and stale phrases are filtered from the results.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._counts: Dict[str, int] = {}
+        # Tuples of (string, phrases found) for the last scan
+        self._last: Tuple[Optional[str], FrozenSet[str]] = (None, _EMPTY)
+        self._phrases: Tuple[str, ...] = ()
+        self._built: FrozenSet[str] = _EMPTY
+        self._goto: Optional[List[Dict[str, int]]] = None
+        self._fail: List[int] = []
+        self._output: List[FrozenSet[str]] = []
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, phrase: str) -> bool:
+        return phrase in self._counts
+
+    def add(self, phrase: str) -> None:
+        """ Add a phrase to the set.
+
+        Args:
+            phrase: The phrase to search for.
+        """
+        count = self._counts.get(phrase, 0)
+        self._counts[phrase] = count + 1
+
+        if not count:
+            if phrase in self._stale:
+                self._stale.discard(phrase)
+            elif phrase not in self._built:
+                self._pending.add(phrase)
+
+        self._last = (None, _EMPTY)
+
+    def remove(self, phrase: str) -> None:
+        """ Remove a phrase which was added, once.
+
+        Args:
+            phrase: The phrase used when it was added.
+
+        Raises:
+            KeyError: If the phrase is not in the set.
+        """
+        count = self._counts[phrase]
+
+        if count > 1:
+            self._counts[phrase] = count - 1
+        else:
+            del self._counts[phrase]
+
+            if phrase in self._pending:
+                self._pending.discard(phrase)
+            else:
+                self._stale.add(phrase)
+
+        self._last = (None, _EMPTY)
+
+    def _build(self) -> None:
+        """ Build the Aho-Corasick automaton, or only keep a list of phrases if there are few of them. """
+        phrases = tuple(self._counts)
+
+        if len(phrases) <= SMALL_SET:
+            self._goto = None
+        else:
+            self._build_automaton(phrases)
+
+        self._phrases = phrases
+        self._built = frozenset(phrases)
+
+    def _build_automaton(self, phrases: Tuple[str, ...]) -> None:
+        """ Build the trie, fallbacks and outputs of an Aho-Corasick automaton for the phrases. """
+        # A trie of the phrases, where each state is a prefix of at least one phrase
+        goto: List[Dict[str, int]] = [{}]
+        output: List[set] = [set()]
+
+        for phrase in phrases:
+            state = 0
+
+            for char in phrase:
+                following = goto[state].get(char)
+
+                if following is None:
+                    following = len(goto)
+                    goto[state][char] = following
+                    goto.append({})
+                    output.append(set())
+
+                state = following
+
+            output[state].add(phrase)
+
+        # Each state falls back to the longest proper suffix which is also a state, and so also reports the
+        # phrases ending at that suffix. States are visited in order of depth, so fallbacks are set first
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+
+        for state in queue:
+            for char, following in goto[state].items():
+                queue.append(following)
+                fallback = fail[state]
+
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+
+                fail[following] = goto[fallback].get(char, 0)
+                output[following] |= output[fail[following]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = [frozenset(found) for found in output]
+
+    def scan(self, text: str) -> FrozenSet[str]:
+        """ Find the phrases which occur in a string.
+
+        Args:
+            text: The string to search.
+
+        Returns:
+            The set of phrases which are in the string.
+        """
+        last_text, last_found = self._last
+
+        # Rules matching the same record test the same string object, so only the first one scans it
+        if last_text is text:
+            return last_found
+
+        found = self._read(self._scan, text)
+        self._last = (text, found)
+        return found
+
+    def _scan(self, text: str) -> FrozenSet[str]:
+        pending, stale = self._pending, self._stale
+        goto = self._goto
+
+        if goto is None:
+            found = frozenset(phrase for phrase in self._phrases if phrase in text)
+        else:
+            fail, output = self._fail, self._output
+            # The phrases of the initial state, which is only the empty phrase if it was added
+            matched = set(output[0])
+            state = 0
+
+            for char in text:
+                following = goto[state].get(char)
+
+                while following is None and state:
+                    state = fail[state]
+                    following = goto[state].get(char)
+
+                # The initial state is never a following state, so 0 means there was none
+                state = following or 0
+
+                if output[state]:
+                    matched |= output[state]
+
+            found = frozenset(matched)
+
+        if stale:
+            found -= stale
+
+        if pending:
+            found |= frozenset(phrase for phrase in pending if phrase in text)
+
+        return found
+
+
+class SharedPhraseTerm(PhraseTerm):
+    """
+    A Phrase term which finds whether the phrase is in a string using a shared `PhraseAutomaton`, so that
+    every such term on the same field scans each string once between them.
+
+    Args:
+        field: The dotted name of the field, for example "foo.bar".
+        value: The literal to search for, with any quotes already removed.
+        automaton: The automaton for the field, which `value` has been added to.
+    """
+
+    __slots__ = ("automaton",)
+
+    def __init__(self, field: str, value: str, automaton: PhraseAutomaton):
+        super().__init__(field, value)
+        self.automaton = automaton
+
+    def compile_test(self) -> Matcher:
+        value, scan = self.value, self.automaton.scan
+        test_phrase = super().compile_test()
+
+        def test_shared(found: Any) -> bool:
+            # Other values, such as lists, are tested in the same way as PhraseTerm
+            if type(found) is not str:
+                return test_phrase(found)
+
+            return value in scan(found)
+
+        return test_shared
@@ -0,0 +1,84 @@
+"""
+This module finds the fields and terms which every record matching a query must have, for example
+"name:Bob AND (age:[18 TO *] OR NOT role:admin)" can only match records where "name" is "Bob". They are
+available as `QueryEngine.required_fields` and `QueryEngine.required_terms`, so that other systems can route
+or skip records without matching them.
+
+Only the structure of AND and OR is used. Every child of an AND is required, an OR only requires what all of
+its children require, and nothing under a NOT is required. Fields containing "*" are not included, as they
+name many values rather than one.
+
+`QueryEngine` uses them to reject records before collecting their strings for bare terms, see
+`querydict.record`. Other queries have no separate check, as the optimised query already evaluates exact terms
+before anything more expensive.
+"""
+
+from typing import Any, FrozenSet, Optional, Tuple
+from .compiler import (
+    Node, Term, WordTerm, TypedWordTerm, And, Or, Matcher, MISSING, ANY_SEGMENT, compile_node, compile_path,
+    split_path
+)
+
+Requirements = Tuple[FrozenSet[str], FrozenSet[Tuple[str, str]]]
+
+_NOTHING: Requirements = (frozenset(), frozenset())
+
+
+def requirements(node: Node) -> Requirements:
+    """ Find the fields and terms which every match of a node requires.
+
+    Args:
+        node: A node of the intermediate representation.
+
+    Returns:
+        A tuple of (fields, terms), where fields is a set of field names which must be present, and terms is a
+        set of (field, value) pairs for Words which must be equal. Typed Words are not included in terms, as
+        the field may be equal to a number or other value instead of the string.
+    """
+    if isinstance(node, Term):
+        if ANY_SEGMENT in node.path:
+            return _NOTHING
+
+        exact = isinstance(node, WordTerm) and not isinstance(node, TypedWordTerm)
+        terms = frozenset([(node.field, node.value)]) if exact else frozenset()
+        return frozenset([node.field]), terms
+
+    if isinstance(node, (And, Or)):
+        found = [requirements(child) for child in node.children]
+        # Every child of an AND is required, but an OR only requires what every child requires
+        combine = frozenset.union if isinstance(node, And) else frozenset.intersection
+        return combine(*(fields for fields, _ in found)), combine(*(terms for _, terms in found))
+
+    # Nothing is required by a NOT, a bare term or a constant
+    return _NOTHING
+
+
+def compile_precheck(fields: FrozenSet[str], terms: FrozenSet[Tuple[str, str]]) -> Optional[Matcher]:
+    """ Compile a check that a record has the required fields and terms.
+
+    Args:
+        fields: Fields which must be present, as returned by `requirements()`.
+        terms: (field, value) pairs which must be equal, as returned by `requirements()`.
+
+    Returns:
+        A function which accepts a record and returns False if it cannot match, or None if nothing is required.
+    """
+    checks = tuple(compile_node(WordTerm(field, value)) for field, value in sorted(terms))
+    # Fields with a required term are already checked by it
+    getters = tuple(compile_path(split_path(field)) for field in sorted(fields - {field for field, _ in terms}))
+
+    if not checks and not getters:
+        return None
+
+    def precheck(data: Any) -> bool:
+        for check in checks:
+            if not check(data):
+                return False
+
+        for get in getters:
+            if get(data) is MISSING:
+                return False
+
+        return True
+
+    return precheck
@@ -0,0 +1,71 @@
+"""
+This module implements `LazyRebuild`, the base class of the indexes used by `QuerySet` which are expensive to
+build, `querydict.intervals.IntervalIndex` and `querydict.phrases.PhraseAutomaton`.
+
+Adding or removing an entry does not rebuild the index. Entries added since it was built are kept aside as
+pending and checked in full by every read, and entries removed since then are kept as stale and filtered from
+the results. Each read adds the number of pending and stale entries to an overhead, and the index is rebuilt
+when the overhead reaches its size, so the cost of checking changes never exceeds the cost of rebuilding.
+
+Reads can be made from several threads at once. A read with pending or stale entries holds a lock, so only one
+thread rebuilds, and the changes are cleared only once the new index is complete, so reads without changes
+never see a partly built index and do not take the lock. Entries must not be added or removed at the same time
+as reading.
+"""
+
+import threading
+from typing import Any, Callable, TypeVar
+
+Result = TypeVar("Result")
+
+
+class LazyRebuild:
+    """
+    An index which keeps changes aside and is rebuilt when reading them has cost more than rebuilding.
+
+    Subclasses record changes in `_pending` and `_stale`, implement `_build()` and `__len__()`, and read the
+    index with `_read()`.
+    """
+
+    # The type of the collection of pending entries, such as a set or a dictionary
+    pending_type: Callable[[], Any] = set
+
+    def __init__(self) -> None:
+        # Entries added since the index was built, and entries in the index which have been removed
+        self._pending = self.pending_type()
+        self._stale: set = set()
+        # The number of pending and stale entries checked since the index was built
+        self._overhead = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def _build(self) -> None:
+        """ Build the index from every current entry, including pending ones, which is called with the lock held. """
+        raise NotImplementedError
+
+    def _read(self, read: Callable[[Any], Result], argument: Any) -> Result:
+        """ Read the index, rebuilding it first if checking the changes has cost more than rebuilding.
+
+        Args:
+            read: A function which reads the index, checking `_pending` and `_stale` as well as the built index.
+            argument: The argument passed to `read`.
+
+        Returns:
+            The result of `read`.
+        """
+        if not (self._pending or self._stale):
+            return read(argument)
+
+        with self._lock:
+            self._overhead += len(self._pending) + len(self._stale)
+
+            if self._overhead >= len(self):
+                self._build()
+                self._overhead = 0
+                # Cleared last, as reads without changes use the index without taking the lock
+                self._pending = self.pending_type()
+                self._stale = set()
+
+            return read(argument)
@@ -0,0 +1,152 @@
+"""
+This module implements `RecordView`, which wraps a record while it is matched against a query with bare terms,
+such as "error" rather than "message:error". Bare terms search the string values of one or more default
+fields, or every string in the record.
+
+The strings are collected the first time a bare term needs them, and kept for the rest of the match, so a
+query with several bare terms walks the record once. Words are then found in a set of the strings, and phrases
+in the strings joined into one.
+
+Columnar data has no records to wrap, so each bare term is instead matched against each default column as a
+`DefaultFieldTerm`.
+"""
+
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, Callable, FrozenSet, Iterator, List, Optional, Sequence
+from .compiler import Matcher, Term, compile_values, split_path
+
+# Used to search all strings in a record, instead of named default fields
+ALL_FIELDS = "*"
+
+# Joins strings for phrase searches, so a phrase cannot match across two strings
+_SEPARATOR = "\x00"
+
+
+@lru_cache(maxsize=1024)
+def _accessor(field: str) -> Callable[[Any], List[Any]]:
+    return compile_values(split_path(field))
+
+
+def string_leaves(value: Any, leaves: List[str]) -> None:
+    """ Collect every string in a value, including those in nested dictionaries and lists.
+
+    Args:
+        value: The value to search.
+        leaves: A list which the strings are appended to.
+    """
+    stack = [value]
+
+    while stack:
+        value = stack.pop()
+
+        if isinstance(value, str):
+            leaves.append(value)
+        elif isinstance(value, Mapping):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+
+
+class RecordView(Mapping):
+    """
+    A read only view of a record, which also collects the strings searched by bare terms.
+
+    Args:
+        data: The record being matched.
+        fields: The default fields searched by bare terms, which may be `ALL_FIELDS`.
+        casefold: Whether the strings are case folded, so bare terms match regardless of case.
+    """
+
+    __slots__ = ("data", "fields", "casefold", "_leaves", "_words", "_text")
+
+    def __init__(self, data: Any, fields: Sequence[str], casefold: bool = False):
+        self.data = data
+        self.fields = fields
+        self.casefold = casefold
+        self._leaves: Optional[List[str]] = None
+        self._words: Optional[FrozenSet[str]] = None
+        self._text: Optional[str] = None
+
+    def __getitem__(self, key: Any) -> Any:
+        return self.data[key]
+
+    def __iter__(self) -> Iterator:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def leaves(self) -> List[str]:
+        """ The strings of the default fields, in no particular order. """
+        if self._leaves is not None:
+            return self._leaves
+
+        leaves: List[str] = []
+
+        for field in self.fields:
+            if field == ALL_FIELDS:
+                string_leaves(self.data, leaves)
+                continue
+
+            for value in _accessor(field)(self.data):
+                string_leaves(value, leaves)
+
+        if self.casefold:
+            leaves = [leaf.casefold() for leaf in leaves]
+
+        self._leaves = leaves
+        return leaves
+
+    def words(self) -> FrozenSet[str]:
+        """ The strings of the default fields, as a set. """
+        if self._words is None:
+            self._words = frozenset(self.leaves())
+
+        return self._words
+
+    def text(self) -> str:
+        """ The strings of the default fields, joined into one string which phrases are searched in. """
+        if self._text is None:
+            self._text = _SEPARATOR.join(self.leaves())
+
+        return self._text
+
+
+class DefaultFieldTerm(Term):
+    """
+    A bare term matched against a single default field, which matches if any string in the field is equal
+    to a Word or contains a Phrase.
+
+    Args:
+        field: The dotted name of the default field.
+        value: The literal to search for, with any quotes already removed.
+        phrase: True if the literal was a Phrase, False if it was a Word.
+        casefold: Whether to match regardless of case.
+    """
+
+    __slots__ = ("phrase", "casefold")
+
+    def __init__(self, field: str, value: str, phrase: bool, casefold: bool):
+        super().__init__(field, value)
+        self.phrase = phrase
+        self.casefold = casefold
+
+    def compile_test(self) -> Matcher:
+        value = self.value.casefold() if self.casefold else self.value
+        phrase, casefold = self.phrase, self.casefold
+
+        def test_default_field(found: Any) -> bool:
+            leaves: List[str] = []
+            string_leaves(found, leaves)
+
+            for leaf in leaves:
+                if casefold:
+                    leaf = leaf.casefold()
+
+                if (value in leaf) if phrase else (leaf == value):
+                    return True
+
+            return False
+
+        return test_default_field
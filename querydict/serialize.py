@@ -0,0 +1,181 @@
+"""
+This module converts checked queries to and from a compact, versioned format, so that workers can load many
+rules without parsing them again. Sample usage:
+
+    >>> from querydict.parser import QueryEngine
+    >>> data = QueryEngine("name:Bob AND age:[18 TO *]").to_bytes()
+    >>> query = QueryEngine.from_bytes(data)
+
+The format is a short header followed by JSON, which holds the normalised intermediate representation of the
+query and the options it was created with. Loading it only builds the intermediate representation and
+compiles it, luqum is not used and the query is not checked again. JSON is used rather than pickle so that
+loading data cannot run arbitrary code, and so that the format does not depend on the version of Python.
+
+The header includes a format version, which is increased whenever the format changes. Data in a format this
+version of querydict does not understand raises `ValueError`.
+
+`QueryEngine` and `QuerySet` also support pickle, using the same representation.
+"""
+
+import json
+from typing import Any, Callable, Dict, Tuple
+from .compiler import (
+    Node, WordTerm, PhraseTerm, RangeTerm, WildcardTerm, RegexTerm, FuzzyTerm, BareTerm, And, Or, Not, Const
+)
+
+FORMAT_VERSION = 1
+
+_MAGIC = b"querydict"
+
+# Options which are tuples, but become lists in JSON
+_TUPLE_OPTIONS = ("default_fields",)
+
+# Each node is a list starting with a tag for its type, followed by the arguments needed to create it
+_DUMP_MAP: Dict[type, Tuple[str, Callable[[Any], list]]] = {
+    WordTerm: ("w", lambda node: [node.field, node.value]),
+    PhraseTerm: ("p", lambda node: [node.field, node.value]),
+    RangeTerm: ("r", lambda node: [node.field, *node.bounds, node.include_low, node.include_high]),
+    WildcardTerm: ("*", lambda node: [node.field, node.value]),
+    RegexTerm: ("/", lambda node: [node.field, node.value]),
+    FuzzyTerm: ("~", lambda node: [node.field, node.value, node.max_edits]),
+    BareTerm: ("b", lambda node: [node.value, node.phrase]),
+    And: ("&", lambda node: [dump_node(child) for child in node.children]),
+    Or: ("|", lambda node: [dump_node(child) for child in node.children]),
+    Not: ("!", lambda node: [dump_node(node.child)]),
+    Const: ("c", lambda node: [node.value]),
+}
+
+_LOAD_MAP: Dict[str, Callable[..., Node]] = {
+    "w": WordTerm,
+    "p": PhraseTerm,
+    "r": RangeTerm,
+    "*": WildcardTerm,
+    "/": RegexTerm,
+    "~": FuzzyTerm,
+    "b": BareTerm,
+    "&": lambda *children: And([load_node(child) for child in children]),
+    "|": lambda *children: Or([load_node(child) for child in children]),
+    "!": lambda child: Not(load_node(child)),
+    "c": Const,
+}
+
+
+def dump_node(node: Node) -> list:
+    """ Convert a node of the intermediate representation into lists, strings, numbers and booleans.
+
+    Subclasses of terms, such as those used by `QuerySet`, are converted to the term they are based on.
+
+    Args:
+        node: The node to convert.
+
+    Returns:
+        A list which can be encoded as JSON.
+    """
+    dump = _DUMP_MAP.get(type(node), None)
+
+    if dump is None:
+        dump = next((_DUMP_MAP[base] for base in type(node).__mro__ if base in _DUMP_MAP), None)
+
+    if dump is None:
+        raise ValueError("Cannot serialize node type {}".format(str(type(node))))
+
+    tag, arguments = dump
+    return [tag, *arguments(node)]
+
+
+def load_node(data: list) -> Node:
+    """ Create a node of the intermediate representation from the output of `dump_node()`.
+
+    Args:
+        data: The converted node.
+
+    Returns:
+        The node.
+
+    Raises:
+        ValueError: If the data is not a valid node.
+    """
+    try:
+        tag, *arguments = data
+        return _LOAD_MAP[tag](*arguments)
+    except (TypeError, ValueError, KeyError):
+        raise ValueError("Invalid serialized query node") from None
+
+
+def dump_engine(ir: Node, contains_bare_field: bool, options: dict) -> dict:
+    """ Convert the state of a `QueryEngine` into data which can be encoded as JSON.
+
+    Args:
+        ir: The intermediate representation of the query.
+        contains_bare_field: Whether the query contains a search term without a named field.
+        options: The options of the engine, see `QueryEngine._options()`.
+
+    Returns:
+        A dictionary.
+    """
+    return {"ir": dump_node(ir), "bare": contains_bare_field, "options": options}
+
+
+def load_engine(data: dict) -> Tuple[Node, bool, dict]:
+    """ Convert the output of `dump_engine()` back into the state of a `QueryEngine`.
+
+    Args:
+        data: The converted state.
+
+    Returns:
+        A tuple of (intermediate representation, whether it contains bare fields, options).
+
+    Raises:
+        ValueError: If the data is not a valid query.
+    """
+    try:
+        ir, contains_bare_field, options = data["ir"], data["bare"], dict(data["options"])
+    except (TypeError, ValueError, KeyError):
+        raise ValueError("Invalid serialized query") from None
+
+    for name in _TUPLE_OPTIONS:
+        if options.get(name) is not None:
+            options[name] = tuple(options[name])
+
+    return load_node(ir), bool(contains_bare_field), options
+
+
+def encode(kind: str, data: Any) -> bytes:
+    """ Encode data with a header giving its kind and the format version.
+
+    Args:
+        kind: What the data represents, for example "query".
+        data: Data which can be encoded as JSON.
+
+    Returns:
+        The encoded data.
+    """
+    header = b"%s:%s:%d\n" % (_MAGIC, kind.encode("ascii"), FORMAT_VERSION)
+    return header + json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def decode(kind: str, encoded: bytes) -> Any:
+    """ Decode data encoded by `encode()`.
+
+    Args:
+        kind: What the data is expected to represent.
+        encoded: The encoded data.
+
+    Returns:
+        The data.
+
+    Raises:
+        ValueError: If the data is not of the expected kind, or is in an unsupported format.
+    """
+    header, _, body = bytes(encoded).partition(b"\n")
+    parts = header.split(b":")
+
+    if len(parts) != 3 or parts[0] != _MAGIC or parts[1] != kind.encode("ascii"):
+        raise ValueError("Data is not a serialized {}".format(kind))
+
+    if parts[2] != str(FORMAT_VERSION).encode("ascii"):
+        raise ValueError(
+            "Unsupported serialized {} format {!r}, expected {}".format(kind, parts[2], FORMAT_VERSION)
+        )
+
+    return json.loads(body.decode("utf-8"))
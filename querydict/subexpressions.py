@@ -0,0 +1,196 @@
+"""
+This module shares identical conditions between many queries, used by `QuerySet` so that a condition which is
+part of many rules is evaluated at most once for each record. Sample usage:
+
+    >>> from querydict.parser import QueryEngine
+    >>> from querydict.subexpressions import SubexpressionTable
+    >>> table = SubexpressionTable()
+    >>> first = table.add(QueryEngine("env:prod AND (service:api OR service:web)")._ir)
+    >>> second = table.add(QueryEngine("(service:web OR service:api) AND NOT user:root")._ir)
+    >>> table.start()
+    >>> table.matcher(first)({"env": "prod", "service": "web"})   # True
+    >>> table.matcher(second)({"env": "prod", "service": "web"})  # True
+    >>> table.evaluated  # 8, as the OR and both its terms are only evaluated for the first rule
+
+Conditions are hash-consed. Each term is identified by its type and canonical form, along with the kind of a
+typed Word, and each AND, OR and NOT by the identifiers of its children, so identical conditions are stored and
+compiled once however many queries contain them. AND and OR conditions with the same children in a different
+order are the same condition.
+
+Each condition remembers its result for the current record, which is started with `start()`. Results are kept
+separately for each thread, so a table can be used by several threads at once.
+
+Normalised queries have flat AND and OR conditions, so "env:prod AND service:api AND user:bob" shares its
+terms with other queries rather than the AND of the first two. Queries containing bare terms are not shared,
+as their result depends on the default fields used to match them.
+"""
+
+import threading
+from typing import Dict, Hashable, Tuple
+from .compiler import Node, Term, TypedWordTerm, BareTerm, And, Or, Not, Const, Compiled, Matcher, compile_node
+from .normalize import canonical
+
+_UNSET = object()
+
+
+class _Results(threading.local):
+    """ The results of conditions for the current record in each thread, by identifier. """
+
+    def __init__(self) -> None:
+        self.values: Dict[int, bool] = {}
+
+
+class _Entry:
+    """
+    A condition in a `SubexpressionTable`.
+
+    Args:
+        key: The hash-consing key of the condition.
+        matcher: The compiled matcher, which remembers its result for the current record.
+        children: The identifiers of the children of an AND, OR or NOT.
+    """
+
+    __slots__ = ("key", "matcher", "children", "count")
+
+    def __init__(self, key: Hashable, matcher: Matcher, children: Tuple[int, ...]):
+        self.key = key
+        self.matcher = matcher
+        self.children = children
+        # The number of queries and conditions which use this condition
+        self.count = 0
+
+
+def shareable(node: Node) -> bool:
+    """ Return whether a node can be added to a `SubexpressionTable`, which is if it has no bare terms. """
+    if isinstance(node, BareTerm):
+        return False
+
+    if isinstance(node, Not):
+        return shareable(node.child)
+
+    if isinstance(node, (And, Or)):
+        return all(shareable(child) for child in node.children)
+
+    return True
+
+
+class SubexpressionTable:
+    """
+    A table of conditions shared between queries, each of which is evaluated at most once for each record.
+
+    Conditions are added with their children, and removed when no query or condition uses them, so adding and
+    removing a query takes time proportional to its size.
+    """
+
+    def __init__(self) -> None:
+        self._ids: Dict[Hashable, int] = {}
+        self._entries: Dict[int, _Entry] = {}
+        self._next_id = 0
+        self._results = _Results()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, node: Node, short_circuit: bool = True) -> int:
+        """ Add a condition and its children, or use the identical condition if it has already been added.
+
+        Args:
+            node: A node of the intermediate representation, with AND and OR conditions in the order they
+                should be evaluated, see `shareable()`.
+            short_circuit: Whether to terminate matching early inside AND or OR conditions which are added.
+
+        Returns:
+            The identifier of the condition, which is passed to matcher() and remove().
+        """
+        if isinstance(node, (And, Or)):
+            children = tuple(self.add(child, short_circuit) for child in node.children)
+            key: Hashable = (type(node), frozenset(children))
+        elif isinstance(node, Not):
+            children = (self.add(node.child, short_circuit),)
+            key = (Not, children[0])
+        elif isinstance(node, TypedWordTerm):
+            children = ()
+            key = (TypedWordTerm, canonical(node), node.kind)
+        elif isinstance(node, (Term, Const)):
+            children = ()
+            key = (type(node), canonical(node))
+        else:
+            raise ValueError("Cannot share {}".format(type(node).__name__))
+
+        condition_id = self._ids.get(key)
+
+        if condition_id is None:
+            condition_id = self._next_id
+            self._next_id += 1
+
+            if children:
+                # Compiled over the shared children, so each child also remembers its result
+                matchers = tuple(Compiled(self._entries[child].matcher) for child in children)
+                compiled = type(node)(matchers) if isinstance(node, (And, Or)) else Not(matchers[0])
+            else:
+                compiled = node
+
+            matcher = self._remember(condition_id, compile_node(compiled, short_circuit))
+            self._ids[key] = condition_id
+            self._entries[condition_id] = _Entry(key, matcher, children)
+        else:
+            # The existing condition already uses its own children
+            for child in children:
+                self.remove(child)
+
+        self._entries[condition_id].count += 1
+        return condition_id
+
+    def _remember(self, condition_id: int, match: Matcher) -> Matcher:
+        """ Wrap a matcher so that it is evaluated at most once for each record. """
+        results = self._results
+
+        def match_shared(data: object) -> bool:
+            values = results.values
+            found = values.get(condition_id, _UNSET)
+
+            if found is _UNSET:
+                found = values[condition_id] = match(data)
+
+            return found
+
+        return match_shared
+
+    def remove(self, condition_id: int) -> None:
+        """ Remove a use of a condition, and remove the condition and its unused children if it is not used.
+
+        Args:
+            condition_id: The identifier returned by add().
+
+        Raises:
+            KeyError: If there is no condition with this identifier.
+        """
+        pending = [condition_id]
+
+        while pending:
+            entry = self._entries[pending.pop()]
+            entry.count -= 1
+
+            if not entry.count:
+                del self._entries[self._ids.pop(entry.key)]
+                pending.extend(entry.children)
+
+    def matcher(self, condition_id: int) -> Matcher:
+        """ Return the matcher of a condition, which uses the results of the current record, see start().
+
+        Args:
+            condition_id: The identifier returned by add().
+
+        Returns:
+            A function which accepts the data to match and returns True if there is a match, False otherwise.
+        """
+        return self._entries[condition_id].matcher
+
+    def start(self) -> None:
+        """ Start a new record in this thread, forgetting the results of the last one. """
+        self._results.values = {}
+
+    @property
+    def evaluated(self) -> int:
+        """ The number of distinct conditions evaluated since start() was last called in this thread. """
+        return len(self._results.values)
@@ -0,0 +1,114 @@
+"""
+Tests for filtering asynchronous iterables of dictionaries.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from querydict.parser import QueryEngine, MatchException
+from querydict.aio import from_iterable
+
+RECORDS = [{"id": i, "parity": "even" if i % 2 == 0 else "odd"} for i in range(500)]
+
+
+async def collect(aiterator):
+    return [item async for item in aiterator]
+
+
+def test_filter():
+    """ Matches are yielded in the same order as the source """
+    engine = QueryEngine("parity:even")
+    found = asyncio.run(collect(engine.filter_async(from_iterable(RECORDS), batch_size=7)))
+    assert found == [r for r in RECORDS if r["parity"] == "even"]
+
+
+def test_executor():
+    """ Large batches can be matched in an executor """
+    engine = QueryEngine("parity:odd")
+
+    async def run():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            source = from_iterable(RECORDS)
+            return await collect(
+                engine.filter_async(source, batch_size=50, executor=executor, offload_threshold=10)
+            )
+
+    assert asyncio.run(run()) == [r for r in RECORDS if r["parity"] == "odd"]
+
+
+def test_executor_defaults():
+    """ Batches are matched in the executor with the default batch size and threshold """
+    engine = QueryEngine("parity:odd")
+    threads = set()
+    match = engine.match
+
+    def record_thread(data, default_field=None):
+        threads.add(threading.current_thread())
+        return match(data, default_field)
+
+    engine.match = record_thread
+
+    async def run():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            return await collect(engine.filter_async(from_iterable(RECORDS), executor=executor))
+
+    assert asyncio.run(run()) == [r for r in RECORDS if r["parity"] == "odd"]
+    assert threading.main_thread() not in threads
+
+
+def test_threshold_too_large():
+    """ A threshold no batch can reach is an error when an executor is given """
+    engine = QueryEngine("parity:odd")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with pytest.raises(ValueError, match="offload_threshold"):
+            engine.filter_async(from_iterable(RECORDS), batch_size=10, executor=executor, offload_threshold=20)
+
+
+def test_backpressure():
+    """ The source is not read far ahead of a slow consumer """
+    engine = QueryEngine("parity:even")
+    produced = []
+
+    async def source():
+        for record in RECORDS:
+            produced.append(record)
+            yield record
+
+    async def run():
+        results = engine.filter_async(source(), maxsize=10, batch_size=5)
+        first = await results.__anext__()
+        await asyncio.sleep(0.01)
+        await results.aclose()
+        return first
+
+    assert asyncio.run(run()) == RECORDS[0]
+    # The queue, one batch in progress and one record waiting to be queued
+    assert len(produced) <= 10 + 5 + 1
+
+
+def test_source_error():
+    """ Errors from the source are raised after earlier matches """
+    engine = QueryEngine("parity:even")
+
+    async def source():
+        yield RECORDS[0]
+        raise RuntimeError("broken")
+
+    async def run():
+        found = []
+        with pytest.raises(RuntimeError):
+            async for record in engine.filter_async(source()):
+                found.append(record)
+        return found
+
+    assert asyncio.run(run()) == [RECORDS[0]]
+
+
+def test_arguments():
+    """ Invalid arguments are rejected when filter_async is called """
+    with pytest.raises(ValueError):
+        QueryEngine("a:b").filter_async(from_iterable([]), maxsize=0)
+
+    with pytest.raises(MatchException):
+        QueryEngine("foo", allow_bare_field=True).filter_async(from_iterable([]))
@@ -0,0 +1,94 @@
+"""
+Tests for search terms without a field, which are matched against default fields.
+"""
+import pytest
+from querydict.parser import QueryEngine, MatchException
+from querydict.record import RecordView
+
+DATA = {
+    "title": "Disk full",
+    "message": "write failed on /dev/sda1",
+    "tags": ["storage", "urgent"],
+    "host": {"name": "web-01", "ip": "10.0.0.1"},
+    "count": 3,
+}
+
+
+def test_default_field():
+    """ A bare word must equal a string in the default field, a bare phrase must be contained in one """
+    query = QueryEngine('"failed on" AND NOT urgent', allow_bare_field=True)
+    assert query.match(DATA, default_field="message")
+    assert not query.match(DATA, default_field="title")
+    assert not QueryEngine("failed", allow_bare_field=True).match(DATA, default_field="message")
+
+
+def test_default_fields():
+    """ Several default fields can be set on the engine, and default_field overrides them """
+    query = QueryEngine("urgent OR web-01", allow_bare_field=True, default_fields=["tags", "host.name"])
+    assert query.match(DATA)
+    assert query.match({"host": {"name": "web-01"}})
+    assert not query.match({"tags": ["other"]})
+    assert not query.match(DATA, default_field="title")
+
+
+def test_all_fields():
+    """ The default field "*" searches every string in the record, including nested ones """
+    query = QueryEngine('10.0.0.1 AND "sda"', allow_bare_field=True, default_fields=["*"])
+    assert query.match(DATA)
+    assert not query.match({"ip": "10.0.0.1", "message": ["s", "da"]})
+    # Numbers are not strings, so are not searched
+    assert not QueryEngine("3", allow_bare_field=True).match(DATA, default_field="*")
+
+
+def test_casefold():
+    """ Bare terms can match regardless of case, without affecting terms with a field """
+    query = QueryEngine("disk*full OR \"DISK FULL\"", allow_bare_field=True, casefold_bare=True)
+    assert query.match(DATA, default_field="title")
+
+    query = QueryEngine("URGENT AND title:disk", allow_bare_field=True, casefold_bare=True)
+    assert not query.match(DATA, default_field="tags")
+    assert query.match({"tags": ["urgent"], "title": "disk"}, default_field="tags")
+
+
+def test_no_default_field():
+    """ Matching a query with bare terms needs a default field """
+    query = QueryEngine("urgent", allow_bare_field=True)
+
+    with pytest.raises(MatchException):
+        query.match(DATA)
+
+    with pytest.raises(MatchException):
+        list(query.filter_ndjson(iter([])))
+
+
+def test_record_view():
+    """ The strings of the default fields are collected once per match """
+    view = RecordView(DATA, ["tags", "host", "missing"])
+    assert sorted(view.leaves()) == ["10.0.0.1", "storage", "urgent", "web-01"]
+    assert view.leaves() is view.leaves()
+    assert view.words() == {"10.0.0.1", "storage", "urgent", "web-01"}
+    assert view["count"] == 3
+    assert len(view) == len(DATA)
+
+
+def test_field_terms_unchanged():
+    """ Terms with a field, including integer keys, match the wrapped record as before """
+    query = QueryEngine("storage AND host.name:web-01 AND 1:one", allow_bare_field=True)
+    assert query.match({**DATA, 1: "one"}, default_field="tags")
+
+
+def test_filters():
+    """ Default fields are used when filtering and matching columns """
+    np = pytest.importorskip("numpy")
+    query = QueryEngine('urgent OR "sda"', allow_bare_field=True, default_fields=["tags", "message"])
+    records = [DATA, {"tags": ["other"]}, {"message": "sda2 ok"}]
+    assert [query.match(record) for record in records] == [True, False, True]
+
+    columns = {
+        "tags": [record.get("tags") for record in records],
+        "message": np.array([record.get("message", "") for record in records]),
+    }
+    assert query.match_columns(columns).tolist() == [True, False, True]
+    assert QueryEngine("OTHER", allow_bare_field=True, casefold_bare=True).match_columns(
+        columns, default_field="*"
+    ).tolist() == [False, True, False]
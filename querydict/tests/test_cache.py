@@ -0,0 +1,83 @@
+"""
+Tests for the cache of parsed queries used by QueryEngine.from_cache.
+"""
+import threading
+import pytest
+from querydict.parser import QueryEngine, QueryException
+from querydict.cache import QueryCache, query_cache
+
+SIMPLE_DATA = {"key1": "value1", "key2": "value2"}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """ Start each test with an empty process wide cache """
+    query_cache.clear()
+    yield
+    query_cache.clear()
+
+
+def test_from_cache():
+    """ Cached engines match in the same way, and share the parsed query """
+    first = QueryEngine.from_cache("key1:value1 AND key2:value2")
+    second = QueryEngine.from_cache("key1:value1 AND key2:value2", short_circuit=False)
+    assert first.match(SIMPLE_DATA) and second.match(SIMPLE_DATA)
+    assert first._ir is second._ir
+    assert second.short_circuit is False
+
+    info = query_cache.info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+
+def test_key_options():
+    """ Options that change parsing are part of the cache key """
+    assert QueryEngine.from_cache("key1:value1 key2:nope").match(SIMPLE_DATA) is False
+    assert QueryEngine.from_cache("key1:value1 key2:nope", ambiguous_action="OR").match(SIMPLE_DATA)
+    assert query_cache.info().misses == 2
+
+
+def test_errors_not_cached():
+    """ Invalid queries raise every time """
+    for _ in range(2):
+        with pytest.raises(QueryException):
+            QueryEngine.from_cache("foo(:bar)")
+
+    assert query_cache.info().currsize == 0
+
+
+def test_eviction():
+    """ The least recently used entry is evicted when the cache is full """
+    cache = QueryCache(maxsize=2)
+    cache.get("a", lambda: 1)
+    cache.get("b", lambda: 2)
+    cache.get("a", lambda: 0)
+    cache.get("c", lambda: 3)
+    assert cache.get("a", lambda: 0) == 1
+    assert cache.get("b", lambda: 0) == 0
+    assert cache.info() == (2, 4, 2, 2, 2)
+
+    cache.maxsize = 1
+    assert cache.info().currsize == 1
+    assert cache.info().evictions == 3
+
+    with pytest.raises(ValueError):
+        QueryCache(maxsize=0)
+
+
+def test_threads():
+    """ Concurrent use from several threads keeps consistent statistics """
+    cache = QueryCache(maxsize=8)
+
+    def worker():
+        for i in range(1000):
+            cache.get(i % 16, lambda: object())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    info = cache.info()
+    assert info.hits + info.misses == 4000
+    assert info.currsize == 8
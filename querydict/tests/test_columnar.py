@@ -0,0 +1,84 @@
+"""
+Tests for matching columnar data, ensuring results are identical to matching each row.
+"""
+import pytest
+from querydict.parser import QueryEngine, MatchException
+
+np = pytest.importorskip("numpy")
+
+ROWS = [
+    {"name": "John", "eye_colour": "Blue", "info": {"country": "England"}},
+    {"name": "Bob", "eye_colour": "Green", "info": {"country": "Spain"}},
+    {"name": "Alice", "eye_colour": "Blue"},
+    {"name": "Bobby", "info": {"country": "England"}},
+]
+
+COLUMNS = {
+    "name": np.array([row["name"] for row in ROWS]),
+    "eye_colour": [row.get("eye_colour") for row in ROWS],
+    "info.country": [row.get("info", {}).get("country") for row in ROWS],
+}
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "name:Bob",
+        "eye_colour:Blue",
+        "info.country:England AND NOT name:John",
+        "name:Bob OR (eye_colour:Blue AND info.country:England)",
+        'name:"Bob"',
+        'name:"o" AND NOT eye_colour:"Gr"',
+        "missing:value OR name:Alice",
+        "NOT missing:value",
+    ],
+)
+def test_same_as_rows(query):
+    """ Every row gets the same result as match() """
+    engine = QueryEngine(query)
+    expected = [engine.match(row) for row in ROWS]
+    assert engine.match_columns(COLUMNS).tolist() == expected
+
+
+def test_numeric_column():
+    """ Numeric columns never equal a string Word """
+    engine = QueryEngine("count:1 OR name:Bob")
+    mask = engine.match_columns({"count": np.arange(3), "name": ["Bob", "Al", "Bob"]})
+    assert mask.tolist() == [True, False, True]
+
+
+def test_nested_values():
+    """ Lists inside a column are not treated as extra dimensions """
+    engine = QueryEngine('tags:"web"')
+    mask = engine.match_columns({"tags": [["web", "db"], ["db", "cache"]]})
+    assert mask.tolist() == [True, False]
+
+
+@pytest.mark.parametrize(
+    "query, column, options",
+    [
+        ("code:1", [1, "x"], {}),
+        ("code:1", [1, "1", 1.0], {"typed": True}),
+        ('code:"1"', [1, "1"], {"typed": True}),
+        ("code:[1 TO 3]", [2, "x"], {}),
+        ("code:[1 TO 3]", [True, 2, 2.5], {}),
+        ("code:tr*", [True, "true", "x"], {}),
+        ("code:true", [True, 1], {"typed": True}),
+    ],
+)
+def test_mixed_types(query, column, options):
+    """ Lists of values of different types give the same result as match() """
+    engine = QueryEngine(query, **options)
+    expected = [engine.match({"code": value}) for value in column]
+    assert engine.match_columns({"code": column}).tolist() == expected
+
+
+def test_length_mismatch():
+    """ Columns of different lengths raise a MatchException """
+    with pytest.raises(MatchException):
+        QueryEngine("a:b").match_columns({"a": ["b"], "c": ["d", "e"]})
+
+
+def test_empty():
+    """ No columns gives an empty mask """
+    assert QueryEngine("a:b").match_columns({}).tolist() == []
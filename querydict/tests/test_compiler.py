@@ -0,0 +1,106 @@
+"""
+Tests for the query compiler, ensuring the luqum tree is lowered correctly and compiled matchers agree
+with the expected results.
+"""
+import pytest
+from luqum.tree import SearchField, Word
+from querydict.parser import QueryEngine
+from querydict.compiler import And, Or, Not, WordTerm, PhraseTerm, BareTerm, ANY_SEGMENT, split_path
+
+SIMPLE_DATA = {"key1": "value1", "key2": "value2", "key3": "value3"}
+
+
+def test_groups_removed():
+    """ Groups should not appear in the intermediate representation """
+    node = QueryEngine("((key1:value1))")._ir
+    assert isinstance(node, WordTerm)
+    assert (node.field, node.value) == ("key1", "value1")
+
+
+def test_flatten_and():
+    """ Nested AND operations are merged into their parent """
+    node = QueryEngine("key1:value1 AND (key2:value2 AND (key3:value3))")._ir
+    assert isinstance(node, And)
+    assert [child.field for child in node.children] == ["key1", "key2", "key3"]
+
+
+def test_flatten_mixed():
+    """ An OR inside an AND must not be merged """
+    node = QueryEngine("key1:value1 AND (key2:value2 OR key3:value3)")._ir
+    assert isinstance(node, And)
+    assert isinstance(node.children[1], Or)
+
+
+def test_phrase_stripped():
+    """ Phrase literals have their quotes removed once, during lowering """
+    node = QueryEngine('key1:"value 1"')._ir
+    assert isinstance(node, PhraseTerm)
+    assert node.value == "value 1"
+
+
+def test_not_and_bare():
+    """ NOT and bare terms are lowered to their own node types """
+    node = QueryEngine("NOT value1", allow_bare_field=True)._ir
+    assert isinstance(node, Not)
+    assert isinstance(node.child, BareTerm)
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    [
+        ("key1:value1 AND key2:value2 AND key3:value3", True),
+        ("key1:value1 AND key2:value2 AND key3:nope", False),
+        ("key1:nope OR key2:nope OR key3:value3", True),
+        ("key1:nope OR key2:nope OR key3:nope", False),
+        ("key1:value1 AND NOT (key2:nope OR key3:nope)", True),
+        ('key1:"alue" AND key2:"value2"', True),
+    ],
+)
+def test_short_circuit_equivalent(query, expected):
+    """ Results must not depend on whether short circuiting is enabled """
+    assert QueryEngine(query, short_circuit=True).match(SIMPLE_DATA) is expected
+    assert QueryEngine(query, short_circuit=False).match(SIMPLE_DATA) is expected
+
+
+def test_split_path():
+    """ Field names are split once, with numeric segments converted and escaped dots preserved """
+    assert split_path("foo.bar") == (("foo", None), ("bar", None))
+    assert split_path("list.1.item") == (("list", None), ("1", 1), ("item", None))
+    assert split_path("foo\\.bar.baz") == (("foo.bar", None), ("baz", None))
+
+
+def test_split_path_unicode_digits():
+    """ Only ASCII digits are list indexes, other digits such as "²" are keys """
+    assert split_path("a.²") == (("a", None), ("²", None))
+    assert split_path("a.٣") == (("a", None), ("٣", None))
+    assert QueryEngine("a.²:x").match({"a": {"²": "x"}})
+
+
+def test_split_path_any():
+    """ A segment of "*" matches any item, unless it is escaped """
+    assert split_path("procs.*.name") == (("procs", None), ANY_SEGMENT, ("name", None))
+    assert split_path("procs.\\*.name") == (("procs", None), ("*", None), ("name", None))
+    assert split_path("procs.*x") == (("procs", None), ("*x", None))
+
+
+def test_slots():
+    """ Nodes of the intermediate representation do not have a __dict__ """
+    node = QueryEngine("key1:value1 AND NOT (key2:[1 TO 2] OR key3:val* OR value)", allow_bare_field=True)._ir
+    nodes = [node, node.children[1], node.children[1].child] + list(node.children[1].child.children)
+    assert [hasattr(node, "__dict__") for node in nodes] == [False] * 6
+
+
+def test_interned():
+    """ Field names, path keys and literals are shared between queries """
+    first = QueryEngine("".join(["key", "1.a:value", "1"]))._ir
+    second = QueryEngine("key1.a:value1 AND key2:value2")._ir.children[0]
+    assert first.field is second.field
+    assert first.value is second.value
+    assert first.path[0][0] is second.path[0][0]
+
+
+def test_keep_tree():
+    """ The luqum tree is discarded after compiling, unless it is kept """
+    assert QueryEngine("key1:value1").tree is None
+    assert QueryEngine("key1:value1", keep_tree=True).tree == SearchField("key1", Word("value1"))
+    assert QueryEngine.from_cache("key1:value1").tree is None
@@ -0,0 +1,97 @@
+"""
+Tests for explaining the result of matching, and profiling each condition of a query.
+"""
+import json
+import pytest
+from querydict.parser import QueryEngine
+from querydict.explain import Explanation
+
+DATA = {"name": "Bob", "eye_colour": "Brown", "age": 42}
+
+
+def test_explain_result():
+    """ An explanation is true if the query matched, and has the same result as match() """
+    for query in ["name:Bob", "name:Alice", "name:Bob AND NOT age:[40 TO 50]", "name:Alice OR eye_colour:Brown"]:
+        engine = QueryEngine(query)
+        explanation = engine.match(DATA, explain=True)
+        assert isinstance(explanation, Explanation)
+        assert bool(explanation) is engine.match(DATA)
+
+
+def test_explain_decided():
+    """ The conditions which decided the result are marked, and skipped conditions are not included """
+    engine = QueryEngine("name:Bob AND (eye_colour:Blue OR eye_colour:Green)", optimize=False)
+    explanation = engine.match(DATA, explain=True)
+    assert str(explanation) == "\n".join([
+        "[ ] AND",
+        "  [x] name:Bob",
+        "  [ ] OR  <- decided",
+        "    [ ] eye_colour:Blue  <- decided",
+        "    [ ] eye_colour:Green  <- decided",
+    ])
+    assert [repr(term) for term in explanation.decided_by()] == [
+        "Explanation('eye_colour:Blue', False)", "Explanation('eye_colour:Green', False)"
+    ]
+
+    explanation = QueryEngine("name:Alice AND eye_colour:Brown", optimize=False).match(DATA, explain=True)
+    assert [child.matched for child in explanation.children] == [False]
+
+
+def test_explain_no_short_circuit():
+    """ Every condition is included when short circuiting is disabled """
+    engine = QueryEngine("name:Alice AND eye_colour:Brown", short_circuit=False)
+    explanation = engine.match(DATA, explain=True)
+    assert [(child.matched, child.decisive) for child in explanation.children] == [(False, True), (True, False)]
+
+
+def test_explain_dict():
+    """ Explanations can be converted to JSON """
+    explanation = QueryEngine("NOT name:Bob").match(DATA, explain=True)
+    assert json.loads(json.dumps(explanation.to_dict())) == {
+        "node": "NOT",
+        "matched": False,
+        "decisive": True,
+        "children": [{"node": "name:Bob", "matched": True, "decisive": True, "children": []}],
+    }
+
+
+def test_explain_bare():
+    """ Bare terms are explained using the default field """
+    engine = QueryEngine("Bob", allow_bare_field=True)
+    assert engine.match(DATA, default_field="name", explain=True)
+
+
+def test_profile():
+    """ Evaluations, matches and time are counted for each condition """
+    engine = QueryEngine("name:Bob AND (eye_colour:Blue OR eye_colour:Brown)", profile=True, optimize=False)
+    assert engine.match(DATA)
+    assert not engine.match({"name": "Alice"})
+
+    counts = [(stats.depth, stats.evaluations, stats.matches, stats.failures) for stats in engine.stats]
+    assert counts == [(0, 2, 1, 1), (1, 2, 1, 1), (1, 1, 1, 0), (2, 1, 0, 1), (2, 1, 1, 0)]
+    assert all(stats.time > 0 for stats in engine.stats)
+    assert "eye_colour:Brown" in str(engine.stats)
+
+    engine.stats.reset()
+    assert sum(stats.evaluations for stats in engine.stats) == 0
+
+
+def test_profile_disabled():
+    """ Queries are not profiled by default """
+    assert QueryEngine("name:Bob").stats is None
+    assert QueryEngine.from_cache("name:Bob", profile=True).stats is not None
+
+
+@pytest.mark.parametrize("short_circuit", [True, False])
+def test_profile_equivalent(short_circuit):
+    """ Profiled queries have the same results, and count every evaluated condition """
+    query = "name:Bob AND NOT (age:[0 TO 18] OR eye_colour:Blue)"
+    engine = QueryEngine(query, short_circuit=short_circuit, profile=True)
+    records = [DATA, {"name": "Bob", "age": 10}, {"name": "Alice"}]
+    assert [engine.match(record) for record in records] == [
+        QueryEngine(query).match(record) for record in records
+    ]
+    assert engine.stats.nodes[0].evaluations == 3
+
+    if not short_circuit:
+        assert all(stats.evaluations == 3 for stats in engine.stats)
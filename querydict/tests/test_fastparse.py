@@ -0,0 +1,112 @@
+"""
+Tests for parsing common queries without luqum's parser.
+"""
+import os
+import subprocess
+import sys
+from unittest import mock
+import pytest
+from luqum.parser import parser as luqum_parser
+import querydict
+from querydict import parser
+from querydict.fastparse import parse, tokenize
+from querydict.parser import QueryEngine, QueryException
+
+FAST_QUERIES = [
+    "name:Bob",
+    'name:Bob AND NOT (eye_colour:Blue OR message:"not found")',
+    "a:b OR c:d AND e:f",
+    "a:b OR c:d OR e:f AND g:h AND i:j",
+    "NOT NOT a:b",
+    "((a:b))",
+    "  a : b  ",
+    "a\\:b:c\\ d",
+    "f\\.g:1",
+    "date:2020-01-01T10:00:00",
+    "a:b* AND c:?d",
+    'a:"x \\" y"',
+    "a:b\"c\"",
+    "x:a&&b",
+    "é:ü",
+    "bare",
+    '"bare phrase" OR name:Bob',
+]
+
+LUQUM_QUERIES = ["a:b c:d", "a:[1 TO 2]", "a:b~", "a:/b.*/", "a:TO"]
+
+# Parsed by luqum, but not supported by QueryEngine
+UNSUPPORTED_QUERIES = ["a:>5", "a:b^2", "a:(b OR c)", "-a:b", "+a:b", "a:b:c", "TO:x"]
+
+INVALID_QUERIES = ["a:", "a OR", "(a:b", "a:b)", "a:b AND NOT", 'a:"b']
+
+
+@pytest.mark.parametrize("query", FAST_QUERIES)
+def test_fast_conformance(query):
+    """ The fast parser produces the same tree as luqum """
+    tree = parse(query)
+    assert tree is not None
+    assert tree == luqum_parser.parse(query)
+    assert repr(tree) == repr(luqum_parser.parse(query))
+
+
+@pytest.mark.parametrize("query", FAST_QUERIES + LUQUM_QUERIES)
+def test_same_query(query):
+    """ Queries are lowered to the same intermediate representation with either parser """
+    fast = QueryEngine(query, allow_bare_field=True)
+
+    with mock.patch.object(parser, "fast_parse", lambda query: None):
+        slow = QueryEngine(query, allow_bare_field=True)
+
+    assert repr(fast._ir) == repr(slow._ir)
+
+
+@pytest.mark.parametrize("query", LUQUM_QUERIES + UNSUPPORTED_QUERIES + INVALID_QUERIES)
+def test_fallback(query):
+    """ Anything outside the supported subset, including invalid queries, is left to luqum """
+    assert parse(query) is None
+
+
+@pytest.mark.parametrize("query", INVALID_QUERIES)
+def test_invalid(query):
+    """ Invalid queries report luqum's error """
+    with pytest.raises(QueryException, match="Could not parse the query"):
+        QueryEngine(query)
+
+
+def test_ambiguous_exception():
+    """ Implicit operators are parsed by luqum, so ambiguous_action still applies """
+    with pytest.raises(QueryException, match="ambiguous"):
+        QueryEngine("a:b c:d", ambiguous_action="Exception")
+
+    assert QueryEngine("a:b c:d", ambiguous_action="OR").match({"c": "d"})
+
+
+def test_nesting():
+    """ Deeply nested queries are left to luqum """
+    query = "NOT " * 100 + "a:b"
+    assert parse(query) is None
+    assert QueryEngine(query, max_depth=200).match({"a": "b"})
+
+
+def test_tokenize():
+    """ Operators are only recognised in upper case """
+    assert tokenize('a:b AND (c OR "d")') == [
+        ("term", "a"), ("column", ":"), ("term", "b"), ("AND", "AND"), ("lparen", "("), ("term", "c"),
+        ("OR", "OR"), ("phrase", '"d"'), ("rparen", ")"),
+    ]
+    assert tokenize("a and b")[1] == ("term", "and")
+    assert tokenize("a:[1 TO 2]") is None
+
+
+@pytest.mark.parametrize("query, imported", [("a:b AND NOT c:\"d e\"", False), ("a:[1 TO 2]", True)])
+def test_import_lazy(query, imported):
+    """ luqum's parser and PLY are only imported for queries the fast parser does not support """
+    code = (
+        "import sys\n"
+        "from querydict.parser import QueryEngine\n"
+        "QueryEngine({!r})\n"
+        "print('luqum.parser' in sys.modules, 'ply' in sys.modules)\n"
+    ).format(query)
+    root = os.path.dirname(os.path.dirname(querydict.__file__))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=root)
+    assert result.stdout.split() == [str(imported)] * 2
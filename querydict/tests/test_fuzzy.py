@@ -0,0 +1,101 @@
+"""
+Tests for fuzzy searches, and the bounded edit distance used to match them.
+"""
+import random
+import pytest
+from querydict.fuzzy import bounded_distance, fuzzy_matcher
+from querydict.parser import QueryEngine, QueryException
+from querydict.percolator import QuerySet
+
+
+def levenshtein(source, target):
+    """ The full dynamic programming algorithm, used as a reference """
+    previous = list(range(len(target) + 1))
+
+    for row, char in enumerate(source, 1):
+        current = [row]
+        for column, other in enumerate(target, 1):
+            current.append(
+                min(previous[column - 1] + (char != other), previous[column] + 1, current[column - 1] + 1)
+            )
+        previous = current
+
+    return previous[-1]
+
+
+def test_bounded_distance():
+    """ The bounded distance is exact up to the limit, and limit + 1 beyond it """
+    rng = random.Random(1)
+
+    for _ in range(5000):
+        source = "".join(rng.choice("abc") for _ in range(rng.randrange(10)))
+        target = "".join(rng.choice("abc") for _ in range(rng.randrange(10)))
+        limit = rng.randrange(4)
+        distance = levenshtein(source, target)
+        assert bounded_distance(source, target, limit) == min(distance, limit + 1)
+
+
+def test_bounded_distance_examples():
+    """ Length differences are rejected, and shared prefixes and suffixes are ignored """
+    assert bounded_distance("kitten", "sitting", 3) == 3
+    assert bounded_distance("kitten", "sitting", 2) == 3
+    assert bounded_distance("a", "abcdef", 2) == 3
+    assert bounded_distance("prefix-a-suffix", "prefix-b-suffix", 1) == 1
+    assert bounded_distance("same", "same", 0) == 0
+
+
+@pytest.mark.parametrize(
+    "query, value, expected",
+    [
+        ("domain:microsoft~1", "microsoft", True),
+        ("domain:microsoft~1", "micosoft", True),
+        ("domain:microsoft~1", "mircosoft", False),
+        ("domain:microsoft~2", "mircosoft", True),
+        ("domain:microsoft~0.8", "micros0ft", True),
+        ("domain:microsoft~0.8", "micr0s0ft", False),
+        ("domain:microsoft~", "macros0ft", True),
+        ("domain:microsoft~1", "Microsoft", True),
+        ("domain:microsoft~1", "MICROSOFT", False),
+        ("domain:microsoft~0", "micosoft", False),
+    ],
+)
+def test_fuzzy(query, value, expected):
+    """ A whole number degree is a number of edits, a fraction is a similarity """
+    assert QueryEngine(query).match({"domain": value}) is expected
+
+
+def test_not_string():
+    """ Fuzzy searches only match strings """
+    query = QueryEngine("count:10~1")
+    assert not query.match({"count": 10})
+    assert not query.match({"count": None})
+    assert not query.match({})
+    assert query.match({"count": "11"})
+
+
+def test_invalid():
+    """ Fuzzy searches need a field, and a degree that is whole or below 1 """
+    with pytest.raises(QueryException):
+        QueryEngine("microsoft~1")
+
+    with pytest.raises(QueryException):
+        QueryEngine("domain:microsoft~1.5")
+
+
+def test_canonical():
+    """ The canonical form uses the number of edits """
+    assert QueryEngine("domain:microsoft~0.8").canonical == "domain:microsoft~1"
+    assert QueryEngine("domain:microsoft~1 AND domain:microsoft~0.8").canonical == "domain:microsoft~1"
+
+
+def test_shared():
+    """ Queries with the same fuzzy term share a matcher, and so share recent results """
+    rules = QuerySet()
+    rules.add(1, "domain:macrohard~1")
+    rules.add(2, "domain:macrohard~1 AND NOT tld:com")
+    rules.add(3, "domain:macrohard~2")
+
+    matcher = fuzzy_matcher("macrohard", 1)
+    assert rules.match({"domain": "macohard", "tld": "org"}) == [1, 2, 3]
+    assert matcher._memo == {"macohard": True}
+    assert fuzzy_matcher("macrohard", 1) is matcher
@@ -0,0 +1,117 @@
+"""
+Tests for matching raw JSON while decoding only the members a query uses.
+"""
+import json
+import pytest
+from querydict import lazyjson
+from querydict.lazyjson import extract, member_names, field_names
+from querydict.parser import QueryEngine
+
+RECORD = {
+    "event": "login",
+    "user": {"name": "Bob", "roles": ["admin", "dev"]},
+    "payload": {"event": "logout", "items": [{"user": "Alice"}, "not a \"string\""]},
+    "count": 12,
+    "message": "café\nwith \"quotes\" and \\ backslash",
+}
+
+# Decoded in full, as a string contains brackets
+BRACKETS_RECORD = dict(RECORD, payload={"event": "logout", "items": [{"user": "Alice"}, "[not] {a}"]})
+
+
+@pytest.fixture(autouse=True)
+def search_short_records(monkeypatch):
+    """ Search the short records used by these tests, rather than decoding them in full """
+    monkeypatch.setattr(lazyjson, "MIN_SEARCH_LENGTH", 0)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "event:login",
+        "event:logout",
+        "user.name:Bob AND user.roles.*:admin",
+        "user.roles.1:dev",
+        "count:[10 TO 20] AND NOT missing:*",
+        'message:"with \\"quotes\\""',
+        "message:caf*",
+        "payload.items.0.user:Alice",
+        "*.name:Bob",
+    ],
+)
+@pytest.mark.parametrize("record", [RECORD, BRACKETS_RECORD])
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_match_json(query, record, ensure_ascii, indent):
+    """ Matching raw JSON gives the same result as matching the decoded record """
+    engine = QueryEngine(query)
+    raw = json.dumps(record, ensure_ascii=ensure_ascii, indent=indent)
+    assert engine.match_json(raw.encode("utf-8")) == engine.match(json.loads(raw))
+    assert engine.match_json(raw) == engine.match(json.loads(raw))
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ('{"event": "logout", "user": {"event": "login"}}', {"event": "logout"}),
+        ('{"user": {"event": "logout"}, "event": "login"}', {"event": "login"}),
+        ('{"event": "logout", "event": "login"}', {"event": "login"}),
+        ('{"other": "event", "list": ["event", {"event": 1}]}', {}),
+        ('{"event" : [1, {"a": "b"}], "x": "\\"event\\": 2"}', {"event": [1, {"a": "b"}]}),
+        (' \n{"event":"login"}', {"event": "login"}),
+    ],
+)
+def test_extract(raw, expected):
+    """ Only members directly inside the outer object are found, and the last member with a name wins """
+    assert extract(raw, frozenset(["event"])) == expected
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        '{"message": "[", "event": "login"}',
+        '{"ev\\u0065nt": "login"}',
+        '[{"event": "login"}]',
+        '"event"',
+    ],
+)
+def test_extract_fallback(raw):
+    """ Text which cannot be searched reliably is decoded in full """
+    assert extract(raw, frozenset(["event"])) is None
+    assert QueryEngine("event:login").match_json(raw) == QueryEngine("event:login").match(json.loads(raw))
+
+
+def test_member_names():
+    """ The first part of each field is used, unless the whole record is needed """
+    assert member_names(QueryEngine("a.b:1 AND NOT (c:2 OR d.*.e:3) AND f\\.g:4")._ir) == {"a", "c", "d", "f.g"}
+    assert member_names(QueryEngine("*.b:1")._ir) is None
+    assert field_names(["a.b", "c"]) == {"a", "c"}
+    assert field_names(["*"]) is None
+    assert field_names(["a,b"]) is None
+
+
+def test_match_json_bare():
+    """ Bare terms decode the default fields, or the whole record for "*" """
+    raw = json.dumps(RECORD)
+    assert QueryEngine("Bob", allow_bare_field=True, default_fields=["user.name"]).match_json(raw)
+    assert not QueryEngine("Bob", allow_bare_field=True, default_fields=["event"]).match_json(raw)
+    assert QueryEngine("event:login AND Alice", allow_bare_field=True).match_json(raw, default_field="payload")
+    assert QueryEngine("Alice", allow_bare_field=True).match_json(raw, default_field="*")
+
+
+def test_match_json_short(monkeypatch):
+    """ Short records are decoded in full, so errors outside the members used are only found in short records """
+    monkeypatch.setattr(lazyjson, "MIN_SEARCH_LENGTH", 100)
+    engine = QueryEngine("event:login")
+    assert engine.match_json('{"event": "login", "other": ' + "1" * 100 + "}")
+
+    with pytest.raises(json.JSONDecodeError):
+        engine.match_json('{"event": "login", "other": invalid}')
+
+    assert engine.match_json('{"event": "login", "other": invalid, "padding": "' + "x" * 100 + '"}')
+
+
+def test_match_json_invalid():
+    """ Invalid JSON in a member which is used raises an error """
+    with pytest.raises(json.JSONDecodeError):
+        QueryEngine("event:login").match_json(b'{"event": login}')
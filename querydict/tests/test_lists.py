@@ -0,0 +1,112 @@
+"""
+Tests for fields containing "*", which match any item of a list or value of a dictionary.
+"""
+import io
+import json
+import pytest
+from querydict.parser import QueryEngine
+from querydict.percolator import QuerySet
+
+EVENT = {
+    "host": "web-01",
+    "procs": [
+        {"name": "explorer.exe", "pid": 10, "args": ["n"]},
+        {"name": "cmd.exe", "pid": 20, "args": ["/c", "whoami"]},
+    ],
+    "conns": {"tcp": {"port": 443}, "udp": {"port": 53}},
+}
+
+
+class CountingList(list):
+    """ A list which counts how many items have been iterated over """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.visited = 0
+
+    def __iter__(self):
+        for item in super().__iter__():
+            self.visited += 1
+            yield item
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("procs.*.name:cmd.exe", True),
+        ("procs.*.name:powershell.exe", False),
+        ("procs.*.name:cmd*", True),
+        ('procs.*.name:"plorer"', True),
+        ("procs.*.pid:[15 TO 25]", True),
+        ("procs.*.pid:[30 TO *]", False),
+        ("procs.*.args.*:whoami", True),
+        ("procs.*.args.1:whoami", True),
+        ("procs.1.args.*:n", False),
+        ("conns.*.port:53", False),
+        ("conns.*.port:[50 TO 60]", True),
+        ("procs.*.missing:cmd.exe", False),
+        ("host.*:web-01", False),
+        ("procs.\\*.name:cmd.exe", False),
+    ],
+)
+def test_any_item(query, expected):
+    """ A term with "*" matches if any item found matches """
+    assert QueryEngine(query).match(EVENT) is expected
+
+
+def test_escaped_any():
+    """ An escaped "*" is a key """
+    assert QueryEngine("procs.\\*.name:cmd.exe").match({"procs": {"*": {"name": "cmd.exe"}}})
+
+
+def test_not():
+    """ NOT over a field with "*" matches if no item matches, including when there are no items """
+    query = QueryEngine("NOT procs.*.name:cmd.exe")
+    assert not query.match(EVENT)
+    assert query.match({"procs": [{"name": "explorer.exe"}]})
+    assert query.match({"procs": []})
+    assert query.match({})
+
+
+def test_terms_independent():
+    """ Each term finds its own item, so two terms in an AND may match different items """
+    assert QueryEngine("procs.*.name:cmd.exe AND procs.*.pid:[10 TO 10]").match(EVENT)
+    assert QueryEngine("procs.*.name:cmd.exe AND procs.*.name:explorer.exe").match(EVENT)
+
+
+def test_stops_at_first_match():
+    """ Items after the first match are not visited """
+    procs = CountingList({"name": "proc{}".format(number)} for number in range(100))
+    assert QueryEngine("procs.*.name:proc2").match({"procs": procs})
+    assert procs.visited == 3
+
+
+def test_filters():
+    """ Fields with "*" are supported when filtering, matching many queries and matching columns """
+    records = [EVENT, {"procs": [{"name": "explorer.exe"}]}]
+    lines = io.BytesIO(b"".join(json.dumps(record).encode() + b"\n" for record in records))
+    assert list(QueryEngine("procs.*.name:cmd.exe").filter_ndjson(lines)) == [EVENT]
+
+    rules = QuerySet()
+    rules.add("cmd", "procs.*.name:cmd.exe")
+    rules.add("port", "conns.*.port:[50 TO 60]")
+    rules.add("phrase", 'procs.*.args.*:"who"')
+    assert rules.candidates(EVENT) == {"cmd", "port", "phrase"}
+    assert rules.match(EVENT) == ["cmd", "port", "phrase"]
+    assert rules.candidates(records[1]) == set()
+
+    pytest.importorskip("numpy")
+    columns = {"procs": [record["procs"] for record in records]}
+    assert QueryEngine("procs.*.name:cmd.exe").match_columns(columns).tolist() == [True, False]
+
+
+def test_default_fields():
+    """ Default fields for bare terms can contain "*" """
+    query = QueryEngine("whoami", allow_bare_field=True, default_fields=["procs.*.args"])
+    assert query.match(EVENT)
+    assert not query.match(EVENT, default_field="procs.*.name")
+
+
+def test_no_contradiction():
+    """ Two values for a field with "*" are not a contradiction """
+    assert QueryEngine("procs.*.name:a AND procs.*.name:b").canonical != "NOT *:*"
@@ -85,3 +85,35 @@ def test_default_field():
     """ Test that matching an unnamed field without passing the default key raises MatchException """
     with pytest.raises(MatchException):
         QueryEngine("foo", allow_bare_field=True).match(SIMPLE_DATA)
+
+
+def test_list_index():
+    """ Numeric path segments index into lists """
+    data = {"list": [{"item": "cat"}, {"item": "dog"}]}
+    assert QueryEngine("list.1.item:dog").match(data)
+    assert QueryEngine("list.0.item:dog").match(data) is False
+
+
+def test_list_index_missing():
+    """ An index past the end of a list is treated as a missing field """
+    data = {"list": [{"item": "cat"}]}
+    assert QueryEngine("list.5.item:cat").match(data) is False
+    assert QueryEngine("list.item:cat").match(data) is False
+
+
+def test_missing_intermediate():
+    """ Paths through values that are not containers do not raise an exception """
+    data = {"foo": None, "bar": "baz"}
+    assert QueryEngine("foo.bar:baz").match(data) is False
+    assert QueryEngine('bar.baz:"b"').match(data) is False
+
+
+def test_integer_key():
+    """ Dictionaries with integer keys can be matched """
+    assert QueryEngine("foo.1:bar").match({"foo": {1: "bar"}})
+
+
+def test_phrase_wrong_type():
+    """ A Phrase does not match values that cannot contain it, rather than raising an exception """
+    assert QueryEngine('key1:"1"').match({"key1": 1}) is False
+    assert QueryEngine('key1:"a"').match({"key1": ["a", "b"]}) is True
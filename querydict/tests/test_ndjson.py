@@ -0,0 +1,83 @@
+"""
+Tests for filtering newline delimited JSON, including the raw text prefilter and command line interface.
+"""
+import io
+import json
+import pytest
+from querydict.__main__ import main
+from querydict.parser import QueryEngine, MatchException
+from querydict.ndjson import required_literals, iter_lines
+
+RECORDS = [
+    {"name": "John", "eye_colour": "Blue", "info": {"country": "England"}},
+    {"name": "Bob", "eye_colour": "Green", "info": {"country": "Spain"}},
+    {"name": "Alice", "eye_colour": "Blue", "note": "http://example.com/"},
+    {"name": "Bobby", "info": {"country": "Engländ"}},
+]
+LINES = b"\n".join(json.dumps(record).encode("ascii") for record in RECORDS) + b"\n\n"
+
+
+def test_required_literals():
+    """ Literals come from field keys and values, and are skipped when they could be escaped """
+    assert required_literals(QueryEngine("name:Bob")._ir) == [{b'"Bob"'}, {b'"name"'}]
+    assert required_literals(QueryEngine('info.country:"Eng"')._ir) == [{b"Eng"}, {b'"country"'}]
+    assert required_literals(QueryEngine("a:b OR c:d")._ir) == [{b'"b"', b'"d"'}]
+    assert required_literals(QueryEngine("a:b OR NOT c:d")._ir) == []
+    assert required_literals(QueryEngine('note:"http://"')._ir) == [{b'"note"'}]
+    assert required_literals(QueryEngine("list.1:xä")._ir) == []
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "name:Bob",
+        "eye_colour:Blue AND NOT name:John",
+        'info.country:"Engl"',
+        "info.country:Engländ",
+        'note:"http://example"',
+        "name:Alice OR info.country:Spain",
+        "NOT name:Bob",
+    ],
+)
+def test_same_as_match(query):
+    """ Filtering gives the same records as matching each one, with or without the prefilter """
+    engine = QueryEngine(query)
+    expected = [record for record in RECORDS if engine.match(record)]
+    assert list(engine.filter_ndjson(io.BytesIO(LINES))) == expected
+    assert list(engine.filter_ndjson(io.BytesIO(LINES), prefilter=False)) == expected
+
+
+def test_path_and_raw(tmp_path):
+    """ Paths are opened and closed, and raw lines can be returned """
+    path = tmp_path / "records.jsonl"
+    path.write_bytes(LINES)
+    assert list(QueryEngine("name:Bob").filter_ndjson(str(path), raw=True)) == [
+        json.dumps(RECORDS[1]).encode("ascii")
+    ]
+
+
+def test_iter_lines():
+    """ Lines split across chunks are joined, and a final line without a newline is returned """
+    assert list(iter_lines(io.BytesIO(b"abc\ndefgh\nij"), chunk_size=4)) == [b"abc", b"defgh", b"ij"]
+
+
+def test_default_field():
+    """ Bare fields need a default field before the input is read """
+    with pytest.raises(MatchException):
+        QueryEngine("foo", allow_bare_field=True).filter_ndjson(io.BytesIO(LINES))
+
+
+def test_cli(tmp_path, capsysbinary):
+    """ The command line prints matching lines and returns a grep style exit status """
+    path = tmp_path / "records.jsonl"
+    path.write_bytes(LINES)
+
+    assert main(["eye_colour:Blue", str(path)]) == 0
+    out = capsysbinary.readouterr().out
+    assert [json.loads(line) for line in out.splitlines()] == [RECORDS[0], RECORDS[2]]
+
+    assert main(["--count", "eye_colour:Blue", str(path), str(path)]) == 0
+    assert capsysbinary.readouterr().out == b"4\n"
+
+    assert main(["name:Nobody", str(path)]) == 1
+    assert main(["foo(:bar)", str(path)]) == 2
@@ -0,0 +1,137 @@
+"""
+Tests for normalising queries, ensuring redundancy is removed without changing results.
+"""
+import itertools
+import pytest
+from luqum.tree import AndOperation, Group, SearchField, Not as LNot
+from querydict.parser import QueryEngine
+from querydict.percolator import QuerySet
+from querydict.compiler import And, Or, Not, Const, WordTerm
+
+
+def ir(query):
+    """ Return the normalised intermediate representation of a query """
+    return QueryEngine(query)._ir
+
+
+def test_double_negation():
+    """ NOT NOT x is x """
+    node = ir("NOT (NOT a:x)")
+    assert isinstance(node, WordTerm)
+    assert isinstance(ir("NOT NOT NOT a:x"), Not)
+
+
+def test_duplicates():
+    """ Duplicate children are removed, including duplicates that only differ in grouping or order """
+    node = ir("a:x OR (a:x) OR b:y OR (b:y OR a:x)")
+    assert isinstance(node, Or)
+    assert [child.field for child in node.children] == ["a", "b"]
+
+    node = ir("(a:x AND b:y) OR (b:y AND a:x)")
+    assert isinstance(node, And)
+
+
+def test_single_child():
+    """ An operation left with one child is replaced by the child """
+    assert isinstance(ir("a:x AND a:x"), WordTerm)
+
+
+def test_contradiction():
+    """ A field cannot equal two different Words, and a term cannot match alongside its negation """
+    assert isinstance(ir("key1:value1 AND key1:value2"), Const)
+    assert isinstance(ir("a:x AND b:y AND NOT a:x"), Const)
+    assert ir("(a:x AND a:y) OR b:z").field == "b"
+    assert isinstance(ir('a:x AND a:"y"'), And)
+
+
+def test_tautology():
+    """ A term OR its negation always matches """
+    node = ir("a:x OR NOT a:x")
+    assert isinstance(node, Const) and node.value is True
+    node = ir("NOT (a:x OR NOT a:x)")
+    assert isinstance(node, Const) and node.value is False
+    assert QueryEngine("a:x OR NOT a:x").match({}) is True
+
+
+def test_canonical():
+    """ Equivalent queries have the same canonical form """
+    first = QueryEngine("b:y AND (a:x OR c:\"z\") AND b:y")
+    second = QueryEngine("((c:\"z\" OR a:x)) AND b:y")
+    assert first.canonical == second.canonical == '(a:x OR c:"z") AND b:y'
+    assert QueryEngine("a:x AND a:y").canonical == "NOT *:*"
+    assert QueryEngine("NOT NOT a:x").canonical == "a:x"
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("a:x OR NOT a:x", "*:*"),
+        ("a:x AND a:y", "NOT *:*"),
+        ("b:y AND (a:x OR c:z)", "(c:z OR a:x) AND b:y AND b:y"),
+    ],
+)
+def test_canonical_same_results(first, second):
+    """ Queries with the same canonical form match the same records """
+    records = [{}, {"a": 1}, {"a": "x"}, {"a": "x", "b": "y"}, {"b": "y", "c": "z"}, {"other": "text"}]
+    first, second = QueryEngine(first), QueryEngine(second)
+    assert first.canonical == second.canonical
+    assert [first.match(record) for record in records] == [second.match(record) for record in records]
+
+
+def test_match_all():
+    """ "*:*" matches every record, as in Lucene, in a QuerySet and on its own """
+    assert QueryEngine("*:*").match({})
+    assert not QueryEngine("NOT *:*").match({"a": "x"})
+    assert QueryEngine("*:* AND a:x").canonical == "a:x"
+
+    rules = QuerySet()
+    rules.add("all", "*:*")
+    assert rules.match({}) == ["all"]
+
+
+def test_canonical_escaped():
+    """ Words containing Lucene syntax are never written the same as a fuzzy search, range or pattern """
+    assert QueryEngine(r"a:x\~1").canonical == r"a:x\~1"
+    assert QueryEngine(r"a:x\~1").canonical != QueryEngine("a:x~1").canonical
+    assert QueryEngine(r"a:\[1\ TO\ 2\]").canonical != QueryEngine("a:[1 TO 2]").canonical
+    assert QueryEngine(r"a\:b", allow_bare_field=True).canonical != QueryEngine("a:b").canonical
+
+    for query in [r"a:x\~1", r"a:\[1\ TO\ 2\]", r"a:\/x\/", r"a:b\:c\-d\ e"]:
+        engine = QueryEngine(query)
+        assert QueryEngine(engine.canonical)._ir.value == engine._ir.value
+
+
+def test_escaped_not_duplicates():
+    """ A Word which looks like a fuzzy search is not removed as a duplicate or negation of it """
+    assert QueryEngine(r"a:x~1 AND NOT a:x\~1").match({"a": "y"})
+    assert QueryEngine(r"a:x\~1 OR a:x~1").match({"a": "y"})
+    assert QueryEngine(r"a:x\~1 OR a:x~1").match({"a": "x~1"})
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "a:x AND (b:y AND (a:x OR c:z))",
+        "NOT (NOT (a:x OR a:x)) AND NOT b:z",
+        "(a:x AND a:y) OR (b:y AND NOT (c:z OR NOT c:z))",
+        "a:x OR (b:y AND a:x) OR NOT (NOT c:z)",
+    ],
+)
+def test_same_results(query):
+    """ Normalising never changes the result of matching """
+    normalised = QueryEngine(query, keep_tree=True)
+    for values in itertools.product(["x", "y", "z", None], repeat=3):
+        record = {k: v for k, v in zip("abc", values) if v is not None}
+        assert normalised.match(record) is bool(_interpret(normalised.tree, record))
+
+
+def _interpret(tree, record):
+    """ Evaluate a luqum tree directly, as a reference """
+    if isinstance(tree, SearchField):
+        return record.get(tree.name) == tree.children[0].value
+    if isinstance(tree, Group):
+        return _interpret(tree.children[0], record)
+    if isinstance(tree, LNot):
+        return not _interpret(tree.children[0], record)
+    results = [_interpret(child, record) for child in tree.children]
+    return all(results) if isinstance(tree, AndOperation) else any(results)
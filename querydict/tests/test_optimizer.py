@@ -0,0 +1,80 @@
+"""
+Tests for reordering AND and OR conditions, ensuring results never change.
+"""
+import itertools
+import pytest
+from querydict.parser import QueryEngine
+from querydict.compiler import And, Or, Not, WordTerm, PhraseTerm
+from querydict.optimizer import reorder, estimate, compile_adaptive, AdaptiveOperation
+
+QUERIES = [
+    'a.b.c:x AND b:y AND NOT c:z AND d:"w"',
+    'a:x OR b.c.d:"y" OR (c:z AND d:w)',
+    "NOT (a:x AND b:y) OR (c:z AND NOT d:w)",
+    '(a:x OR b:y) AND (c:"z" OR d:w) AND NOT (a:y OR c:x)',
+]
+
+# Every combination of present, absent and wrong type for each field
+RECORDS = [
+    {k: v for k, v in zip("abcd", values) if v is not None}
+    for values in itertools.product(["x", "y", None], ["y", 1, None], ["z", "x", None], ["w", "xwx", None])
+]
+for record in RECORDS[::3]:
+    record["a"] = {"b": {"c": "x"}}
+    record["b"] = {"c": {"d": "zyz"}}
+
+
+def test_order_and():
+    """ Exact shallow comparisons come before phrases, deep fields and NOT """
+    node = reorder(QueryEngine('NOT a:x AND b:"y" AND c.d.e:z AND f:w')._ir)
+    assert isinstance(node, And)
+    assert [type(child) for child in node.children] == [WordTerm, WordTerm, PhraseTerm, Not]
+    assert [child.field for child in node.children[:2]] == ["f", "c.d.e"]
+
+
+def test_order_or():
+    """ In an OR, a NOT is likely to match so is moved first """
+    node = reorder(QueryEngine('a:"x" OR NOT b:y')._ir)
+    assert isinstance(node, Or)
+    assert isinstance(node.children[0], Not)
+
+
+def test_not_modified():
+    """ Reordering returns a new tree, leaving the original alone """
+    engine = QueryEngine("NOT a:x AND b:y")
+    assert isinstance(engine._ir.children[0], Not)
+
+
+def test_estimate():
+    """ An AND is less likely to match than its children, an OR is more likely """
+    and_cost, and_p = estimate(QueryEngine("a:x AND b:y")._ir)
+    or_cost, or_p = estimate(QueryEngine("a:x OR b:y")._ir)
+    assert and_p < 0.1 < or_p
+    assert 1 < and_cost < 2 and 1 < or_cost < 2
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_same_results(query):
+    """ Static and adaptive ordering give the same result as the order written """
+    plain = QueryEngine(query, optimize=False)
+    static = QueryEngine(query)
+    adaptive = QueryEngine(query, adaptive=True)
+    unshort = QueryEngine(query, short_circuit=False)
+
+    for record in RECORDS * 50:
+        expected = plain.match(record)
+        assert static.match(record) is expected
+        assert adaptive.match(record) is expected
+        assert unshort.match(record) is expected
+
+
+def test_adaptive_reorders():
+    """ A condition that always fails is moved to the front of an AND """
+    match = compile_adaptive(QueryEngine("a:x AND b:y")._ir, interval=10)
+    assert isinstance(match, AdaptiveOperation)
+    assert match.order[0].field == "a"
+
+    for _ in range(100):
+        assert match({"a": "x", "b": "nope"}) is False
+
+    assert match.order[0].field == "b"
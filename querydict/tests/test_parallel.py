@@ -0,0 +1,45 @@
+"""
+Tests for filtering dictionaries using a pool of worker processes.
+"""
+import pytest
+from querydict.parser import QueryEngine, MatchException
+
+RECORDS = [{"id": i, "parity": "even" if i % 2 == 0 else "odd", "name": "n{}".format(i % 7)} for i in range(2000)]
+
+
+def test_ordered():
+    """ Ordered results are identical to filtering in a single process """
+    engine = QueryEngine("parity:even AND NOT name:n3")
+    expected = [r for r in RECORDS if engine.match(r)]
+    assert list(engine.filter_parallel(iter(RECORDS), workers=2, chunksize=97)) == expected
+
+
+def test_unordered():
+    """ Unordered results contain the same records """
+    engine = QueryEngine("parity:odd OR name:n0", adaptive=True)
+    expected = [r for r in RECORDS if engine.match(r)]
+    found = list(engine.filter_parallel(RECORDS, workers=3, chunksize=50, ordered=False))
+    assert sorted(found, key=lambda r: r["id"]) == expected
+
+
+def test_early_exit():
+    """ Stopping early does not wait for the whole input """
+    engine = QueryEngine("parity:even")
+    records = ({"parity": "even", "id": i} for i in range(10 ** 9))
+    iterator = engine.filter_parallel(records, workers=2, chunksize=10)
+    assert [next(iterator)["id"] for _ in range(5)] == [0, 1, 2, 3, 4]
+    iterator.close()
+
+
+def test_arguments():
+    """ Invalid arguments are rejected before any workers start """
+    engine = QueryEngine("parity:even")
+
+    with pytest.raises(ValueError):
+        engine.filter_parallel(RECORDS, workers=0)
+
+    with pytest.raises(ValueError):
+        engine.filter_parallel(RECORDS, chunksize=0)
+
+    with pytest.raises(MatchException):
+        QueryEngine("foo", allow_bare_field=True).filter_parallel(RECORDS)
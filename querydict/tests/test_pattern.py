@@ -0,0 +1,145 @@
+"""
+Tests for wildcard and regular expression terms, and the string methods used for simple wildcards.
+"""
+import pytest
+from querydict.compiler import ANY_CHARS, ONE_CHAR, WildcardTerm, WordTerm, split_wildcards
+from querydict.ndjson import required_literals
+from querydict.parser import QueryEngine, QueryException
+
+HOSTS = ["web-01", "web-02", "db-01", "web", "", "w\neb-01", "WEB-01"]
+
+
+def test_split_wildcards():
+    """ Patterns are split into literals and wildcards, with escapes removed """
+    assert split_wildcards("web-*") == ["web-", ANY_CHARS]
+    assert split_wildcards("*a**b?") == [ANY_CHARS, "a", ANY_CHARS, "b", ONE_CHAR]
+    assert split_wildcards(r"a\*b*") == ["a*b", ANY_CHARS]
+    assert split_wildcards(r"\**\?") == ["*", ANY_CHARS, "?"]
+
+
+@pytest.mark.parametrize(
+    "pattern, strategy",
+    [
+        ("web-*", "prefix"),
+        ("*-01", "suffix"),
+        ("*b-0*", "contains"),
+        ("w*1", "prefix_suffix"),
+        ("*", "any"),
+        ("w?b-01", "regex"),
+        ("*e*-*", "regex"),
+        ("w*b*1", "regex"),
+    ],
+)
+def test_strategy(pattern, strategy):
+    """ Only patterns which cannot use string methods use a regular expression """
+    node = QueryEngine("host:{}".format(pattern))._ir
+    assert isinstance(node, WildcardTerm)
+    assert node.strategy == strategy
+    assert (node.regex is None) == (strategy != "regex")
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        ("web-*", ["web-01", "web-02"]),
+        ("*-01", ["web-01", "db-01", "w\neb-01", "WEB-01"]),
+        ("*b-0*", ["web-01", "web-02", "db-01", "w\neb-01"]),
+        ("w*1", ["web-01", "w\neb-01"]),
+        ("web*web", []),
+        ("*", HOSTS),
+        ("w?b-01", ["web-01"]),
+        ("??-01", ["db-01"]),
+        ("*e*-*", ["web-01", "web-02", "w\neb-01"]),
+    ],
+)
+def test_wildcard(pattern, expected):
+    """ Star matches any characters including none, question mark matches exactly one """
+    query = QueryEngine("host:{}".format(pattern))
+    assert [host for host in HOSTS if query.match({"host": host})] == expected
+
+
+def test_escaped():
+    """ Escaped wildcards are matched literally """
+    query = QueryEngine(r"host:web\*")
+    assert isinstance(query._ir, WordTerm)
+    assert query.match({"host": "web*"})
+    assert not query.match({"host": "web-01"})
+    assert QueryEngine(r"host:web\**").match({"host": "web*-01"})
+    assert QueryEngine(query.canonical).canonical == query.canonical
+
+
+@pytest.mark.parametrize(
+    "pattern, strategy, expected",
+    [
+        (r"*\?", "suffix", ["what?", "ab?", "a?"]),
+        (r"\**", "prefix", ["*star", "*", "**"]),
+        (r"a*\?", "prefix_suffix", ["ab?", "a?"]),
+        (r"\**\*", "prefix_suffix", ["**"]),
+        (r"\?*?", "regex", ["?ab"]),
+    ],
+)
+def test_escaped_next_to_wildcards(pattern, strategy, expected):
+    """ Escaped wildcards are literal text even when alone between wildcards """
+    values = ["what?", "*star", "*", "ab", "ab?", "a?", "**", "?ab", "star"]
+    query = QueryEngine("q:{}".format(pattern))
+    assert query._ir.strategy == strategy
+    assert [value for value in values if query.match({"q": value})] == expected
+
+
+def test_not_string():
+    """ Patterns only match strings, other values and missing fields never match """
+    for query in ["host:*", "host:1*", "host:/1.*/"]:
+        engine = QueryEngine(query)
+        assert not engine.match({"host": 1})
+        assert not engine.match({"host": ["1"]})
+        assert not engine.match({"other": "1"})
+
+
+def test_regex():
+    """ Regular expressions must match the whole value """
+    query = QueryEngine("host:/web-[0-9]+/")
+    assert query.match({"host": "web-01"})
+    assert not query.match({"host": "web-01.example.com"})
+    assert not query.match({"host": "my-web-01"})
+    assert query.canonical == "host:/web-[0-9]+/"
+
+
+def test_invalid_regex():
+    """ Invalid regular expressions, and expressions without a field, raise QueryException """
+    with pytest.raises(QueryException):
+        QueryEngine("host:/web-[0-9/")
+
+    with pytest.raises(QueryException):
+        QueryEngine("/web/")
+
+
+def test_compiled_once(monkeypatch):
+    """ Patterns are compiled when the QueryEngine is built, not when matching """
+    query = QueryEngine("host:w?b* AND name:/b.b/")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Compiled during matching")
+
+    monkeypatch.setattr("re.compile", fail)
+    monkeypatch.setattr("re.fullmatch", fail)
+    assert query.match({"host": "web-01", "name": "bob"})
+
+
+def test_required_literals():
+    """ The prefilter uses the prefix, or the longest literal part of a pattern """
+    assert required_literals(QueryEngine("host:web-*")._ir) == [{b'"web-'}, {b'"host"'}]
+    assert required_literals(QueryEngine("host:*a*long*")._ir) == [{b"long"}, {b'"host"'}]
+    assert required_literals(QueryEngine("host:*")._ir) == [{b'"host"'}]
+
+
+def test_columnar():
+    """ Matching columns gives the same result as matching each row """
+    np = pytest.importorskip("numpy")
+    columns = {"host": np.array(HOSTS), "mixed": HOSTS[:-1] + [None], "number": np.arange(len(HOSTS))}
+
+    for pattern in ["web-*", "*-01", "*b-0*", "w*1", "*", "w?b-01", "/web-[0-9]+/"]:
+        for field in columns:
+            query = QueryEngine("{}:{}".format(field, pattern))
+            rows = [{field: value} for value in list(columns[field])]
+            expected = [query.match(row) for row in rows]
+            assert query.match_columns(columns).tolist() == expected
@@ -0,0 +1,145 @@
+"""
+Tests for matching a dictionary against many queries using QuerySet.
+"""
+import pytest
+from querydict.parser import QueryEngine, QueryException
+from querydict.percolator import QuerySet, required_terms
+
+SIMPLE_DATA = {"key1": "value1", "key2": "value2"}
+
+
+def test_required_terms():
+    """ Required terms come from AND children, and OR only if every branch has them """
+    assert required_terms(QueryEngine("key1:value1")._ir) == {("key1", "value1")}
+    assert required_terms(QueryEngine("key1:a AND (key2:b OR key2:c)")._ir) == {("key1", "a")}
+    assert required_terms(QueryEngine("key1:a OR key2:b")._ir) == {("key1", "a"), ("key2", "b")}
+    assert required_terms(QueryEngine("key1:a OR NOT key2:b")._ir) is None
+    assert [(field, node.value) for field, node in required_terms(QueryEngine('key1:"a"')._ir)] == [("key1", "a")]
+
+
+def test_match():
+    """ Matching returns the identifiers of matching queries in the order they were added """
+    rules = QuerySet()
+    rules.add("c", "key1:value1 AND key2:value2")
+    rules.add("a", "key1:value1")
+    rules.add("b", "key1:nope")
+    rules.add("d", "NOT key1:nope")
+    rules.add("e", 'key2:"value"')
+    assert rules.match(SIMPLE_DATA) == ["c", "a", "d", "e"]
+
+
+def test_candidates():
+    """ Only rules whose required terms are present are evaluated """
+    rules = QuerySet()
+    rules.add(1, "key1:value1 AND key2:nope")
+    rules.add(2, "key1:nope")
+    rules.add(3, "NOT key1:nope")
+    assert rules.candidates(SIMPLE_DATA) == {1, 3}
+    assert rules.match(SIMPLE_DATA) == [3]
+
+
+def test_agrees_with_engine():
+    """ Results are the same as matching each query individually """
+    queries = [
+        "key1:value1",
+        "key1:value1 OR key2:nope",
+        "key1:nope OR key2:nope",
+        "(key1:value1 AND key2:value2) OR key3:value3",
+        "key1:value1 AND NOT key2:value2",
+        "foo.bar:baz",
+    ]
+    rules = QuerySet()
+    for query in queries:
+        rules.add(query, query)
+
+    for data in [SIMPLE_DATA, {"key2": "value2"}, {"foo": {"bar": "baz"}}, {"key1": ["value1"]}]:
+        assert rules.match(data) == [q for q in queries if QueryEngine(q).match(data)]
+
+
+def test_add_remove():
+    """ Rules can be replaced and removed, and the index is updated """
+    rules = QuerySet()
+    rules.add("rule", "key1:value1")
+    rules.add("rule", "key1:nope")
+    assert len(rules) == 1
+    assert rules.match(SIMPLE_DATA) == []
+
+    rules.remove("rule")
+    assert "rule" not in rules
+    assert rules.candidates(SIMPLE_DATA) == set()
+
+    with pytest.raises(KeyError):
+        rules.remove("rule")
+
+
+def test_options():
+    """ Options are passed to QueryEngine, and engines can be added directly """
+    rules = QuerySet(ambiguous_action="OR")
+    rules.add("or", "key1:value1 key2:nope")
+    rules.add("and", QueryEngine("key1:value1 key2:nope"))
+    assert rules.match(SIMPLE_DATA) == ["or"]
+
+    with pytest.raises(QueryException):
+        QuerySet(ambiguous_action="Exception").add("bad", "key1:value1 key2:nope")
+
+
+def test_never_matches():
+    """ Rules that can never match are not evaluated """
+    rules = QuerySet()
+    rules.add("never", "key1:value1 AND key1:value2")
+    rules.add("never_or", "(key1:a AND key1:b) OR (key2:a AND NOT key2:a)")
+    assert rules.candidates(SIMPLE_DATA) == set()
+
+
+def test_phrases():
+    """ Phrases are found with one scan of each field, and index the rules that require them """
+    rules = QuerySet()
+    rules.add("disk", 'message:"disk full"')
+    rules.add("timeout", 'message:"timed out" AND NOT host:db')
+    rules.add("either", 'message:"disk" OR message:"retry"')
+    rules.add("not", 'NOT message:"disk"')
+    rules.add("list", 'tags:"urgent"')
+
+    data = {"message": "write failed: disk full, will retry", "host": "web", "tags": ["urgent"]}
+    assert rules.candidates(data) == {"disk", "either", "not", "list"}
+    assert rules.match(data) == ["disk", "either", "list"]
+    assert rules.match({"message": "request timed out", "host": "web"}) == ["timeout", "not"]
+    assert rules.match({"message": "request timed out", "host": "db"}) == ["not"]
+
+    rules.remove("either")
+    rules.remove("not")
+    assert sorted(rules._automatons["message"]._counts) == ["disk full", "timed out"]
+    rules.remove("disk")
+    rules.remove("timeout")
+    assert "message" not in rules._automatons
+    assert "message" not in rules._accessors
+
+
+def test_shared_conditions():
+    """ Conditions in several rules are evaluated once for each record, and removed with the last rule """
+    rules = QuerySet()
+    rules.add("api", "env:prod AND service:api AND NOT user:root")
+    rules.add("web", "env:prod AND service:web AND NOT user:root")
+    rules.add("root", "NOT user:root AND (service:api OR service:web)")
+    assert len(rules._shared) == 9
+
+    assert rules.match({"env": "prod", "service": "api", "user": "bob"}) == ["api", "root"]
+    # Each rule is a candidate, and the sixteen conditions in them are nine distinct conditions
+    assert rules.evaluated == 9
+
+    for rule_id in ["api", "web", "root"]:
+        rules.remove(rule_id)
+
+    assert len(rules._shared) == 0
+
+
+def test_not_shared():
+    """ Queries with bare terms, or which are profiled or adaptive, are evaluated on their own """
+    rules = QuerySet(allow_bare_field=True)
+    rules.add("bare", "env:prod AND bob")
+    rules.add("profiled", QueryEngine("env:prod", profile=True))
+    rules.add("adaptive", QueryEngine("env:prod", adaptive=True))
+    assert len(rules._shared) == 0
+
+    assert rules.match({"env": "prod", "user": "bob"}, default_field="user") == ["bare", "profiled", "adaptive"]
+    assert rules.evaluated == 0
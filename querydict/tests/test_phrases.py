@@ -0,0 +1,100 @@
+"""
+Tests for finding many phrases in a string at once.
+"""
+import random
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from querydict import phrases
+from querydict.phrases import PhraseAutomaton
+
+
+@pytest.mark.parametrize("small_set", [0, 1000])
+def test_scan(monkeypatch, small_set):
+    """ Both the automaton and testing each phrase find exactly the phrases in a string """
+    monkeypatch.setattr(phrases, "SMALL_SET", small_set)
+    rng = random.Random(1)
+    words = {"".join(rng.choice("abc") for _ in range(rng.randrange(1, 6))) for _ in range(100)}
+    automaton = PhraseAutomaton()
+
+    for word in words:
+        automaton.add(word)
+
+    for _ in range(200):
+        text = "".join(rng.choice("abcd") for _ in range(rng.randrange(30)))
+        assert automaton.scan(text) == {word for word in words if word in text}
+
+
+def test_overlapping(monkeypatch):
+    """ Phrases which are suffixes of other phrases are found """
+    monkeypatch.setattr(phrases, "SMALL_SET", 0)
+    automaton = PhraseAutomaton()
+
+    for phrase in ["he", "she", "his", "hers", ""]:
+        automaton.add(phrase)
+
+    assert automaton.scan("ushers") == {"he", "she", "hers", ""}
+    assert automaton.scan("") == {""}
+
+
+def test_add_remove():
+    """ Phrases added twice need removing twice, and changes are seen by the next scan """
+    automaton = PhraseAutomaton()
+    text = "disk full"
+    automaton.add("disk")
+    automaton.add("disk")
+    assert automaton.scan(text) == {"disk"}
+
+    automaton.add("full")
+    assert automaton.scan(text) == {"disk", "full"}
+
+    automaton.remove("disk")
+    assert automaton.scan(text) == {"disk", "full"}
+
+    automaton.remove("disk")
+    assert automaton.scan(text) == {"full"}
+    assert len(automaton) == 1
+
+    with pytest.raises(KeyError):
+        automaton.remove("disk")
+
+
+@pytest.mark.parametrize("small_set", [0, 1000])
+def test_incremental(monkeypatch, small_set):
+    """ Phrases added and removed between scans are found, whether or not the automaton has been rebuilt """
+    monkeypatch.setattr(phrases, "SMALL_SET", small_set)
+    rng = random.Random(2)
+    words = ["".join(rng.choice("abc") for _ in range(rng.randrange(1, 5))) for _ in range(40)]
+    automaton = PhraseAutomaton()
+    counts = {}
+
+    for _ in range(2000):
+        word = rng.choice(words)
+
+        if counts.get(word) and rng.random() < 0.5:
+            automaton.remove(word)
+            counts[word] -= 1
+        else:
+            automaton.add(word)
+            counts[word] = counts.get(word, 0) + 1
+
+        text = "".join(rng.choice("abcd") for _ in range(rng.randrange(20)))
+        assert automaton.scan(text) == {word for word, count in counts.items() if count and word in text}
+
+
+def test_threads(monkeypatch):
+    """ Scans from several threads give the right result while one of them rebuilds the automaton """
+    monkeypatch.setattr(phrases, "SMALL_SET", 0)
+    rng = random.Random(3)
+    words = ["".join(rng.choice("abc") for _ in range(rng.randrange(1, 5))) for _ in range(200)]
+    texts = ["".join(rng.choice("abcd") for _ in range(50)) for _ in range(400)]
+
+    for _ in range(5):
+        automaton = PhraseAutomaton()
+
+        for word in words:
+            automaton.add(word)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            found = list(executor.map(automaton.scan, texts))
+
+        assert found == [{word for word in words if word in text} for text in texts]
@@ -0,0 +1,47 @@
+"""
+Tests for finding the fields and terms which every match of a query requires.
+"""
+import pytest
+from querydict.parser import QueryEngine
+
+
+@pytest.mark.parametrize(
+    "query, fields, terms",
+    [
+        ("name:Bob", {"name"}, {("name", "Bob")}),
+        ('name:Bob AND message:"disk full"', {"name", "message"}, {("name", "Bob")}),
+        ("name:Bob AND (age:[18 TO *] OR NOT role:admin)", {"name"}, {("name", "Bob")}),
+        ("(name:Bob AND age:[18 TO *]) OR (name:Alice AND age:[21 TO *])", {"name", "age"}, set()),
+        ("name:Bob OR name:Bob AND age:1", {"name"}, {("name", "Bob")}),
+        ("NOT name:Bob", set(), set()),
+        ("host.name:web* AND procs.*.name:cmd.exe", {"host.name"}, set()),
+        ("name:Bob AND name:Alice", set(), set()),
+    ],
+)
+def test_required(query, fields, terms):
+    """ AND requires every child, OR only what every branch requires, and NOT nothing """
+    engine = QueryEngine(query)
+    assert engine.required_fields == fields
+    assert engine.required_terms == terms
+
+
+def test_required_consistent():
+    """ Records without a required field or term never match """
+    engine = QueryEngine("name:Bob AND (age:[18 TO *] OR role:admin)")
+    records = [{"name": "Bob", "age": 20}, {"name": "Bob", "role": "user"}, {"age": 20}, {"name": "Al", "age": 20}]
+
+    for record in records:
+        if engine.match(record):
+            assert all(field in record for field in engine.required_fields)
+            assert all(record[field] == value for field, value in engine.required_terms)
+
+
+def test_precheck_bare():
+    """ Queries with bare terms reject records lacking required terms before searching their strings """
+    engine = QueryEngine('"disk full" AND host:web-01', allow_bare_field=True, default_fields=["*"])
+    assert engine.required_terms == {("host", "web-01")}
+    assert engine.match({"host": "web-01", "message": "error: disk full"})
+    assert not engine.match({"host": "web-02", "message": "error: disk full"})
+    assert not engine.match({"message": "error: disk full"})
+    # Explanations still show every evaluated condition
+    assert [child.matched for child in engine.match({"host": "web-02"}, explain=True).children] == [False]
@@ -0,0 +1,236 @@
+"""
+Tests for range queries, and the interval index used to find range queries in a QuerySet.
+"""
+import io
+import json
+import random
+from datetime import datetime, timezone
+
+import pytest
+from querydict.intervals import IntervalIndex
+from querydict.parser import QueryEngine
+from querydict.percolator import QuerySet
+
+
+def test_inclusive_exclusive():
+    """ Square brackets include the bound, curly brackets exclude it """
+    query = QueryEngine("latency_ms:[100 TO 500}")
+    assert query.match({"latency_ms": 100})
+    assert query.match({"latency_ms": 499.5})
+    assert not query.match({"latency_ms": 500})
+    assert not query.match({"latency_ms": 99})
+
+    query = QueryEngine("latency_ms:{100 TO 500]")
+    assert not query.match({"latency_ms": 100})
+    assert query.match({"latency_ms": 500})
+
+
+def test_unbounded():
+    """ An asterisk leaves a range unbounded at that end """
+    assert QueryEngine("size:[10 TO *]").match({"size": 10 ** 12})
+    assert not QueryEngine("size:[* TO 10}").match({"size": 10})
+    assert QueryEngine("size:[* TO *]").match({"size": -1})
+    assert not QueryEngine("size:[* TO *]").match({"other": 1})
+
+
+def test_negative():
+    """ Negative bounds are numbers, not prohibited terms """
+    query = QueryEngine("temperature:[-10 TO -2.5]")
+    assert query.match({"temperature": -10})
+    assert query.match({"temperature": -3})
+    assert not query.match({"temperature": 0})
+
+
+def test_datetime():
+    """ ISO 8601 bounds are compared with datetime values """
+    query = QueryEngine('created:[2020-01-01 TO "2020-02-01T12:00:00"}')
+    assert query.match({"created": datetime(2020, 1, 15)})
+    assert not query.match({"created": datetime(2020, 2, 1, 12)})
+    # Dates are not compared with datetimes that have a timezone, or strings which are not timestamps
+    assert not query.match({"created": datetime(2020, 1, 15, tzinfo=timezone.utc)})
+    assert not query.match({"created": "yesterday"})
+
+    query = QueryEngine('created:["2020-01-01T00:00:00+00:00" TO *]')
+    assert query.match({"created": datetime(2020, 1, 15, tzinfo=timezone.utc)})
+
+
+def test_timestamp_strings():
+    """ ISO 8601 strings, as decoded from JSON, are compared with ranges of datetimes from every entry point """
+    query = QueryEngine("ts:[2024-01-01 TO 2024-02-01]")
+    records = [{"ts": "2024-01-15T10:00:00"}, {"ts": "2024-03-01"}, {"ts": "2024-01-15T10:00:00Z"}, {"ts": "x"}]
+    lines = b"".join(json.dumps(record).encode() + b"\n" for record in records)
+
+    assert [query.match(record) for record in records] == [True, False, False, False]
+    assert list(query.filter_ndjson(io.BytesIO(lines))) == [records[0]]
+    assert [query.match_json(json.dumps(record)) for record in records] == [True, False, False, False]
+
+    aware = QueryEngine('ts:["2024-01-01T00:00:00+00:00" TO *]')
+    assert aware.match({"ts": "2024-01-15T10:00:00Z"})
+    assert not aware.match({"ts": "2024-01-15T10:00:00"})
+
+    rules = QuerySet()
+    rules.add("january", "ts:[2024-01-01 TO 2024-02-01]")
+    rules.add("recent", 'ts:["2024-01-01T00:00:00+00:00" TO *]')
+    assert rules.candidates({"ts": "2024-01-15T10:00:00"}) == {"january"}
+    assert rules.match({"ts": "2024-01-15T10:00:00Z"}) == ["recent"]
+    assert rules.match({"ts": "not a date"}) == []
+
+    np = pytest.importorskip("numpy")
+    column = np.array([record["ts"] for record in records])
+    assert query.match_columns({"ts": column}).tolist() == [True, False, False, False]
+
+
+def test_string():
+    """ Other bounds are compared as strings """
+    query = QueryEngine("name:[a TO c}")
+    assert query.match({"name": "bob"})
+    assert not query.match({"name": "carol"})
+    assert not query.match({"name": 1})
+
+
+def test_wrong_kind():
+    """ Values which cannot be compared with the bounds never match, including booleans """
+    query = QueryEngine("count:[0 TO 5]")
+    assert not query.match({"count": "3"})
+    assert not query.match({"count": True})
+    assert not query.match({"count": None})
+    assert not query.match({"count": [1, 2]})
+    assert query.match({"count": 3})
+    assert QueryEngine("NOT count:[0 TO 5]").match({"count": "3"})
+
+
+def test_nan():
+    """ NaN is not in any range, whether matched, matched as a column or found in a QuerySet """
+    nan = float("nan")
+
+    for query in ["lat:[100 TO 500]", "lat:[* TO 5]", "lat:[* TO *]"]:
+        assert not QueryEngine(query).match({"lat": nan})
+
+    rules = QuerySet()
+    rules.add("inside", "lat:[100 TO 500]")
+    rules.add("any", "lat:[* TO *]")
+    assert rules.candidates({"lat": nan}) == set()
+    assert rules.match({"lat": nan}) == []
+
+    np = pytest.importorskip("numpy")
+
+    for query in ["lat:[100 TO 500]", "lat:[* TO *]"]:
+        assert QueryEngine(query).match_columns({"lat": np.array([nan, 200.0])}).tolist() == [False, True]
+
+
+def test_canonical():
+    """ Ranges keep their syntax in the canonical form """
+    assert QueryEngine("b:{1 TO *] AND a:x").canonical == "a:x AND b:{1 TO *]"
+
+
+def test_columnar():
+    """ Matching columns gives the same result as matching each row """
+    np = pytest.importorskip("numpy")
+    rows = [
+        {"size": 1, "name": "alice"},
+        {"size": 5.5, "name": "bob"},
+        {"size": 10, "name": "carol"},
+        {"size": None, "name": "dave"},
+    ]
+    columns = {
+        "size": [row["size"] for row in rows],
+        "name": np.array([row["name"] for row in rows]),
+    }
+    numbers = {"size": np.array([1, 5.5, 10, 20])}
+
+    for query in ["size:[1 TO 10}", "size:{1 TO *]", "name:[b TO c]", "name:[1 TO 2]", "size:[a TO z]"]:
+        engine = QueryEngine(query)
+        assert engine.match_columns(columns).tolist() == [engine.match(row) for row in rows]
+
+    assert QueryEngine("size:[5 TO 10]").match_columns(numbers).tolist() == [False, True, True, False]
+    assert QueryEngine("size:[a TO z]").match_columns(numbers).tolist() == [False] * 4
+    assert not QueryEngine("flag:[0 TO 1]").match_columns({"flag": np.array([True, False])}).any()
+
+
+def test_interval_index():
+    """ The interval index returns exactly the intervals that contain a value """
+    rng = random.Random(42)
+    index = IntervalIndex()
+    intervals = {}
+
+    for key in range(300):
+        low = rng.choice([None, rng.randint(0, 100)])
+        high = rng.choice([None, rng.randint(0, 100)])
+        include_low, include_high = rng.random() < 0.5, rng.random() < 0.5
+        intervals[key] = (low, high, include_low, include_high)
+        index.add(key, low, high, include_low, include_high)
+
+    for key in range(0, 300, 3):
+        index.remove(key)
+        del intervals[key]
+
+    def contains(value, low, high, include_low, include_high):
+        if low is not None and (value < low if include_low else value <= low):
+            return False
+        return high is None or (value <= high if include_high else value < high)
+
+    for value in [x / 2 for x in range(-2, 204)]:
+        expected = {key for key, interval in intervals.items() if contains(value, *interval)}
+        assert index.search(value) == expected
+
+
+def test_interval_index_duplicates():
+    """ Identical intervals which cannot be split are still found """
+    index = IntervalIndex()
+
+    for key in range(10):
+        index.add(key, 1, 2, False, False)
+
+    assert index.search(1.5) == set(range(10))
+    assert index.search(2) == set()
+
+
+def test_query_set():
+    """ Range queries are found through the interval index """
+    rules = QuerySet()
+    rules.add("fast", "latency_ms:[* TO 100}")
+    rules.add("normal", "latency_ms:[100 TO 500}")
+    rules.add("slow", "latency_ms:[500 TO *] AND status:error")
+    rules.add("either", "latency_ms:[0 TO 10] OR latency_ms:[1000 TO *]")
+    rules.add("any", "latency_ms:[* TO *]")
+    rules.add("recent", "created:[2020-01-01 TO *]")
+
+    assert rules.candidates({"latency_ms": 50}) == {"fast", "any"}
+    assert rules.match({"latency_ms": 5}) == ["fast", "either", "any"]
+    assert rules.match({"latency_ms": 2000, "status": "error"}) == ["slow", "either", "any"]
+    assert rules.match({"latency_ms": "2000"}) == ["any"]
+    assert rules.match({"created": datetime(2021, 1, 1)}) == ["recent"]
+
+    rules.remove("either")
+    rules.remove("any")
+    rules.remove("recent")
+    assert rules.match({"latency_ms": 5}) == ["fast"]
+    assert "created" not in rules._accessors
+
+
+def test_interval_index_incremental():
+    """ Intervals added and removed between searches are found, whether or not the tree has been rebuilt """
+    rng = random.Random(7)
+    index = IntervalIndex()
+    intervals = {}
+
+    for _ in range(2000):
+        key = rng.randrange(50)
+
+        if key in intervals and rng.random() < 0.5:
+            index.remove(key)
+            del intervals[key]
+        else:
+            low = rng.choice([None, rng.randint(0, 100)])
+            high = rng.choice([None, rng.randint(0, 100)])
+            intervals.setdefault(key, []).append((low, high))
+            index.add(key, low, high)
+
+        assert len(index) == sum(len(bounds) for bounds in intervals.values())
+
+        value = rng.randint(-1, 101)
+        expected = {
+            key for key, bounds in intervals.items()
+            if any((low is None or value >= low) and (high is None or value <= high) for low, high in bounds)
+        }
+        assert index.search(value) == expected
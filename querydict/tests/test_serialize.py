@@ -0,0 +1,98 @@
+"""
+Tests for serializing checked queries and sets of queries, and loading them without parsing again.
+"""
+import pickle
+import pytest
+from querydict.parser import QueryEngine
+from querydict.percolator import QuerySet
+from querydict import serialize
+
+RECORDS = [
+    {"name": "Bob", "age": 42, "host": "web-01", "message": "disk full on /dev/sda", "procs": [{"name": "cmd.exe"}]},
+    {"name": "Alice", "age": 17, "host": "db-01", "message": "ok", "procs": []},
+    {"name": "Jon", "host": "web-02"},
+]
+
+QUERIES = [
+    "name:Bob",
+    'name:Bob AND message:"disk full" AND NOT age:[0 TO 18}',
+    "host:web-* OR host:/db-[0-9]+/ OR name:Jonn~1",
+    "procs.*.name:cmd.exe AND name:what\\?",
+    "name:Bob AND name:Alice",
+]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_round_trip(query):
+    """ Loaded queries have the same canonical form and results as the original """
+    engine = QueryEngine(query)
+
+    for loaded in (QueryEngine.from_bytes(engine.to_bytes()), pickle.loads(pickle.dumps(engine))):
+        assert loaded.canonical == engine.canonical
+        assert [loaded.match(record) for record in RECORDS] == [engine.match(record) for record in RECORDS]
+
+
+def test_options():
+    """ Options are kept, and bare terms still use their default fields """
+    engine = QueryEngine(
+        '"disk full" OR Jon', allow_bare_field=True, default_fields=["message", "name"], short_circuit=False
+    )
+    loaded = QueryEngine.from_bytes(engine.to_bytes())
+    assert loaded._options() == engine._options()
+    assert loaded.default_fields == ("message", "name")
+    assert [loaded.match(record) for record in RECORDS] == [True, False, True]
+
+
+def test_no_luqum():
+    """ Loading does not parse the query again """
+    data = QueryEngine("name:Bob").to_bytes()
+    loaded = QueryEngine.from_bytes(data)
+    assert loaded.tree is None
+    assert data.startswith(b"querydict:query:")
+
+
+def test_invalid():
+    """ Data which is not a serialized query, or is in another format version, is rejected """
+    data = QueryEngine("name:Bob").to_bytes()
+
+    with pytest.raises(ValueError):
+        QueryEngine.from_bytes(b"name:Bob")
+
+    with pytest.raises(ValueError):
+        QueryEngine.from_bytes(data.replace(b":1\n", b":999\n", 1))
+
+    with pytest.raises(ValueError):
+        QuerySet.from_bytes(data)
+
+    with pytest.raises(ValueError):
+        QueryEngine.from_bytes(serialize.encode("query", {"ir": ["?", "name"], "bare": False, "options": {}}))
+
+    with pytest.raises(ValueError):
+        QueryEngine.from_bytes(serialize.encode("query", {"ir": ["w", "a", "b"], "bare": False, "options": {"x": 1}}))
+
+
+def test_query_set():
+    """ Sets of queries are loaded with the same indexes and results """
+    rules = QuerySet()
+
+    for rule_id, query in enumerate(QUERIES):
+        rules.add(rule_id, query)
+
+    rules.add("phrase", 'message:"disk"')
+    rules.add(None, "NOT name:Bob")
+
+    for loaded in (QuerySet.from_bytes(rules.to_bytes()), pickle.loads(pickle.dumps(rules))):
+        assert len(loaded) == len(rules)
+        assert [loaded.match(record) for record in RECORDS] == [rules.match(record) for record in RECORDS]
+        assert loaded.candidates(RECORDS[1]) == rules.candidates(RECORDS[1])
+
+
+def test_query_set_identifiers():
+    """ Rule identifiers which JSON cannot represent need pickle """
+    rules = QuerySet()
+    rules.add(("team", 1), "name:Bob")
+
+    with pytest.raises(ValueError):
+        rules.to_bytes()
+
+    assert pickle.loads(pickle.dumps(rules)).match(RECORDS[0]) == [("team", 1)]
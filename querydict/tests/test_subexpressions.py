@@ -0,0 +1,87 @@
+"""
+Tests for sharing identical conditions between queries.
+"""
+import threading
+import pytest
+from querydict.parser import QueryEngine
+from querydict.subexpressions import SubexpressionTable, shareable
+
+RECORD = {"env": "prod", "service": "web", "user": "bob"}
+
+
+def _ir(query, **options):
+    return QueryEngine(query, **options)._ir
+
+
+def test_hash_consing():
+    """ Identical conditions are stored once, including AND and OR with children in a different order """
+    table = SubexpressionTable()
+    first = table.add(_ir("env:prod AND (service:api OR service:web)"))
+    assert len(table) == 5
+
+    assert table.add(_ir("(service:web OR service:api) AND env:prod")) == first
+    assert len(table) == 5
+
+    table.add(_ir("service:api OR service:web OR service:db"))
+    assert len(table) == 7
+
+
+def test_evaluated_once():
+    """ Each condition is evaluated at most once for each record """
+    table = SubexpressionTable()
+    first = table.add(_ir("env:prod AND (service:api OR service:web)"))
+    second = table.add(_ir("(service:web OR service:api) AND NOT user:root"))
+    table.start()
+
+    assert table.matcher(first)(RECORD)
+    assert table.evaluated == 5
+    assert table.matcher(second)(RECORD)
+    assert table.evaluated == 8
+
+    # The results of the last record are forgotten
+    table.start()
+    assert table.evaluated == 0
+    assert not table.matcher(first)({"env": "prod", "service": "db"})
+
+
+def test_remove():
+    """ Conditions are removed when no query uses them """
+    table = SubexpressionTable()
+    first = table.add(_ir("env:prod AND service:api"))
+    second = table.add(_ir("env:prod AND NOT service:api"))
+    assert len(table) == 5
+
+    table.remove(first)
+    assert len(table) == 4
+
+    table.remove(second)
+    assert len(table) == 0
+
+    with pytest.raises(KeyError):
+        table.remove(first)
+
+
+def test_threads():
+    """ Each thread has its own results """
+    table = SubexpressionTable()
+    condition = table.add(_ir("env:prod"))
+    table.start()
+    assert table.matcher(condition)(RECORD)
+
+    results = []
+
+    def other():
+        table.start()
+        results.append(table.matcher(condition)({"env": "dev"}))
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    thread.join()
+    assert results == [False]
+    assert table.matcher(condition)(RECORD)
+
+
+def test_shareable():
+    """ Queries with bare terms are not shared """
+    assert shareable(_ir("env:prod AND NOT (a:[1 TO 2] OR b:c*)"))
+    assert not shareable(_ir("env:prod AND NOT bob", allow_bare_field=True))
@@ -0,0 +1,206 @@
+"""
+Tests for matching Words against numbers, booleans and dates by value, and per-field schemas.
+"""
+import io
+import json
+import pickle
+from datetime import datetime
+import pytest
+from querydict.__main__ import main
+from querydict.compiler import Const, TypedWordTerm, word_forms
+from querydict.parser import QueryEngine, QueryException
+from querydict.percolator import QuerySet
+
+RECORDS = [
+    {"port": 53, "ratio": 0.5, "enabled": True, "seen": datetime(2020, 1, 1), "name": "DNS"},
+    {"port": "53", "ratio": "0.5", "enabled": "true", "seen": "2020-01-01", "name": "dns"},
+    {"port": 80, "ratio": 1, "enabled": False, "seen": datetime(2021, 6, 1, 12), "name": "Web"},
+    {"port": [22, 53], "name": ["ssh", "dns"]},
+    {"port": 53.0},
+]
+
+
+def test_word_forms():
+    """ Each Word is converted once to every type it can be equal to """
+    assert word_forms("53") == {str: "53", int: 53, float: 53.0}
+    assert word_forms("0.5") == {str: "0.5", int: 0.5, float: 0.5}
+    assert word_forms("TRUE") == {str: "TRUE", bool: True}
+    assert word_forms("2020-01-01") == {str: "2020-01-01", datetime: datetime(2020, 1, 1)}
+    assert word_forms("dns") == {str: "dns"}
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("port:53", [0, 1, 4]),
+        ("port:53.0", [0, 4]),
+        ("port.*:53", [3]),
+        ("ratio:0.5", [0, 1]),
+        ("ratio:1", [2]),
+        ("enabled:true", [0, 1]),
+        ("enabled:false", [2]),
+        ("seen:2020-01-01", [0, 1]),
+        ("seen:2021-06-01T12:00:00", [2]),
+        ("name:dns", [1]),
+        ("port:53 AND NOT name:DNS", [1, 4]),
+    ],
+)
+def test_typed(query, expected):
+    """ Typed Words are compared with each value as the same type, and strings are compared as before """
+    engine = QueryEngine(query, typed=True)
+    assert [index for index, record in enumerate(RECORDS) if engine.match(record)] == expected
+
+
+@pytest.mark.parametrize("query", ["port:53", "ratio:0.5", "enabled:true", "seen:2020-01-01"])
+def test_untyped(query):
+    """ Without typed, Words only match strings """
+    engine = QueryEngine(query)
+    assert [index for index, record in enumerate(RECORDS) if engine.match(record)] == [1]
+
+
+def test_booleans_not_numbers():
+    """ True is not the number 1, and 1 is not true """
+    assert not QueryEngine("enabled:1", typed=True).match({"enabled": True})
+    assert not QueryEngine("port:true", typed=True).match({"port": 1})
+
+
+@pytest.mark.parametrize(
+    "schema, query, expected",
+    [
+        ({"port": "number"}, "port:53", [0, 4]),
+        ({"enabled": "boolean"}, "enabled:TRUE", [0]),
+        ({"seen": "datetime"}, "seen:2020-01-01", [0]),
+        ({"name": "casefold"}, "name:dns", [0, 1]),
+        ({"name.*": "casefold"}, "name.*:DNS", [3]),
+        ({"port": "string"}, "port:53", [1]),
+        ({"port.*": "number"}, "port.*:53 AND name.*:dns", [3]),
+    ],
+)
+def test_schema(schema, query, expected):
+    """ Fields in the schema are compared with a single type, and other fields as strings """
+    engine = QueryEngine(query, schema=schema)
+    assert [index for index, record in enumerate(RECORDS) if engine.match(record)] == expected
+
+
+def test_schema_errors():
+    """ Unknown kinds and Words which are not of the kind of their field are errors """
+    with pytest.raises(ValueError, match="kind"):
+        QueryEngine("port:53", schema={"port": "integer"})
+
+    with pytest.raises(QueryException, match="number"):
+        QueryEngine("port:http", schema={"port": "number"})
+
+    with pytest.raises(ValueError):
+        TypedWordTerm("enabled", "yes", "boolean")
+
+
+def test_contradiction():
+    """ Words which could be equal as another type are not a contradiction """
+    assert QueryEngine("a:1 AND a:1.0", typed=True).match({"a": 1})
+    assert isinstance(QueryEngine("a:x AND a:y", typed=True)._ir, Const)
+    assert QueryEngine("a:dns AND a:DNS", schema={"a": "casefold"}).match({"a": "Dns"})
+
+
+def test_query_set():
+    """ Typed Words are found in the index of a QuerySet by value """
+    rules = QuerySet(typed=True)
+    rules.add("dns", "port:53")
+    rules.add("web", "port:80 OR port:443")
+    rules.add("on", "enabled:true")
+    rules.add("floats", "port:53.0 OR port:53")
+
+    assert rules.candidates({"port": 53}) == {"dns", "floats"}
+    assert rules.candidates({"port": 53.0}) == {"dns", "floats"}
+    assert rules.candidates({"port": "443"}) == {"web"}
+    assert rules.match({"port": 53}) == ["dns", "floats"]
+    assert rules.match({"enabled": True}) == ["on"]
+
+    rules.remove("floats")
+    rules.remove("dns")
+    assert rules.candidates({"port": 53}) == set()
+
+
+def test_query_set_casefold():
+    """ Case folded Words cannot be looked up, so are always evaluated """
+    rules = QuerySet(schema={"name": "casefold"})
+    rules.add("dns", "name:DNS")
+    assert rules.match({"name": "dns"}) == ["dns"]
+
+
+def test_ndjson():
+    """ Numbers in lines are not skipped by the prefilter, as their text need not match the Word """
+    records = [{"port": 53.0}, {"port": 5.3e1}, {"port": 80}, {"port": "53"}]
+    lines = b"".join(json.dumps(record).encode() + b"\n" for record in records)
+    engine = QueryEngine("port:53", typed=True)
+    assert list(engine.filter_ndjson(io.BytesIO(lines))) == [records[0], records[1], records[3]]
+
+
+def test_precheck():
+    """ Typed Words are not required terms, as the field need not be a string """
+    engine = QueryEngine("port:53 AND name:dns", typed=True)
+    assert engine.required_fields == {"port", "name"}
+    assert engine.required_terms == {("name", "dns")}
+
+
+def test_bare():
+    """ Bare terms are searched for in strings as before """
+    engine = QueryEngine("53", typed=True, allow_bare_field=True)
+    assert engine.match({"port": "53"}, default_field="port")
+    assert not engine.match({"port": 53}, default_field="port")
+
+
+def test_serialize():
+    """ Typed options are kept when serialized and cached """
+    options = {"typed": True, "schema": {"name": "casefold"}}
+    engine = QueryEngine("port:53 AND name:dns", **options)
+
+    for loaded in (
+        QueryEngine.from_bytes(engine.to_bytes()),
+        pickle.loads(pickle.dumps(engine)),
+        QueryEngine.from_cache("port:53 AND name:dns", **options),
+    ):
+        assert loaded.match({"port": 53, "name": "DNS"})
+        assert not loaded.match({"port": 54, "name": "DNS"})
+
+    assert not QueryEngine.from_cache("port:53 AND name:dns").match({"port": 53, "name": "DNS"})
+
+
+def test_columns():
+    """ Columns of numbers and booleans give the same result as matching each row """
+    np = pytest.importorskip("numpy")
+    columns = {
+        "port": np.array([53, 80, 53]),
+        "ratio": np.array([0.5, 1.0, 53.0]),
+        "enabled": np.array([True, False, True]),
+        "name": np.array(["53", "dns", "DNS"]),
+        "mixed": [53, "53", True],
+    }
+    # Rows of Python values, as NumPy scalars are not int, float or bool
+    rows = [
+        {
+            field: column[index].item() if isinstance(column, np.ndarray) else column[index]
+            for field, column in columns.items()
+        }
+        for index in range(3)
+    ]
+
+    for query, schema in [
+        ("port:53", None), ("ratio:53", None), ("enabled:true", None), ("name:53", None), ("mixed:53", None),
+        ("port:true", None), ("port:http", None), ("name:dns", {"name": "casefold"}),
+        ("port:53", {"port": "number"}),
+    ]:
+        engine = QueryEngine(query, typed=True, schema=schema)
+        expected = [engine.match(row) for row in rows]
+        assert engine.match_columns(columns).tolist() == expected, query
+
+
+def test_cli(tmp_path, capsysbinary):
+    """ The command line matches numbers with --typed """
+    path = tmp_path / "records.jsonl"
+    path.write_bytes(b'{"port": 53}\n{"port": "53"}\n')
+
+    assert main(["--count", "port:53", str(path)]) == 0
+    assert capsysbinary.readouterr().out == b"1\n"
+
+    assert main(["--count", "--typed", "port:53", str(path)]) == 0
+    assert capsysbinary.readouterr().out == b"2\n"
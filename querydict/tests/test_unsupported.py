@@ -10,20 +10,16 @@ SIMPLE_DATA = {"key1": "value1", "key2": "value2"}
 
 
 def test_range():
-    """ Test queries that generate a Range() object """
+    """ Test ranges without a field, or with bounds that cannot be compared """
     with pytest.raises(QueryException):
-        QueryEngine("price:[0 TO 10]")
+        QueryEngine("[0 TO 10]")
 
-
-def test_fuzzy():
-    """ Test queries that include a fuzzy (Levenshtein) match """
     with pytest.raises(QueryException):
-        QueryEngine("domain:microsoft~0.8")
+        QueryEngine("price:[0 TO 2020-01-01]")
 
 
-def test_bare_field():
-    """ Test that passing a value with no fieldname raises NotImplementedError during matching """
-    with pytest.raises(NotImplementedError):
-        QueryEngine("value1", allow_bare_field=True).match(
-            SIMPLE_DATA, default_field="key1"
-        )
+@pytest.mark.parametrize("query", ["a:b:c", 'a:b:"c"', "a:(b OR c)"])
+def test_nested_field(query):
+    """ A field followed by another field or a group raises a QueryException """
+    with pytest.raises(QueryException, match="single term"):
+        QueryEngine(query)
@@ -14,7 +14,7 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/edeca/querydict",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=["benchmarks", "benchmarks.*"]),
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: GNU Affero General Public License v3",
@@ -23,7 +23,8 @@ setuptools.setup(
         "Operating System :: OS Independent",
         "Development Status :: 4 - Beta",
     ],
-    install_requires=["luqum", "dotty_dict",],
+    install_requires=["luqum"],
+    extras_require={"numpy": ["numpy"]},
     test_suite='nose.collector',
     tests_require=['nose', 'pytest'],
 )